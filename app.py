@@ -1,33 +1,185 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session, get_flashed_messages
-from flask_mail import Mail, Message
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session, get_flashed_messages, has_request_context
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
 from werkzeug.utils import secure_filename
 import os
 import psycopg2
 from psycopg2 import pool
+from psycopg2.extras import execute_values
 from datetime import datetime, timedelta
 import uuid
-import traceback
+import secrets
+import hashlib
+import hmac
 from dotenv import load_dotenv
 
-from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.interval import IntervalTrigger
 import time
 import random
 import string
 import requests
 import json
+import re
+import copy
+import logging
+import logging.handlers
+import queue
+import threading
+import socket
+import select
+import signal
+import sys
+import atexit
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from requests.auth import HTTPBasicAuth
 
 load_dotenv()
 
+# =============================================================================
+# LOGGING
+# =============================================================================
+# Each subsystem logs through its own `taxi.<subsystem>` logger. Records are put
+# on an in-memory queue and written to stdout by a listener thread, so request
+# threads never block on stdout; when the queue is full records are dropped and
+# counted rather than waited on. Output is one JSON object per line
+# (LOG_FORMAT=text for a plain console format).
+# LOG_LEVEL is the default level and LOG_LEVELS overrides it per subsystem
+# (e.g. LOG_LEVELS=sap=DEBUG,web=WARNING). A few per-message DEBUG events are
+# marked `extra={'sampled': True}` and kept at LOG_DEBUG_SAMPLE_RATE, so
+# LOG_LEVEL=DEBUG doesn't flood the output; a subsystem set to DEBUG in
+# LOG_LEVELS keeps all of its records.
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+LOG_LEVELS = os.environ.get('LOG_LEVELS', '')
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json').lower()
+LOG_DEBUG_SAMPLE_RATE = float(os.environ.get('LOG_DEBUG_SAMPLE_RATE', '0.1'))
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', '10000'))
+LOG_SUBSYSTEMS = ('app', 'db', 'auth', 'sap', 'directory', 'budget', 'mail', 'whatsapp', 'scheduler', 'web')
+
+class JsonLineFormatter(logging.Formatter):
+    """One JSON object per record; `extra={'fields': {...}}` adds structured fields"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'subsystem': record.name.rsplit('.', 1)[-1],
+            'msg': record.getMessage(),
+            'pid': record.process
+        }
+        fields = getattr(record, 'fields', None)
+        if fields:
+            entry.update(fields)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+class DebugSampler(logging.Filter):
+    """Keep a LOG_DEBUG_SAMPLE_RATE share of DEBUG records marked `sampled`; everything else passes"""
+
+    def __init__(self, unsampled_loggers=()):
+        super().__init__()
+        self.unsampled_loggers = set(unsampled_loggers)
+
+    def filter(self, record):
+        return (record.levelno > logging.DEBUG or not getattr(record, 'sampled', False)
+                or record.name in self.unsampled_loggers or LOG_DEBUG_SAMPLE_RATE >= 1
+                or random.random() < LOG_DEBUG_SAMPLE_RATE)
+
+class ProcessQueueHandler(logging.handlers.QueueHandler):
+    """Non-blocking queue handler whose listener thread is (re)started in whichever process logs"""
+
+    def __init__(self, target):
+        super().__init__(queue.Queue(LOG_QUEUE_SIZE))
+        self.target = target
+        self.listener = None
+        self.pid = None
+        self.dropped = 0
+
+    def ensure_listener(self):
+        # A forked child inherits the queue but not the thread draining it.
+        # Called from emit(), which handle() already runs under the handler lock
+        if self.pid != os.getpid():
+            self.queue = queue.Queue(LOG_QUEUE_SIZE)
+            self.listener = logging.handlers.QueueListener(self.queue, self.target)
+            self.listener.start()
+            self.pid = os.getpid()
+
+    def prepare(self, record):
+        # Render the message and traceback here; the listener only serializes
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        self.ensure_listener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def stop(self):
+        """Flush queued records (atexit)"""
+        if self.listener is not None and self.pid == os.getpid():
+            self.listener.stop()
+            self.pid = None
+        if self.dropped:
+            sys.stdout.write(f"⚠️ {self.dropped} log records dropped (log queue full)\n")
+
+def configure_logging():
+    """Attach the queue handler to the `taxi` logger and apply LOG_LEVEL / LOG_LEVELS"""
+    output = logging.StreamHandler(sys.stdout)
+    if LOG_FORMAT == 'json':
+        output.setFormatter(JsonLineFormatter())
+    else:
+        output.setFormatter(logging.Formatter('%(asctime)s %(levelname)s [%(name)s] %(message)s'))
+
+    handler = ProcessQueueHandler(output)
+    # Subsystems explicitly set to DEBUG are being debugged - don't drop their records
+    explicit_debug = []
+
+    root = logging.getLogger('taxi')
+    root.handlers = [handler]
+    root.propagate = False
+    root.setLevel(LOG_LEVEL)
+    for override in filter(None, (item.strip() for item in LOG_LEVELS.split(','))):
+        subsystem, _, level = override.partition('=')
+        if subsystem.strip() not in LOG_SUBSYSTEMS:
+            sys.stdout.write(f"⚠️ Unknown subsystem in LOG_LEVELS: {override}\n")
+            continue
+        try:
+            logging.getLogger(f'taxi.{subsystem.strip()}').setLevel(level.strip().upper())
+        except ValueError:
+            sys.stdout.write(f"⚠️ Ignoring invalid LOG_LEVELS entry: {override}\n")
+            continue
+        if level.strip().upper() == 'DEBUG':
+            explicit_debug.append(f'taxi.{subsystem.strip()}')
+    handler.addFilter(DebugSampler(explicit_debug))
+    atexit.register(handler.stop)
+    return handler
+
+def get_logger(subsystem):
+    """Logger for one of LOG_SUBSYSTEMS"""
+    return logging.getLogger(f'taxi.{subsystem}')
+
+LOG_HANDLER = configure_logging()
+app_log = get_logger('app')
+db_log = get_logger('db')
+auth_log = get_logger('auth')
+sap_log = get_logger('sap')
+directory_log = get_logger('directory')
+budget_log = get_logger('budget')
+mail_log = get_logger('mail')
+whatsapp_log = get_logger('whatsapp')
+scheduler_log = get_logger('scheduler')
+web_log = get_logger('web')
+
 # Application URL Configuration (for email links)
 APP_URL = os.environ.get('APP_URL', 'https://advancedentalclinic.me')
 
-# WhatsApp API Configuration
-WHATSAPP_API_URL = os.environ.get('WHATSAPP_API_URL', 'https://graph.facebook.com/v17.0/')
-META_ACCESS_TOKEN = os.environ.get('META_ACCESS_TOKEN', '')
-WHATSAPP_PHONE_NUMBER_ID = os.environ.get('WHATSAPP_PHONE_NUMBER_ID', '')
-
 # =============================================================================
 # COLUMN CONSTANTS FOR TAXI_REQUESTS TABLE (30 columns)
 # =============================================================================
@@ -97,59 +249,337 @@ app.config['DB_CONFIG'] = {
     'port': os.environ.get('DB_PORT', '5432')
 }
 
-db_pool = pool.SimpleConnectionPool(1, 20, **app.config['DB_CONFIG'])
-
-# Debug: Print database configuration
-print(f"🔍 Database Configuration:")
-print(f"   Host: {app.config['DB_CONFIG']['host']}")
-print(f"   Port: {app.config['DB_CONFIG']['port']}")
-print(f"   Database: {app.config['DB_CONFIG']['dbname']}")
-print(f"   User: {app.config['DB_CONFIG']['user']}")
-print(f"   Password: {'*' * len(app.config['DB_CONFIG']['password'])}")
-
-# Flask Mail Configuration - Using environment variables
-app.config['MAIL_SERVER'] = os.environ.get('MAIL_SERVER', '172.19.0.112')
-app.config['MAIL_PORT'] = int(os.environ.get('MAIL_PORT', '25'))
-app.config['MAIL_USE_TLS'] = os.environ.get('USE_TLS', 'False').lower() == 'true'
-app.config['MAIL_USERNAME'] = os.environ.get('MAIL_USERNAME', 'AskHRNotification@nvtpower.com')
-app.config['MAIL_PASSWORD'] = os.environ.get('MAIL_PASSWORD', '')
-app.config['MAIL_DEFAULT_SENDER'] = os.environ.get('FROM_MAIL', 'DomesticFlightBookingSystem@nvtpower.com')
-app.config['MAIL_USE_SSL'] = False
-app.config['MAIL_DEBUG'] = True
-app.config['MAIL_SUPPRESS_SEND'] = False
-app.config['MAIL_ASCII_ATTACHMENTS'] = False
+# Per-process resources (fork-safe). Nothing below opens a connection at import:
+# the pool and the HTTP session are created on first use in whichever process
+# uses them, so gunicorn --preload can import the app once in the master and
+# every forked worker still gets its own sockets.
+DB_POOL_MIN_CONNECTIONS = int(os.environ.get('DB_POOL_MIN_CONNECTIONS', '1'))
+DB_POOL_MAX_CONNECTIONS = int(os.environ.get('DB_POOL_MAX_CONNECTIONS', '20'))
+
+class LazyConnectionPool:
+    """psycopg2 ThreadedConnectionPool created lazily per process"""
+
+    def __init__(self, minconn, maxconn, **connect_kwargs):
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.connect_kwargs = connect_kwargs
+        self._pool = None
+        self._pid = None
+        self._lock = threading.Lock()
+        # Pools inherited from a parent process: never used or closed here, since
+        # closing would terminate the parent's server sessions on the shared sockets
+        self._inherited = []
+
+    def _current(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    if self._pool is not None:
+                        self._inherited.append(self._pool)
+                    self._pool = pool.ThreadedConnectionPool(self.minconn, self.maxconn, **self.connect_kwargs)
+                    self._pid = os.getpid()
+        return self._pool
+
+    def getconn(self, key=None):
+        return self._current().getconn(key)
+
+    def putconn(self, conn, key=None, close=False):
+        return self._current().putconn(conn, key=key, close=close)
+
+    def closeall(self):
+        """Close this process's connections; the next getconn opens a fresh pool"""
+        with self._lock:
+            if self._pool is not None and self._pid == os.getpid():
+                self._pool.closeall()
+            self._pool = None
+            self._pid = None
+
+    def reset_after_fork(self):
+        """Forget the parent's pool without touching its connections"""
+        self._lock = threading.Lock()
+        if self._pool is not None and self._pid != os.getpid():
+            self._inherited.append(self._pool)
+            self._pool = None
+            self._pid = None
+
+db_pool = LazyConnectionPool(DB_POOL_MIN_CONNECTIONS, DB_POOL_MAX_CONNECTIONS, **app.config['DB_CONFIG'])
+PROCESS_STATE = {'pid': None, 'http_session': None}
+
+def http_session():
+    """Per-process requests.Session so SAP and WhatsApp calls reuse keep-alive connections"""
+    if PROCESS_STATE['pid'] != os.getpid() or PROCESS_STATE['http_session'] is None:
+        PROCESS_STATE['http_session'] = requests.Session()
+        PROCESS_STATE['pid'] = os.getpid()
+    return PROCESS_STATE['http_session']
+
+def log_database_configuration():
+    """Log the database configuration (password masked)"""
+    db_log.info("🔍 Database configuration", extra={'fields': {
+        'host': app.config['DB_CONFIG']['host'],
+        'port': app.config['DB_CONFIG']['port'],
+        'database': app.config['DB_CONFIG']['dbname'],
+        'user': app.config['DB_CONFIG']['user'],
+        'password': '*' * len(app.config['DB_CONFIG']['password'])
+    }})
 
 EMAIL_MODE = 'production'  # Force production mode - always send to actual recipients
 
-# Email Configuration Status
-EMAIL_CONFIGURED = (
-    app.config['MAIL_SERVER'] and
-    app.config['MAIL_USERNAME'] and
-    app.config['MAIL_DEFAULT_SENDER']
-)
+# =============================================================================
+# EXTERNAL SERVICE REGISTRY
+# =============================================================================
+# Mail, WhatsApp and SAP clients are built on first use instead of at import,
+# so a worker (or a CLI command) only pays for the integrations it touches.
+# Each factory runs once per process; reset_after_fork() clears the cache.
+SERVICE_FACTORIES = {}
+SERVICES = {}
+SERVICE_LOCK = threading.Lock()
+
+def register_service(name, factory):
+    """Register a zero-argument factory that builds the named service"""
+    SERVICE_FACTORIES[name] = factory
+
+def get_service(name):
+    """Return the named service, building it on first use"""
+    service = SERVICES.get(name)
+    if service is None:
+        with SERVICE_LOCK:
+            service = SERVICES.get(name)
+            if service is None:
+                service = SERVICE_FACTORIES[name]()
+                SERVICES[name] = service
+    return service
+
+def reset_services():
+    """Drop built services so the next use rebuilds them in this process"""
+    with SERVICE_LOCK:
+        SERVICES.clear()
+
+def build_mail_service():
+    """Flask-Mail client configured from the environment"""
+    from flask_mail import Mail
+
+    # Flask Mail Configuration - Using environment variables
+    app.config['MAIL_SERVER'] = os.environ.get('MAIL_SERVER', '172.19.0.112')
+    app.config['MAIL_PORT'] = int(os.environ.get('MAIL_PORT', '25'))
+    app.config['MAIL_USE_TLS'] = os.environ.get('USE_TLS', 'False').lower() == 'true'
+    app.config['MAIL_USERNAME'] = os.environ.get('MAIL_USERNAME', 'AskHRNotification@nvtpower.com')
+    app.config['MAIL_PASSWORD'] = os.environ.get('MAIL_PASSWORD', '')
+    app.config['MAIL_DEFAULT_SENDER'] = os.environ.get('FROM_MAIL', 'DomesticFlightBookingSystem@nvtpower.com')
+    app.config['MAIL_USE_SSL'] = False
+    app.config['MAIL_DEBUG'] = True
+    app.config['MAIL_SUPPRESS_SEND'] = False
+    app.config['MAIL_ASCII_ATTACHMENTS'] = False
+
+    configured = bool(
+        app.config['MAIL_SERVER'] and
+        app.config['MAIL_USERNAME'] and
+        app.config['MAIL_DEFAULT_SENDER']
+    )
+
+    mail_log.info("📧 Email configuration", extra={'fields': {
+        'server': app.config['MAIL_SERVER'],
+        'port': app.config['MAIL_PORT'],
+        'username': app.config['MAIL_USERNAME'],
+        'from': app.config['MAIL_DEFAULT_SENDER'],
+        'use_tls': app.config['MAIL_USE_TLS'],
+        'mode': EMAIL_MODE,
+        'configured': configured
+    }})
+
+    return {'client': Mail(app), 'configured': configured}
+
+def build_whatsapp_service():
+    """WhatsApp Cloud API settings"""
+    # Base URL up to and including the API version - override to point at a stand-in server (see test_support/)
+    api_url = os.environ.get('WHATSAPP_API_URL', 'https://graph.facebook.com/v21.0/').rstrip('/') + '/'
+    access_token = os.environ.get('META_ACCESS_TOKEN', '')
+    phone_number_id = os.environ.get('WHATSAPP_PHONE_NUMBER_ID', '')
+    configured = bool(access_token and phone_number_id)
+
+    whatsapp_log.info("📱 WhatsApp configuration", extra={'fields': {
+        'api_url': api_url,
+        'access_token': '*' * 20 if access_token else 'NOT SET',
+        'phone_number_id': phone_number_id if phone_number_id else 'NOT SET',
+        'configured': configured
+    }})
+
+    return {
+        'api_url': api_url,
+        'access_token': access_token,
+        'phone_number_id': phone_number_id,
+        'configured': configured
+    }
+
+def email_configured():
+    """True when the mail server, username and sender are all set"""
+    return get_service('mail')['configured']
 
-# Debug: Print email configuration
-print(f"📧 Email Configuration:")
-print(f"   Server: {app.config['MAIL_SERVER']}")
-print(f"   Port: {app.config['MAIL_PORT']}")
-print(f"   Username: {app.config['MAIL_USERNAME']}")
-print(f"   From: {app.config['MAIL_DEFAULT_SENDER']}")
-print(f"   Use TLS: {app.config['MAIL_USE_TLS']}")
-print(f"   Mode: {EMAIL_MODE}")
-print(f"   Configured: {EMAIL_CONFIGURED}")
-
-# Debug: Print WhatsApp configuration
-print(f"📱 WhatsApp Configuration:")
-print(f"   API URL: {WHATSAPP_API_URL}")
-print(f"   Access Token: {'*' * 20 if META_ACCESS_TOKEN else 'NOT SET'}")
-print(f"   Phone Number ID: {WHATSAPP_PHONE_NUMBER_ID if WHATSAPP_PHONE_NUMBER_ID else 'NOT SET'}")
-print(f"   Configured: {bool(META_ACCESS_TOKEN and WHATSAPP_PHONE_NUMBER_ID)}")
+register_service('mail', build_mail_service)
+register_service('whatsapp', build_whatsapp_service)
 
 # Session Configuration
-app.config['SESSION_TYPE'] = 'filesystem'
+# Sessions are stored server-side in web_sessions; the cookie only carries a random
+# session id. A response writes the row only when the serialized session changed,
+# or to push the idle expiry (PERMANENT_SESSION_LIFETIME) forward once it is
+# SESSION_TOUCH_SECONDS old; expired rows are swept by the scheduler.
+# SESSION_BACKEND=cookie falls back to Flask's signed-cookie sessions.
 app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(hours=2)
+SESSION_BACKEND = os.environ.get('SESSION_BACKEND', 'postgres').lower()
+SESSION_TOUCH_SECONDS = int(os.environ.get('SESSION_TOUCH_SECONDS', '300'))
+SESSION_SWEEP_INTERVAL_MINUTES = int(os.environ.get('SESSION_SWEEP_INTERVAL_MINUTES', '15'))
+SESSION_SWEEP_BATCH_SIZE = 1000
+# Logging in or out under an existing session id issues a fresh id
+SESSION_ROTATE_KEYS = ('user', 'admin', 'hod')
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    """Session dict that remembers its id and the payload it was loaded with"""
+
+    def __init__(self, initial=None, sid=None, new=False, stored_payload=None, age_seconds=0, load_failed=False):
+        def on_update(self):
+            self.modified = True
+        CallbackDict.__init__(self, initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+        self.stored_payload = stored_payload
+        self.age_seconds = age_seconds
+        self.load_failed = load_failed
+
+class PostgresSessionInterface(SessionInterface):
+    """Flask session interface backed by the web_sessions table"""
+    serializer = TaggedJSONSerializer()
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid and len(sid) <= 64:
+            conn = db_pool.getconn()
+            try:
+                with conn.cursor() as c:
+                    c.execute('''SELECT data, EXTRACT(EPOCH FROM NOW() - updated_at)
+                                FROM web_sessions
+                                WHERE session_id = %s AND expires_at > NOW()''', (sid,))
+                    row = c.fetchone()
+                conn.rollback()
+            except Exception as e:
+                conn.rollback()
+                auth_log.warning(f"⚠️ Could not load session: {e}")
+                # Treat as logged out for this request, but leave the stored session alone
+                return ServerSideSession(sid=sid, load_failed=True)
+            finally:
+                db_pool.putconn(conn)
+
+            if row:
+                try:
+                    return ServerSideSession(self.serializer.loads(row[0]), sid, stored_payload=row[0],
+                                             age_seconds=float(row[1]))
+                except Exception as e:
+                    auth_log.warning(f"⚠️ Discarding unreadable session: {e}")
+        return ServerSideSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        cookie_name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if session.accessed:
+            response.vary.add('Cookie')
+        if session.load_failed:
+            return
+
+        if not session:
+            if not session.new:
+                delete_web_session(session.sid)
+                response.delete_cookie(cookie_name, domain=domain, path=path)
+            return
+
+        payload = self.serializer.dumps(dict(session))
+        if payload == session.stored_payload:
+            if session.age_seconds >= SESSION_TOUCH_SECONDS:
+                write_web_session(session.sid, None, app.permanent_session_lifetime)
+            return
+
+        sid = session.sid
+        if not session.new and session.stored_payload is not None:
+            stored = self.serializer.loads(session.stored_payload)
+            if any((key in stored) != (key in session) for key in SESSION_ROTATE_KEYS):
+                delete_web_session(sid)
+                sid = secrets.token_urlsafe(32)
+
+        saved = write_web_session(sid, payload, app.permanent_session_lifetime)
+        if saved and (session.new or sid != session.sid):
+            response.set_cookie(
+                cookie_name, sid,
+                expires=self.get_expiration_time(app, session),
+                httponly=self.get_cookie_httponly(app),
+                domain=domain,
+                path=path,
+                secure=self.get_cookie_secure(app),
+                samesite=self.get_cookie_samesite(app)
+            )
 
-mail = Mail(app)
+def write_web_session(sid, payload, lifetime):
+    """Store a session (payload None only extends its expiry); returns True on success"""
+    conn = db_pool.getconn()
+    try:
+        with conn.cursor() as c:
+            if payload is None:
+                c.execute('''UPDATE web_sessions
+                            SET expires_at = NOW() + %s * INTERVAL '1 second', updated_at = NOW()
+                            WHERE session_id = %s''', (lifetime.total_seconds(), sid))
+            else:
+                c.execute('''INSERT INTO web_sessions (session_id, data, expires_at, updated_at)
+                            VALUES (%s, %s, NOW() + %s * INTERVAL '1 second', NOW())
+                            ON CONFLICT (session_id) DO UPDATE SET
+                            data = EXCLUDED.data,
+                            expires_at = EXCLUDED.expires_at,
+                            updated_at = NOW()''', (sid, payload, lifetime.total_seconds()))
+        conn.commit()
+        return True
+    except Exception as e:
+        conn.rollback()
+        auth_log.error(f"❌ Could not save session: {e}")
+        return False
+    finally:
+        db_pool.putconn(conn)
+
+def delete_web_session(sid):
+    """Remove a stored session"""
+    conn = db_pool.getconn()
+    try:
+        with conn.cursor() as c:
+            c.execute('DELETE FROM web_sessions WHERE session_id = %s', (sid,))
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        auth_log.warning(f"⚠️ Could not delete session: {e}")
+    finally:
+        db_pool.putconn(conn)
+
+def sweep_expired_sessions():
+    """Delete expired web_sessions rows in batches"""
+    stats = {'rows_scanned': 0}
+    conn = db_pool.getconn()
+    try:
+        while True:
+            with conn.cursor() as c:
+                c.execute('''DELETE FROM web_sessions WHERE session_id IN (
+                                SELECT session_id FROM web_sessions
+                                WHERE expires_at < NOW()
+                                LIMIT %s)''', (SESSION_SWEEP_BATCH_SIZE,))
+                deleted = c.rowcount
+            conn.commit()
+            stats['rows_scanned'] += deleted
+            if deleted < SESSION_SWEEP_BATCH_SIZE:
+                break
+    except Exception as e:
+        conn.rollback()
+        auth_log.error(f"❌ Error sweeping expired sessions: {e}")
+        stats['error'] = str(e)
+    finally:
+        db_pool.putconn(conn)
+    return stats
+
+if SESSION_BACKEND == 'postgres':
+    app.session_interface = PostgresSessionInterface()
 
 # SAP API Configuration
 SAP_CONFIG = {
@@ -455,17 +885,12 @@ RAJAN_MANAGER_INFO = {
     'manager_phone': '9915591935'
 }
 
-DEPARTMENT_MANAGER_MAPPING_LOWER = {
-    name.lower(): manager_info for name, manager_info in DEPARTMENT_MANAGER_MAPPING.items()
-}
-
-
 def get_department_manager(department_name):
     """Return a copy of the department manager mapping, case-insensitive."""
     if not department_name:
         return None
     dept_key = department_name.strip().lower()
-    manager_info = DEPARTMENT_MANAGER_MAPPING_LOWER.get(dept_key)
+    manager_info = get_org_directory()['department_managers'].get(dept_key)
     if manager_info:
         return {**manager_info}
     return None
@@ -479,70 +904,197 @@ def set_manager_fields(target, manager_info):
     target['manager_phone'] = manager_info.get('manager_phone', '')
 
 
-def determine_location_based_manager(user_record):
-    """Determine manager overrides based on location and department."""
+MOHIT_MANAGER_INFO = {
+    'manager_id': '9023422',
+    'manager_name': 'Mohit Agarwal',
+    'manager_email': 'mohit.agarwal@nvtpower.com',
+    'manager_phone': '7743967028'
+}
+
+PAWAN_MANAGER_INFO = {
+    'manager_id': '9022826',
+    'manager_name': 'Pawan Tyagi',
+    'manager_email': 'pawan.tyagi@nvtpower.com',
+    'manager_phone': '+919765497863'
+}
+
+# The override tables below seed org_directory; at runtime the rules come from
+# the directory snapshot (see ORGANISATION DIRECTORY).
+
+# Employees whose requests route to Mohit Agarwal instead of their SAP manager
+APPROVER_EMP_CODE_OVERRIDES = {
+    '9023649': MOHIT_MANAGER_INFO,  # Jayesh Sinha
+    '9025421': MOHIT_MANAGER_INFO,  # Rajan Vashisht
+    '9024436': MOHIT_MANAGER_INFO,  # Ankur Tandon
+    '9023422': MOHIT_MANAGER_INFO,  # Mohit Agarwal (himself)
+    '9017113': MOHIT_MANAGER_INFO,  # Tribhuvan Agnihotri
+    '9021930': MOHIT_MANAGER_INFO,  # Brijesh Rao
+    '9022826': MOHIT_MANAGER_INFO,  # Pawan Kumar Tyagi
+    '9023418': MOHIT_MANAGER_INFO,  # Nishant Sharma
+    '9012706': MOHIT_MANAGER_INFO,  # Manoj Saini
+    '9025968': MOHIT_MANAGER_INFO,  # Vivek Saini
+    '9024785': MOHIT_MANAGER_INFO,  # Vinod Kumar
+    '9022761': MOHIT_MANAGER_INFO,  # Nitika Arora
+    '9025802': MOHIT_MANAGER_INFO   # Shivam Chaturvedi
+}
+
+# Whole divisions routed to one approver (matched as a substring of the SAP division)
+EV_DIVISION = 'ELECTRIC VEHICLE BUSINESS'
+APPROVER_DIVISION_OVERRIDES = {
+    EV_DIVISION: PAWAN_MANAGER_INFO
+}
+
+# Departments routed to a fixed approver wherever the employee is located
+APPROVER_DEPARTMENT_OVERRIDES = {
+    'industrial relations': DEPARTMENT_MANAGER_MAPPING['Industrial Relations'],
+    'admin': DEPARTMENT_MANAGER_MAPPING['Admin'],
+    'project management': DEPARTMENT_MANAGER_MAPPING['Project Management'],
+    'information technology': DEPARTMENT_MANAGER_MAPPING['Information Technology'],
+    'security': RAJAN_MANAGER_INFO,
+    'environment health & safety': RAJAN_MANAGER_INFO,
+    'technical service & infrastructure': TRIBHUVAN_MANAGER_INFO
+}
+
+# Rule tables in precedence order - the first table with a matching key wins.
+# Location/department rules beat the EV division and emp_code overrides, matching
+# the order the overrides used to be applied in login/dashboard/submit.
+APPROVAL_ROUTING_ORDER = ('department', 'location_department', 'division', 'emp_code', 'department_mapping')
+
+def compile_approval_routing(directory):
+    """Flatten a directory snapshot's approver rules into per-rule dicts of key -> {'manager', 'reason'}"""
+    def entry(manager_info, reason):
+        return {'manager': manager_info, 'reason': f"{reason} -> {manager_info.get('manager_name', 'N/A')}"}
+
+    location_department = {
+        (location, department): entry(manager_info, f"{location.title()} department '{department}'")
+        for (location, department), manager_info in directory['location_departments'].items()
+    }
+    # At these locations the department mapping beats division/emp_code overrides
+    for location in DEPARTMENT_MAPPING_LOCATIONS:
+        for department, manager_info in directory['department_managers'].items():
+            location_department.setdefault(
+                (location, department), entry(manager_info, f"{location.title()} department '{department}'"))
+
+    return {
+        'department': {
+            department: entry(manager_info, f"department '{department}'")
+            for department, manager_info in directory['department_overrides'].items()
+        },
+        'location_department': location_department,
+        'division': {
+            division: entry(manager_info, f"division '{division.title()}'")
+            for division, manager_info in directory['division_overrides'].items()
+        },
+        'emp_code': {
+            emp_code: entry(manager_info, f"employee {emp_code} override")
+            for emp_code, manager_info in directory['emp_code_overrides'].items()
+        },
+        'department_mapping': {
+            department: entry(manager_info, f"department mapping '{department}'")
+            for department, manager_info in directory['department_managers'].items()
+        }
+    }
+
+def approval_routing_keys(user_record, division_names=()):
+    """Normalized lookup key for each rule table"""
     location = (user_record.get('location') or '').strip().lower()
     department = (user_record.get('department') or '').strip().lower()
+    division = (user_record.get('division') or '').strip().upper()
+    division = next((name for name in division_names if name in division), division)
+    return {
+        'department': department,
+        'location_department': (location, department),
+        'division': division,
+        'emp_code': str(user_record.get('emp_code') or '').strip(),
+        'department_mapping': department
+    }
 
-    if department == 'industrial relations':
-        dept_manager = get_department_manager('Industrial Relations')
-        if dept_manager:
-            return dept_manager
-
-    if department == 'admin':
-        dept_manager = get_department_manager('Admin')
-        if dept_manager:
-            return dept_manager
-
-    if department == 'project management':
-        dept_manager = get_department_manager('Project Management')
-        if dept_manager:
-            return dept_manager
-
-    if department == 'information technology':
-        dept_manager = get_department_manager('Information Technology')
-        if dept_manager:
-            return dept_manager
-
-    if department in ('security', 'environment health & safety'):
-        return {**RAJAN_MANAGER_INFO}
-
-    if department == 'technical service & infrastructure':
-        return {**TRIBHUVAN_MANAGER_INFO}
-
-    if location == 'manesar':
-        if department in MANESAR_DEPARTMENTS_FOR_MANOJ:
-            return {**MANOJ_MANAGER_INFO}
-        if department in MANESAR_DEPARTMENTS_FOR_ANKUR:
-            return {**ANKUR_MANAGER_INFO}
-        if department in MANESAR_DEPARTMENTS_FOR_SHIVAM:
-            return {**SHIVAM_MANAGER_INFO}
-
-    if location == 'bawal':
-        dept_manager = get_department_manager(user_record.get('department', ''))
-        if dept_manager:
-            return dept_manager
-
+def resolve_approver(user_record, routing=None):
+    """
+    Find the approver for an employee. Returns {'manager', 'rule', 'reason'} for the
+    first matching rule, or None when the SAP reporting manager should be kept.
+    """
+    routing = routing or get_org_directory()['routing']
+    keys = approval_routing_keys(user_record, routing['division'])
+    for rule in APPROVAL_ROUTING_ORDER:
+        match = routing[rule].get(keys[rule])
+        if match:
+            return {'manager': {**match['manager']}, 'rule': rule, 'reason': match['reason']}
     return None
 
-
-def apply_location_based_manager(user_record, display_target=None, log_context=''):
-    """Apply location-based manager overrides to the user/session and optional display target."""
-    manager_override = determine_location_based_manager(user_record)
-    if manager_override:
-        set_manager_fields(user_record, manager_override)
+def apply_approval_route(user_record, display_target=None, log_context=''):
+    """Apply the resolved approver to the user/session and optional display target."""
+    route = resolve_approver(user_record)
+    if route:
+        set_manager_fields(user_record, route['manager'])
         if display_target is not None:
-            set_manager_fields(display_target, manager_override)
+            set_manager_fields(display_target, route['manager'])
         if log_context:
-            print(
-                f"✅ {log_context}: Location-based manager override -> "
-                f"{manager_override.get('manager_name', 'N/A')} "
-                f"({manager_override.get('manager_email', 'N/A')})"
+            directory_log.debug(
+                f"✅ {log_context}: Approver {route['manager'].get('manager_name', 'N/A')} "
+                f"({route['manager'].get('manager_email', 'N/A')}) via {route['reason']}"
             )
-    return manager_override
+    return route
+
+def benchmark_approval_routing(iterations=1000):
+    """Time resolve_approver over every known employee and count which rules matched"""
+    directory = get_org_directory()
+    employees = [dict(employee) for employee in directory['hardcoded_employees'].values()]
+
+    # Employees who have raised requests (department only - location/division aren't stored)
+    try:
+        conn = db_pool.getconn()
+        try:
+            with conn.cursor() as c:
+                c.execute('''SELECT DISTINCT ON (emp_code) emp_code, department
+                            FROM taxi_requests ORDER BY emp_code, created_at DESC''')
+                employees += [{'emp_code': row[0], 'department': row[1]} for row in c.fetchall()]
+        finally:
+            db_pool.putconn(conn)
+    except Exception as e:
+        directory_log.warning(f"⚠️ Could not load employees from taxi_requests: {e}")
+
+    # Plus every location/department/division combination the rules know about
+    departments = set(directory['department_managers']) | set(directory['department_overrides'])
+    departments |= {department for _, department in directory['location_departments']}
+    locations = {location for location, _ in directory['location_departments']} | set(DEPARTMENT_MAPPING_LOCATIONS)
+    divisions = [division.title() for division in directory['division_overrides']] + ['Corporate']
+    for location in sorted(locations) + ['']:
+        for department in sorted(departments) + ['Unmapped']:
+            for division in divisions:
+                employees.append({'emp_code': '', 'location': location.title(), 'department': department.title(), 'division': division})
+    employees += [{'emp_code': emp_code, 'department': 'Unmapped'} for emp_code in directory['emp_code_overrides']]
+
+    rule_counts = {rule: 0 for rule in APPROVAL_ROUTING_ORDER}
+    rule_counts['sap_manager'] = 0
+    for employee in employees:
+        route = resolve_approver(employee)
+        rule_counts[route['rule'] if route else 'sap_manager'] += 1
+
+    routing = directory['routing']
+    started = time.perf_counter()
+    for _ in range(iterations):
+        for employee in employees:
+            resolve_approver(employee, routing)
+    elapsed = time.perf_counter() - started
+    resolutions = iterations * len(employees)
+
+    result = {
+        'directory_version': directory['version'],
+        'employees': len(employees),
+        'resolutions': resolutions,
+        'total_seconds': round(elapsed, 4),
+        'microseconds_per_resolution': round(elapsed / resolutions * 1e6, 3) if resolutions else 0,
+        'rule_counts': rule_counts
+    }
+    directory_log.info(f"🧭 Approval routing: {result['employees']} employees x {iterations} = {resolutions} resolutions "
+          f"in {result['total_seconds']}s ({result['microseconds_per_resolution']} µs each)")
+    for rule, count in rule_counts.items():
+        directory_log.info(f"   {rule}: {count}")
+    return result
 
 
-# Hardcoded Employees - Not in SAP API but need access to book taxi requests
+# Hardcoded Employees - Not in SAP API but need access to book taxi requests (org_directory seed)
 HARDCODED_EMPLOYEES = {
     '7001009': {
         'emp_code': '7001009',
@@ -708,149 +1260,259 @@ def allowed_file(filename):
 def test_db_connection():
     """Test database connection before starting the app"""
     try:
-        print(f"🧪 Testing database connection...")
+        db_log.info(f"🧪 Testing database connection...")
         conn = db_pool.getconn()
         with conn.cursor() as c:
             c.execute('SELECT version()')
             version = c.fetchone()
-            print(f"✅ Database connection test successful")
-            print(f"   PostgreSQL version: {version[0]}")
+            db_log.info(f"✅ Database connection test successful")
+            db_log.debug(f"   PostgreSQL version: {version[0]}")
         db_pool.putconn(conn)
         return True
     except Exception as e:
-        print(f"❌ Database connection test failed: {str(e)}")
+        db_log.error(f"❌ Database connection test failed: {str(e)}")
         return False
 
+def get_taxi_requests_columns(c, table='taxi_requests'):
+    """Column names of a table in ordinal order (empty if the table doesn't exist)"""
+    c.execute('''SELECT column_name FROM information_schema.columns
+                WHERE table_schema = current_schema() AND table_name = %s
+                ORDER BY ordinal_position''', (table,))
+    return [row[0] for row in c.fetchall()]
+
 def check_and_fix_table_structure():
-    """Check if taxi_requests table has correct column order and fix if needed"""
+    """
+    Check that taxi_requests columns are in the order the column constants expect.
+    Drift is only reported; `python -m app rebuild-taxi-requests` fixes it online.
+    """
     conn = db_pool.getconn()
     try:
         with conn.cursor() as c:
-            # Check if table exists
-            c.execute("""
-                SELECT EXISTS (
-                    SELECT FROM information_schema.tables
-                    WHERE table_name = 'taxi_requests'
-                )
-            """)
-            table_exists = c.fetchone()[0]
+            current_columns = get_taxi_requests_columns(c)
+        conn.rollback()
+    except Exception as e:
+        conn.rollback()
+        db_log.error(f"❌ Error checking table structure: {str(e)}")
+        return False
+    finally:
+        db_pool.putconn(conn)
 
-            if not table_exists:
-                print("📝 taxi_requests table does not exist - will be created with correct structure")
-                return True
+    if not current_columns:
+        db_log.info("📝 taxi_requests table does not exist - will be created with correct structure")
+        return True
+    if current_columns == TAXI_REQUESTS_COLUMNS:
+        db_log.info("✅ taxi_requests table has correct column order")
+        return True
 
-            # Get current column order
-            c.execute("""
-                SELECT column_name
-                FROM information_schema.columns
-                WHERE table_name = 'taxi_requests'
-                ORDER BY ordinal_position
-            """)
-            current_columns = [row[0] for row in c.fetchall()]
-
-            # Expected column order
-            expected_columns = [
-                'id', 'emp_code', 'employee_name', 'employee_email', 'employee_phone',
-                'department', 'from_location', 'to_location', 'travel_date', 'travel_time',
-                'purpose', 'passengers', 'status', 'manager_email', 'hod_response',
-                'hod_approval_date', 'admin_response', 'taxi_details', 'submission_date',
-                'admin_response_date', 'created_at', 'assigned_cost', 'type_of_ride',
-                'vehicle_company', 'vehicle_type', 'vehicle_number', 'returning_ride',
-                'return_from_location', 'return_to_location', 'return_time'
-            ]
+    db_log.warning("⚠️ taxi_requests table has incorrect column order - run `python -m app rebuild-taxi-requests` "
+          "to rebuild it online (batched copy, short final swap)")
+    return False
 
-            if current_columns == expected_columns:
-                print("✅ taxi_requests table has correct column order")
-                return True
-            else:
-                print("⚠️ taxi_requests table has incorrect column order - fixing...")
-
-                # Create backup
-                backup_table = f"taxi_requests_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-                c.execute(f"CREATE TABLE {backup_table} AS SELECT * FROM taxi_requests")
-                print(f"✅ Backup created: {backup_table}")
-
-                # Create new table with correct order
-                c.execute('''CREATE TABLE taxi_requests_new
-                            (id TEXT PRIMARY KEY,                    -- 0
-                             emp_code TEXT NOT NULL,                 -- 1
-                             employee_name TEXT NOT NULL,            -- 2
-                             employee_email TEXT NOT NULL,           -- 3
-                             employee_phone TEXT NOT NULL,           -- 4
-                             department TEXT,                        -- 5
-                             from_location TEXT NOT NULL,            -- 6
-                             to_location TEXT NOT NULL,              -- 7
-                             travel_date DATE NOT NULL,              -- 8
-                             travel_time TIME NOT NULL,              -- 9
-                             purpose TEXT NOT NULL,                  -- 10
-                             passengers INTEGER DEFAULT 1,           -- 11
-                             status TEXT DEFAULT 'Pending Manager Approval', -- 12
-                             manager_email TEXT,                     -- 13
-                             hod_response TEXT,                      -- 14
-                             hod_approval_date TIMESTAMP,            -- 15
-                             admin_response TEXT,                    -- 16
-                             taxi_details TEXT,                      -- 17
-                             submission_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP, -- 18
-                             admin_response_date TIMESTAMP,          -- 19
-                             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, -- 20
-                             assigned_cost DECIMAL(10,2) DEFAULT 0.00, -- 21
-                             type_of_ride TEXT DEFAULT 'company_taxi', -- 22
-                             vehicle_company TEXT,                   -- 23
-                             vehicle_type TEXT,                      -- 24
-                             vehicle_number TEXT,                    -- 25
-                             returning_ride TEXT DEFAULT 'no',       -- 26
-                             return_from_location TEXT,              -- 27
-                             return_to_location TEXT,                -- 28
-                             return_time TIME)                       -- 29
-                             ''')
-
-                # Copy data in correct order
-                column_list = ", ".join(expected_columns)
-                c.execute(f"""
-                    INSERT INTO taxi_requests_new ({column_list})
-                    SELECT {column_list} FROM taxi_requests
-                """)
-
-                # Replace old table
-                c.execute("DROP TABLE taxi_requests")
-                c.execute("ALTER TABLE taxi_requests_new RENAME TO taxi_requests")
+def seed_initial_data(conn):
+    """One-time seed of HODs, admins and the organisation directory (first migrate only)"""
+    with conn.cursor() as c:
+        # Insert HOD (only 9025857)
+        hods_data = [
+            ('9025857', 'Piyush Tiwari', 'piyush.tiwari@nvtpower.com', '6395747398', 'Center of Excellence')
+        ]
+
+        for hod in hods_data:
+            c.execute('''INSERT INTO hods (emp_code, hod_name, hod_email, hod_phone, department)
+                        VALUES (%s, %s, %s, %s, %s)
+                        ON CONFLICT (emp_code) DO UPDATE SET
+                        hod_name = EXCLUDED.hod_name,
+                        hod_email = EXCLUDED.hod_email,
+                        hod_phone = EXCLUDED.hod_phone,
+                        department = EXCLUDED.department''', hod)
+
+        # Insert admins (9025857 as both HOD and Admin, 9022761 as Admin)
+        admins_data = [
+            ('9025857', 'Piyush Tiwari', 'piyush.tiwari@nvtpower.com', '6395747398', 'admin123'),
+            ('9022761', 'Nitika Arora', 'nitika.arora@nvtpower.com', '9765499226', 'admin123')
+        ]
+
+        for admin in admins_data:
+            c.execute('''INSERT INTO admins (emp_code, admin_name, admin_email, admin_phone, password)
+                        VALUES (%s, %s, %s, %s, %s)
+                        ON CONFLICT (emp_code) DO UPDATE SET
+                        admin_name = EXCLUDED.admin_name,
+                        admin_email = EXCLUDED.admin_email,
+                        admin_phone = EXCLUDED.admin_phone''', admin)
+
+        seed_org_directory(c)
+        c.execute('''INSERT INTO org_directory_version (id, version, seeded_at)
+                    VALUES (1, 1, NOW())
+                    ON CONFLICT (id) DO UPDATE SET seeded_at = NOW()''')
+    db_log.info("✅ Seeded HODs, admins and organisation directory")
+
+def seed_hod_budgets(c, current_year):
+    """Create the year's HOD budget rows for department managers"""
+    # Insert initial HOD budget data for department managers
+    hod_budget_data = [
+        # Managers found in initial hod_budget_data
+        ('9025802', 'Shivam Chaturvedi', 'shivam.chaturvedi@nvtpower.com', 50000.00, 0.00, 50000.00),
+        ('9013753', 'Sudarshan Kumar', 'sudarshan.kumar@nvtpower.com', 50000.00, 0.00, 50000.00),
+        ('9017113', 'Tribhuvan Agnihotri', 'tribhuvan.agnihotri@nvtpower.com', 50000.00, 0.00, 50000.00),
+        ('9023422', 'Mohit Agarwal', 'mohit.agarwal@nvtpower.com', 50000.00, 0.00, 50000.00),
+        ('9022761', 'Nitika Arora', 'nitika.arora@nvtpower.com', 50000.00, 0.00, 50000.00),
+        ('9025421', 'Rajan Vashisht', 'rajan.vashisht@nvtpower.com', 50000.00, 0.00, 50000.00),
+        ('9023649', 'Jayesh Sinha', 'jayesh.sinha@nvtpower.com', 50000.00, 0.00, 50000.00),
+        ('9012706', 'Manoj Saini', 'manoj.saini@nvtpower.com', 50000.00, 0.00, 50000.00),
+
+        # Managers missing in initial hod_budget_data but in DEPARTMENT_MANAGER_MAPPING
+        ('9024436', 'Ankur Tandon', 'ankur.tandon@nvtpower.com', 50000.00, 0.00, 50000.00),
+        ('9024982', 'V G Padmanabhan', 'vg.padmanabhan@nvtpower.com', 50000.00, 0.00, 50000.00),
+        ('9023418', 'Nishant Sharma', 'nishant.sharma@nvtpower.com', 50000.00, 0.00, 50000.00),
+        ('9024785', 'Vinod Kumar', 'vinod.kumar@nvtpower.com', 50000.00, 0.00, 50000.00),
+        (' 9022826', 'Pawan Tyagi', 'pawan.tyagi@nvtpower.com', 50000.00, 0.00, 50000.00),
+    ]
+
+    for hod_budget in hod_budget_data:
+        c.execute('''INSERT INTO hod_budget (hod_emp_code, hod_name, hod_email, total_budget, used_budget, remaining_budget, budget_year)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s)
+                    ON CONFLICT (hod_emp_code, budget_year) DO UPDATE SET
+                    hod_name = EXCLUDED.hod_name,
+                    hod_email = EXCLUDED.hod_email''',
+                    (hod_budget[0], hod_budget[1], hod_budget[2], hod_budget[3], hod_budget[4], hod_budget[5], current_year))
+
+# =============================================================================
+# SCHEMA MIGRATIONS
+# =============================================================================
+# Schema changes live in migrations/NNNN_description.sql and are applied in
+# order by `python -m app migrate` at release time (Procfile release phase).
+# Each file runs in its own transaction and is recorded in schema_version;
+# web and worker processes only compare MAX(version) with the newest bundled
+# file at startup and never run DDL or seed upserts themselves.
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+MIGRATION_FILE_PATTERN = re.compile(r'^(\d{4})_([\w-]+)\.sql$')
+MIGRATION_LOCK_KEY = 727003
+
+def list_migrations():
+    """Bundled migrations as [(version, name, path)] in version order"""
+    migrations = []
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)) if os.path.isdir(MIGRATIONS_DIR) else []:
+        match = MIGRATION_FILE_PATTERN.match(filename)
+        if match:
+            migrations.append((int(match.group(1)), match.group(2), os.path.join(MIGRATIONS_DIR, filename)))
+    return migrations
+
+def ensure_budget_year(c, current_year):
+    """Create the company and HOD budget rows for a year that has none yet"""
+    c.execute('SELECT COUNT(*) FROM budget_management WHERE budget_year = %s', (current_year,))
+    if c.fetchone()[0] == 0:
+        c.execute('''INSERT INTO budget_management (total_budget, used_budget, remaining_budget, budget_year)
+                    VALUES (100000.00, 0.00, 100000.00, %s)''', (current_year,))
+
+    # HOD budgets are seeded once per year
+    c.execute('SELECT COUNT(*) FROM hod_budget WHERE budget_year = %s', (current_year,))
+    if c.fetchone()[0] == 0:
+        seed_hod_budgets(c, current_year)
+
+def migrate_db():
+    """Apply pending migrations, then one-time seed data (python -m app migrate); returns the schema version"""
+    db_log.debug(f"🔍 Migrating database {app.config['DB_CONFIG']['dbname']} on {app.config['DB_CONFIG']['host']}...")
+    conn = db_pool.getconn()
+    try:
+        with conn.cursor() as c:
+            # Only one migrator at a time, e.g. overlapping release phases
+            c.execute('SELECT pg_advisory_lock(%s)', (MIGRATION_LOCK_KEY,))
+            c.execute('''CREATE TABLE IF NOT EXISTS schema_version
+                        (version INTEGER PRIMARY KEY,
+                         name TEXT NOT NULL,
+                         checksum TEXT NOT NULL,
+                         applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
+            c.execute('SELECT version, checksum FROM schema_version')
+            applied = dict(c.fetchall())
+        conn.commit()
+
+        # Older databases may still have taxi_requests columns out of order (reported only)
+        db_log.debug("🔍 Checking taxi_requests table structure...")
+        check_and_fix_table_structure()
 
+        for version, name, path in list_migrations():
+            with open(path, encoding='utf-8') as migration_file:
+                sql = migration_file.read()
+            checksum = hashlib.sha256(sql.encode()).hexdigest()
+
+            if version in applied:
+                if applied[version] != checksum:
+                    db_log.warning(f"⚠️ Migration {version:04d}_{name} was edited after it was applied - add a new migration instead")
+                continue
+
+            started = time.monotonic()
+            try:
+                with conn.cursor() as c:
+                    c.execute(sql)
+                    c.execute('INSERT INTO schema_version (version, name, checksum) VALUES (%s, %s, %s)',
+                              (version, name, checksum))
                 conn.commit()
-                print("✅ taxi_requests table structure fixed successfully")
-                return True
+            except Exception as e:
+                conn.rollback()
+                db_log.error(f"❌ Migration {version:04d}_{name} failed: {e}")
+                raise
+            db_log.info(f"✅ Applied migration {version:04d}_{name} in {(time.monotonic() - started) * 1000:.0f} ms")
+
+        with conn.cursor() as c:
+            # Seed data is written once; after that the tables are edited in place
+            c.execute('SELECT seeded_at FROM org_directory_version WHERE id = 1')
+            first_seed = c.fetchone() is None
 
+        if first_seed:
+            seed_initial_data(conn)
+
+        with conn.cursor() as c:
+            ensure_budget_year(c, datetime.now().year)
+            c.execute('SELECT COALESCE(MAX(version), 0) FROM schema_version')
+            schema_version = c.fetchone()[0]
+        conn.commit()
+        db_log.info(f"✅ Database at schema version {schema_version}")
+        return schema_version
     except Exception as e:
-        print(f"❌ Error fixing table structure: {str(e)}")
         conn.rollback()
-        return False
+        db_log.error(f"❌ Database migration error: {str(e)}")
+        raise
     finally:
-        db_pool.putconn(conn)
-
-def init_db():
-    print(f"🔍 Initializing database...")
-    print(f"   Using database: {app.config['DB_CONFIG']['dbname']}")
+        try:
+            with conn.cursor() as c:
+                c.execute('SELECT pg_advisory_unlock(%s)', (MIGRATION_LOCK_KEY,))
+            conn.commit()
+        finally:
+            db_pool.putconn(conn)
 
+def check_schema_version():
+    """Startup check - one query comparing the database's schema version with the bundled migrations"""
+    migrations = list_migrations()
+    expected = migrations[-1][0] if migrations else 0
     try:
         conn = db_pool.getconn()
-        print(f"✅ Database connection successful")
+        try:
+            with conn.cursor() as c:
+                c.execute('SELECT MAX(version) FROM schema_version')
+                current = c.fetchone()[0] or 0
+            conn.rollback()
+        finally:
+            db_pool.putconn(conn)
     except Exception as e:
-        print(f"❌ Database connection failed: {str(e)}")
-        print(f"   Please check your database configuration:")
-        print(f"   - Database: {app.config['DB_CONFIG']['dbname']}")
-        print(f"   - Host: {app.config['DB_CONFIG']['host']}")
-        print(f"   - Port: {app.config['DB_CONFIG']['port']}")
-        print(f"   - User: {app.config['DB_CONFIG']['user']}")
-        raise
-
-    try:
-        # First check and fix table structure if needed
-        print("🔍 Checking taxi_requests table structure...")
-        check_and_fix_table_structure()
+        db_log.error(f"❌ Schema version check failed ({str(e).strip()}) - run `python -m app migrate`")
+        return False
 
-        with conn.cursor() as c:
-            # Create taxi_requests table with correct column order (30 columns)
-            # This ensures consistent column indexing across different devices
-            c.execute('''CREATE TABLE IF NOT EXISTS taxi_requests
+    if current < expected:
+        db_log.warning(f"⚠️ Database schema is at version {current} but this release expects {expected} - run `python -m app migrate`")
+        return False
+    db_log.info(f"✅ Database schema version {current}")
+    return True
+
+# Online rebuild of taxi_requests into the expected column order. Rows are copied
+# into taxi_requests_new in keyset batches while a row trigger mirrors concurrent
+# inserts/updates/deletes; progress is kept in table_rebuilds so an interrupted
+# run resumes. The swap (rename both tables, re-point foreign keys NOT VALID)
+# happens in one short transaction under lock_timeout; the old table is kept.
+TABLE_REBUILD_BATCH_SIZE = int(os.environ.get('TABLE_REBUILD_BATCH_SIZE', '1000'))
+TABLE_REBUILD_PAUSE_SECONDS = float(os.environ.get('TABLE_REBUILD_PAUSE_SECONDS', '0.2'))
+TABLE_REBUILD_LOCK_TIMEOUT_MS = int(os.environ.get('TABLE_REBUILD_LOCK_TIMEOUT_MS', '3000'))
+TABLE_REBUILD_SWAP_RETRIES = 5
+TAXI_REQUESTS_COLUMNS = sorted(COLUMN_INDEX_MAP, key=COLUMN_INDEX_MAP.get)
+TAXI_REQUESTS_NEW_DDL = '''CREATE TABLE IF NOT EXISTS taxi_requests_new
                         (id TEXT PRIMARY KEY,                    -- 0
                          emp_code TEXT NOT NULL,                 -- 1
                          employee_name TEXT NOT NULL,            -- 2
@@ -881,194 +1543,222 @@ def init_db():
                          return_from_location TEXT,              -- 27
                          return_to_location TEXT,                -- 28
                          return_time TIME)                       -- 29
-                         ''')
-
-            # Create login_logs table if it doesn't exist
-            c.execute('''CREATE TABLE IF NOT EXISTS login_logs
-                        (id SERIAL PRIMARY KEY,
-                         emp_code TEXT NOT NULL,
-                         employee_name TEXT NOT NULL,
-                         login_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                         ip_address TEXT,
-                         success BOOLEAN DEFAULT TRUE,
-                         error_message TEXT)''')
-
-            # Create HODs table if it doesn't exist
-            c.execute('''CREATE TABLE IF NOT EXISTS hods
-                        (id SERIAL PRIMARY KEY,
-                         emp_code TEXT UNIQUE NOT NULL,
-                         hod_name TEXT NOT NULL,
-                         hod_email TEXT NOT NULL,
-                         hod_phone TEXT NOT NULL,
-                         department TEXT NOT NULL,
-                         password TEXT NOT NULL DEFAULT 'admin123',
-                         is_active BOOLEAN DEFAULT TRUE,
-                         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
-
-            # Create taxi_feedback table if it doesn't exist
-            c.execute('''CREATE TABLE IF NOT EXISTS taxi_feedback
-                        (id SERIAL PRIMARY KEY,
-                         request_id TEXT NOT NULL,
-                         emp_code TEXT NOT NULL,
-                         employee_name TEXT NOT NULL,
-                         employee_email TEXT NOT NULL,
-                         rating INTEGER NOT NULL CHECK (rating >= 1 AND rating <= 5),
-                         comment TEXT,
-                         start_meter DECIMAL(10,2),
-                         end_meter DECIMAL(10,2),
-                         total_distance DECIMAL(10,2),
-                         feedback_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                         FOREIGN KEY (request_id) REFERENCES taxi_requests(id) ON DELETE CASCADE)''')
-
-            # Create admins table if it doesn't exist
-            c.execute('''CREATE TABLE IF NOT EXISTS admins
-                        (id SERIAL PRIMARY KEY,
-                         emp_code TEXT UNIQUE NOT NULL,
-                         admin_name TEXT NOT NULL,
-                         admin_email TEXT NOT NULL,
-                         admin_phone TEXT NOT NULL,
-                         password TEXT NOT NULL DEFAULT 'admin123',
-                         is_active BOOLEAN DEFAULT TRUE,
-                         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
-
-            # Create managers table if it doesn't exist
-            c.execute('''CREATE TABLE IF NOT EXISTS managers
-                        (id SERIAL PRIMARY KEY,
-                         emp_code TEXT UNIQUE NOT NULL,
-                         manager_name TEXT NOT NULL,
-                         manager_email TEXT NOT NULL,
-                         manager_phone TEXT,
-                         department TEXT,
-                         is_active BOOLEAN DEFAULT TRUE,
-                         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
-
-            # Create budget_management table if it doesn't exist
-            c.execute('''CREATE TABLE IF NOT EXISTS budget_management
-                        (id SERIAL PRIMARY KEY,
-                         total_budget DECIMAL(12,2) DEFAULT 100000.00,
-                         used_budget DECIMAL(12,2) DEFAULT 0.00,
-                         remaining_budget DECIMAL(12,2) DEFAULT 100000.00,
-                         budget_year INTEGER UNIQUE DEFAULT EXTRACT(YEAR FROM CURRENT_DATE),
-                         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                         updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
-
-            # Create taxi_reason table if it doesn't exist
-            c.execute('''CREATE TABLE IF NOT EXISTS taxi_reason
-                        (id SERIAL PRIMARY KEY,
-                         reference_id TEXT NOT NULL,
-                         reason TEXT,
-                         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                         FOREIGN KEY (reference_id) REFERENCES taxi_requests(id) ON DELETE CASCADE)''')
-
-            # Create feedback_reminders table to track sent reminders
-            c.execute('''CREATE TABLE IF NOT EXISTS feedback_reminders
-                        (id SERIAL PRIMARY KEY,
-                         request_id TEXT NOT NULL,
-                         reminder_type TEXT NOT NULL,
-                         sent_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                         UNIQUE(request_id, reminder_type),
-                         FOREIGN KEY (request_id) REFERENCES taxi_requests(id) ON DELETE CASCADE)''')
-
-            # Create hod_budget table for individual HOD budget management
-            c.execute('''CREATE TABLE IF NOT EXISTS hod_budget
-                        (id SERIAL PRIMARY KEY,
-                         hod_emp_code TEXT NOT NULL,
-                         hod_name TEXT NOT NULL,
-                         hod_email TEXT NOT NULL,
-                         total_budget DECIMAL(12,2) DEFAULT 50000.00,
-                         used_budget DECIMAL(12,2) DEFAULT 0.00,
-                         remaining_budget DECIMAL(12,2) DEFAULT 50000.00,
-                         budget_year INTEGER DEFAULT EXTRACT(YEAR FROM CURRENT_DATE),
-                         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                         updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                         UNIQUE(hod_emp_code, budget_year))''')
-
-            # Insert HOD (only 9025857)
-            hods_data = [
-                ('9025857', 'Piyush Tiwari', 'piyush.tiwari@nvtpower.com', '6395747398', 'Center of Excellence')
-            ]
-
-            for hod in hods_data:
-                c.execute('''INSERT INTO hods (emp_code, hod_name, hod_email, hod_phone, department)
-                            VALUES (%s, %s, %s, %s, %s)
-                            ON CONFLICT (emp_code) DO UPDATE SET
-                            hod_name = EXCLUDED.hod_name,
-                            hod_email = EXCLUDED.hod_email,
-                            hod_phone = EXCLUDED.hod_phone,
-                            department = EXCLUDED.department''', hod)
-
-            # Insert admins (9025857 as both HOD and Admin, 9022761 as Admin)
-            admins_data = [
-                ('9025857', 'Piyush Tiwari', 'piyush.tiwari@nvtpower.com', '6395747398', 'admin123'),
-                ('9022761', 'Nitika Arora', 'nitika.arora@nvtpower.com', '9765499226', 'admin123')
-            ]
+                         '''
+
+def install_taxi_requests_sync_trigger(c, columns):
+    """Mirror every write on taxi_requests into taxi_requests_new (columns = those both tables share)"""
+    column_list = ', '.join(columns)
+    new_values = ', '.join(f"NEW.{column}" for column in columns)
+    updates = ', '.join(f"{column} = EXCLUDED.{column}" for column in columns if column != 'id')
+    c.execute(f'''CREATE OR REPLACE FUNCTION taxi_requests_rebuild_sync() RETURNS TRIGGER AS $$
+                BEGIN
+                    IF TG_OP = 'DELETE' OR (TG_OP = 'UPDATE' AND NEW.id IS DISTINCT FROM OLD.id) THEN
+                        DELETE FROM taxi_requests_new WHERE id = OLD.id;
+                    END IF;
+                    IF TG_OP <> 'DELETE' THEN
+                        INSERT INTO taxi_requests_new ({column_list}) VALUES ({new_values})
+                        ON CONFLICT (id) DO UPDATE SET {updates};
+                    END IF;
+                    RETURN NULL;
+                END;
+                $$ LANGUAGE plpgsql''')
+    c.execute('DROP TRIGGER IF EXISTS taxi_requests_rebuild_sync ON taxi_requests')
+    c.execute('''CREATE TRIGGER taxi_requests_rebuild_sync
+                AFTER INSERT OR UPDATE OR DELETE ON taxi_requests
+                FOR EACH ROW EXECUTE PROCEDURE taxi_requests_rebuild_sync()''')
+
+def get_taxi_requests_indexes(cursor):
+    """(name, definition) of every taxi_requests index except the primary key"""
+    cursor.execute('''SELECT indexname, indexdef FROM pg_indexes
+                      WHERE schemaname = current_schema() AND tablename = 'taxi_requests'
+                      AND indexname <> 'taxi_requests_pkey' ''')
+    return cursor.fetchall()
+
+def create_taxi_requests_new_indexes(cursor):
+    """Copy the secondary indexes onto taxi_requests_new as <name>_rebuild"""
+    for index_name, index_def in get_taxi_requests_indexes(cursor):
+        definition = index_def.replace(f'INDEX {index_name} ON', f'INDEX IF NOT EXISTS {index_name}_rebuild ON', 1)
+        cursor.execute(re.sub(r'\bON (\S+\.)?taxi_requests\b', 'ON taxi_requests_new', definition, count=1))
+
+def start_taxi_requests_rebuild(conn, restart=False):
+    """Prepare (or resume) the rebuild; returns (last_copied_id, columns) or None if nothing to do"""
+    with conn.cursor() as c:
+        c.execute(f"SET LOCAL lock_timeout = '{TABLE_REBUILD_LOCK_TIMEOUT_MS}ms'")
+        current_columns = get_taxi_requests_columns(c)
+        c.execute("SELECT state, last_id FROM table_rebuilds WHERE table_name = 'taxi_requests'")
+        progress = c.fetchone()
+        c.execute("SELECT 1 FROM pg_trigger WHERE tgname = 'taxi_requests_rebuild_sync'")
+        trigger_present = c.fetchone() is not None
+        new_table_present = bool(get_taxi_requests_columns(c, 'taxi_requests_new'))
+
+        columns = [column for column in TAXI_REQUESTS_COLUMNS if column in current_columns]
+        if progress and progress[0] in ('copying', 'copied') and trigger_present and new_table_present and not restart:
+            conn.commit()
+            return progress[1] or '', columns
 
-            for admin in admins_data:
-                c.execute('''INSERT INTO admins (emp_code, admin_name, admin_email, admin_phone, password)
-                            VALUES (%s, %s, %s, %s, %s)
-                            ON CONFLICT (emp_code) DO UPDATE SET
-                            admin_name = EXCLUDED.admin_name,
-                            admin_email = EXCLUDED.admin_email,
-                            admin_phone = EXCLUDED.admin_phone''', admin)
+        if current_columns == TAXI_REQUESTS_COLUMNS and not restart:
+            conn.rollback()
+            return None
 
-            # Insert initial budget data if not exists
-            current_year = datetime.now().year
-            c.execute('SELECT COUNT(*) FROM budget_management WHERE budget_year = %s', (current_year,))
-            budget_exists = c.fetchone()[0] > 0
+        missing = [column for column in TAXI_REQUESTS_COLUMNS if column not in current_columns]
+        extra = [column for column in current_columns if column not in TAXI_REQUESTS_COLUMNS]
+        if missing:
+            db_log.info(f"ℹ️ Columns missing from taxi_requests will take their defaults: {', '.join(missing)}")
+        if extra:
+            db_log.warning(f"⚠️ Columns not in the expected layout stay behind in the old table: {', '.join(extra)}")
+
+        # Without the trigger in place from the start, earlier copies can't be trusted
+        c.execute('DROP TABLE IF EXISTS taxi_requests_new')
+        c.execute(TAXI_REQUESTS_NEW_DDL)
+        # Indexes go on while the table is empty and unused - once the sync trigger
+        # writes to it, an index build would block every write to taxi_requests
+        create_taxi_requests_new_indexes(c)
+        install_taxi_requests_sync_trigger(c, columns)
+        c.execute('''INSERT INTO table_rebuilds (table_name, state, last_id, rows_copied, started_at, updated_at, finished_at)
+                    VALUES ('taxi_requests', 'copying', '', 0, NOW(), NOW(), NULL)
+                    ON CONFLICT (table_name) DO UPDATE SET
+                    state = 'copying', last_id = '', rows_copied = 0,
+                    started_at = NOW(), updated_at = NOW(), finished_at = NULL, old_table = NULL''')
+    conn.commit()
+    return '', columns
+
+def copy_taxi_requests_batches(conn, last_id, columns, batch_size, pause_seconds):
+    """Backfill taxi_requests_new in id order; rows the trigger already wrote are newer and kept"""
+    column_list = ', '.join(columns)
+    c = conn.cursor()
+    c.execute('SELECT COUNT(*) FROM taxi_requests WHERE id > %s', (last_id,))
+    remaining = c.fetchone()[0]
+    conn.commit()
+    db_log.info(f"📦 Copying {remaining} taxi_requests row(s) after '{last_id}' in batches of {batch_size}")
+
+    copied = 0
+    started = time.monotonic()
+    while True:
+        c.execute(f'''WITH batch AS (
+                        SELECT {column_list} FROM taxi_requests
+                        WHERE id > %s ORDER BY id LIMIT %s
+                    ), copied AS (
+                        INSERT INTO taxi_requests_new ({column_list})
+                        SELECT {column_list} FROM batch
+                        ON CONFLICT (id) DO NOTHING
+                        RETURNING 1
+                    )
+                    SELECT MAX(id), COUNT(*), (SELECT COUNT(*) FROM copied) FROM batch''', (last_id, batch_size))
+        batch_last_id, batch_rows, inserted = c.fetchone()
+        if not batch_rows:
+            conn.commit()
+            break
 
-            if not budget_exists:
-                c.execute('''INSERT INTO budget_management (total_budget, used_budget, remaining_budget, budget_year)
-                            VALUES (100000.00, 0.00, 100000.00, %s)''', (current_year,))
-
-            # Insert initial HOD budget data for department managers
-            hod_budget_data = [
-                # Managers found in initial hod_budget_data
-                ('9025802', 'Shivam Chaturvedi', 'shivam.chaturvedi@nvtpower.com', 50000.00, 0.00, 50000.00),
-                ('9013753', 'Sudarshan Kumar', 'sudarshan.kumar@nvtpower.com', 50000.00, 0.00, 50000.00),
-                ('9017113', 'Tribhuvan Agnihotri', 'tribhuvan.agnihotri@nvtpower.com', 50000.00, 0.00, 50000.00),
-                ('9023422', 'Mohit Agarwal', 'mohit.agarwal@nvtpower.com', 50000.00, 0.00, 50000.00),
-                ('9022761', 'Nitika Arora', 'nitika.arora@nvtpower.com', 50000.00, 0.00, 50000.00),
-                ('9025421', 'Rajan Vashisht', 'rajan.vashisht@nvtpower.com', 50000.00, 0.00, 50000.00),
-                ('9023649', 'Jayesh Sinha', 'jayesh.sinha@nvtpower.com', 50000.00, 0.00, 50000.00),
-                ('9012706', 'Manoj Saini', 'manoj.saini@nvtpower.com', 50000.00, 0.00, 50000.00),
-
-                # Managers missing in initial hod_budget_data but in DEPARTMENT_MANAGER_MAPPING
-                ('9024436', 'Ankur Tandon', 'ankur.tandon@nvtpower.com', 50000.00, 0.00, 50000.00),
-                ('9024982', 'V G Padmanabhan', 'vg.padmanabhan@nvtpower.com', 50000.00, 0.00, 50000.00),
-                ('9023418', 'Nishant Sharma', 'nishant.sharma@nvtpower.com', 50000.00, 0.00, 50000.00),
-                ('9024785', 'Vinod Kumar', 'vinod.kumar@nvtpower.com', 50000.00, 0.00, 50000.00),
-                (' 9022826', 'Pawan Tyagi', 'pawan.tyagi@nvtpower.com', 50000.00, 0.00, 50000.00),
-            ]
+        last_id = batch_last_id
+        copied += batch_rows
+        c.execute('''UPDATE table_rebuilds SET last_id = %s, rows_copied = rows_copied + %s, updated_at = NOW()
+                    WHERE table_name = 'taxi_requests' ''', (last_id, inserted))
+        conn.commit()
 
-            for hod_budget in hod_budget_data:
-                c.execute('''INSERT INTO hod_budget (hod_emp_code, hod_name, hod_email, total_budget, used_budget, remaining_budget, budget_year)
-                            VALUES (%s, %s, %s, %s, %s, %s, %s)
-                            ON CONFLICT (hod_emp_code, budget_year) DO UPDATE SET
-                            hod_name = EXCLUDED.hod_name,
-                            hod_email = EXCLUDED.hod_email''',
-                            (hod_budget[0], hod_budget[1], hod_budget[2], hod_budget[3], hod_budget[4], hod_budget[5], current_year))
-
-            # Create indexes
-            c.execute('CREATE INDEX IF NOT EXISTS idx_taxi_emp_code ON taxi_requests(emp_code)')
-            c.execute('CREATE INDEX IF NOT EXISTS idx_taxi_status ON taxi_requests(status)')
-            c.execute('CREATE INDEX IF NOT EXISTS idx_login_emp_code ON login_logs(emp_code)')
-            c.execute('CREATE INDEX IF NOT EXISTS idx_hod_emp_code ON hods(emp_code)')
-            c.execute('CREATE INDEX IF NOT EXISTS idx_budget_management_year ON budget_management(budget_year)')
-            c.execute('CREATE INDEX IF NOT EXISTS idx_feedback_reminders_request_id ON feedback_reminders(request_id)')
-            c.execute('CREATE INDEX IF NOT EXISTS idx_feedback_reminders_type ON feedback_reminders(reminder_type)')
-            c.execute('CREATE INDEX IF NOT EXISTS idx_hod_budget_emp_code ON hod_budget(hod_emp_code)')
-            c.execute('CREATE INDEX IF NOT EXISTS idx_hod_budget_year ON hod_budget(budget_year)')
+        rate = copied / max(time.monotonic() - started, 0.001)
+        db_log.info(f"📦 {copied}/{remaining} row(s) copied ({rate:.0f} rows/s, up to '{last_id}')")
+        if pause_seconds:
+            time.sleep(pause_seconds)
+
+    c.execute("UPDATE table_rebuilds SET state = 'copied', updated_at = NOW() WHERE table_name = 'taxi_requests'")
+    conn.commit()
+    c.close()
+    return copied
+
+def swap_taxi_requests_tables(conn):
+    """Swap the tables in one short lock; returns the old table's new name"""
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    old_table = f"taxi_requests_old_{stamp}"
+    with conn.cursor() as c:
+        # The copies were created with taxi_requests_new; one added to taxi_requests since
+        # then can't be built here without blocking writes, so start over instead
+        indexes = get_taxi_requests_indexes(c)
+        c.execute('''SELECT indexname FROM pg_indexes
+                    WHERE schemaname = current_schema() AND tablename = 'taxi_requests_new' ''')
+        rebuilt = {row[0] for row in c.fetchall()}
+        missing = [index_name for index_name, _ in indexes if f'{index_name}_rebuild' not in rebuilt]
+        if missing:
+            raise RuntimeError(f"indexes added since the rebuild started ({', '.join(missing)}) - re-run with --restart")
+        conn.commit()
 
+        # Foreign keys pointing at taxi_requests, re-created against the new table after the rename
+        c.execute('''SELECT conrelid::regclass::text, conname, pg_get_constraintdef(oid)
+                    FROM pg_constraint
+                    WHERE contype = 'f' AND confrelid = 'taxi_requests'::regclass''')
+        foreign_keys = c.fetchall()
         conn.commit()
-        print("✅ Database initialized successfully with HOD functionality")
-        print("✅ HOD Budget table created with individual budget tracking for 14 department managers")
+
+        c.execute(f"SET LOCAL lock_timeout = '{TABLE_REBUILD_LOCK_TIMEOUT_MS}ms'")
+        c.execute('LOCK TABLE taxi_requests IN ACCESS EXCLUSIVE MODE')
+        c.execute('SELECT (SELECT COUNT(*) FROM taxi_requests), (SELECT COUNT(*) FROM taxi_requests_new)')
+        old_rows, new_rows = c.fetchone()
+        if old_rows != new_rows:
+            raise RuntimeError(f"row counts differ (taxi_requests {old_rows}, taxi_requests_new {new_rows})")
+
+        c.execute('DROP TRIGGER taxi_requests_rebuild_sync ON taxi_requests')
+        c.execute(f'ALTER TABLE taxi_requests RENAME TO {old_table}')
+        c.execute(f'ALTER TABLE {old_table} RENAME CONSTRAINT taxi_requests_pkey TO {old_table}_pkey')
+        c.execute('ALTER TABLE taxi_requests_new RENAME TO taxi_requests')
+        c.execute('ALTER TABLE taxi_requests RENAME CONSTRAINT taxi_requests_new_pkey TO taxi_requests_pkey')
+        for index_name, _ in indexes:
+            c.execute(f'ALTER INDEX {index_name} RENAME TO {index_name}_old_{stamp}')
+            c.execute(f'ALTER INDEX {index_name}_rebuild RENAME TO {index_name}')
+        for child_table, constraint_name, definition in foreign_keys:
+            c.execute(f'ALTER TABLE {child_table} DROP CONSTRAINT {constraint_name}')
+            c.execute(f'ALTER TABLE {child_table} ADD CONSTRAINT {constraint_name} {definition} NOT VALID')
+        c.execute('''UPDATE table_rebuilds SET state = 'swapped', old_table = %s, finished_at = NOW(), updated_at = NOW()
+                    WHERE table_name = 'taxi_requests' ''', (old_table,))
+    conn.commit()
+
+    # Validation scans the child tables without blocking writes
+    with conn.cursor() as c:
+        for child_table, constraint_name, _ in foreign_keys:
+            c.execute(f'ALTER TABLE {child_table} VALIDATE CONSTRAINT {constraint_name}')
+    conn.commit()
+    return old_table
+
+def rebuild_taxi_requests(batch_size=None, pause_seconds=None, restart=False):
+    """Online column-order rebuild of taxi_requests (python -m app rebuild-taxi-requests); resumable"""
+    batch_size = batch_size or TABLE_REBUILD_BATCH_SIZE
+    pause_seconds = TABLE_REBUILD_PAUSE_SECONDS if pause_seconds is None else pause_seconds
+    stats = {'rows_copied': 0, 'old_table': None}
+
+    conn = db_pool.getconn()
+    try:
+        started = start_taxi_requests_rebuild(conn, restart)
+        if started is None:
+            db_log.info("✅ taxi_requests already has the expected column order - nothing to rebuild")
+            return stats
+        last_id, columns = started
+        if last_id:
+            db_log.info(f"🔁 Resuming taxi_requests rebuild after '{last_id}'")
+
+        stats['rows_copied'] = copy_taxi_requests_batches(conn, last_id, columns, batch_size, pause_seconds)
+
+        for attempt in range(1, TABLE_REBUILD_SWAP_RETRIES + 1):
+            try:
+                stats['old_table'] = swap_taxi_requests_tables(conn)
+                break
+            except psycopg2.OperationalError as e:
+                conn.rollback()
+                # lock_timeout (55P03) means live traffic held the table; anything else is a real failure
+                if getattr(e, 'pgcode', None) != '55P03':
+                    raise
+                db_log.info(f"⏳ Swap lock not available within {TABLE_REBUILD_LOCK_TIMEOUT_MS} ms (attempt {attempt}) - retrying")
+                time.sleep(attempt)
+        else:
+            raise RuntimeError('could not take the swap lock - rerun to resume')
+
+        db_log.info(f"✅ taxi_requests rebuilt with the expected column order; previous table kept as {stats['old_table']}")
     except Exception as e:
-        print(f"❌ Database initialization error: {str(e)}")
-        raise
+        conn.rollback()
+        db_log.error(f"❌ taxi_requests rebuild stopped: {e} - rerun to resume", exc_info=True)
+        stats['error'] = str(e)
     finally:
         db_pool.putconn(conn)
+    return stats
 
-# HOD Email Mapping - Maps HOD employee codes to their correct @nvtpower.com emails
+# HOD Email Mapping - Maps HOD employee codes to their correct @nvtpower.com emails (org_directory seed)
 HOD_EMAIL_MAPPING = {
     '9017113': 'tribhuvan.agnihotri@nvtpower.com',  # Tribhuvan Agnihotri
     '9025023': 'sandeep.kumar@nvtpower.com',  # Sandeep Kumar
@@ -1102,7 +1792,7 @@ HOD_EMAIL_MAPPING = {
     '9023418': 'nishant.sharma@nvtpower.com',  # Nishant Sharma
 }
 
-# Manager Email Mapping - Maps manager IDs to their correct @nvtpower.com emails
+# Manager Email Mapping - Maps manager IDs to their correct @nvtpower.com emails (org_directory seed)
 MANAGER_EMAIL_MAPPING = {
     '9022761': 'nitika.arora@nvtpower.com',  # Nitika Arora
     '9025802': 'Shivam.Chaturvedi@nvtpower.com',  # Shivam Chaturvedi
@@ -1197,7 +1887,7 @@ MANAGER_EMAIL_MAPPING = {
     '9024982': 'vg.padmanabhan@nvtpower.com',  # V G Padmanabhan
 }
 
-# HOD Access Mapping - Maps employee codes to HOD dashboard access
+# HOD Access Mapping - Maps employee codes to HOD dashboard access (org_directory seed)
 # RESTRICTED: Only these specific HOD employee codes have access to HOD dashboard
 HOD_ACCESS_CODES = {
     '9024982': {  # V G Padmanabhan - Warranty
@@ -1277,13 +1967,145 @@ HOD_ACCESS_CODES = {
     }
 }
 
+# =============================================================================
+# ORGANISATION DIRECTORY
+# =============================================================================
+# Approver mappings, HOD access, email corrections and hardcoded employees live in
+# org_directory as (kind, key, data) rows; the Python literals above only seed an
+# empty directory. Each process holds a snapshot tagged with the version from
+# org_directory_version (bumped by a trigger on every edit). Snapshots are never
+# mutated - a version change builds a new one and swaps the reference.
+ORG_DIRECTORY_POLL_SECONDS = float(os.environ.get('ORG_DIRECTORY_POLL_SECONDS', '30'))
+ORG_DIRECTORY_KINDS = (
+    'department_manager', 'department_override', 'location_department', 'division_override',
+    'emp_code_override', 'hod_email', 'manager_email', 'hod_access', 'hardcoded_employee'
+)
+# Locations where the department mapping beats the division/emp_code overrides
+DEPARTMENT_MAPPING_LOCATIONS = ('bawal',)
+# Fields an entry's data must carry, checked before admin edits are written
+MANAGER_INFO_FIELDS = ('manager_id', 'manager_name', 'manager_email', 'manager_phone')
+ORG_DIRECTORY_REQUIRED_FIELDS = {
+    'department_manager': MANAGER_INFO_FIELDS,
+    'department_override': MANAGER_INFO_FIELDS,
+    'location_department': MANAGER_INFO_FIELDS,
+    'division_override': MANAGER_INFO_FIELDS,
+    'emp_code_override': MANAGER_INFO_FIELDS,
+    'hod_email': ('email',),
+    'manager_email': ('email',),
+    'hod_access': ('name', 'department', 'access_level'),
+    'hardcoded_employee': ('emp_code', 'employee_name', 'dob', 'department') + MANAGER_INFO_FIELDS
+}
+
+def seed_org_directory_rows():
+    """(kind, key, data) rows built from the Python literals, used to seed an empty directory"""
+    rows = [('department_manager', name, info) for name, info in DEPARTMENT_MANAGER_MAPPING.items()]
+    rows += [('department_override', department, info) for department, info in APPROVER_DEPARTMENT_OVERRIDES.items()]
+
+    # Manesar sets are checked Manoj, Ankur, Shivam - the first set containing a department wins
+    seen = set()
+    for departments, info in ((MANESAR_DEPARTMENTS_FOR_MANOJ, MANOJ_MANAGER_INFO),
+                              (MANESAR_DEPARTMENTS_FOR_ANKUR, ANKUR_MANAGER_INFO),
+                              (MANESAR_DEPARTMENTS_FOR_SHIVAM, SHIVAM_MANAGER_INFO)):
+        for department in sorted(departments - seen):
+            rows.append(('location_department', f"manesar|{department}", info))
+        seen |= departments
+
+    rows += [('division_override', division, info) for division, info in APPROVER_DIVISION_OVERRIDES.items()]
+    rows += [('emp_code_override', emp_code, info) for emp_code, info in APPROVER_EMP_CODE_OVERRIDES.items()]
+    rows += [('hod_email', emp_code, {'email': email}) for emp_code, email in HOD_EMAIL_MAPPING.items()]
+    rows += [('manager_email', manager_id, {'email': email}) for manager_id, email in MANAGER_EMAIL_MAPPING.items()]
+    rows += [('hod_access', emp_code, info) for emp_code, info in HOD_ACCESS_CODES.items()]
+    rows += [('hardcoded_employee', emp_code, info) for emp_code, info in HARDCODED_EMPLOYEES.items()]
+    return rows
+
+def build_org_directory(rows, version):
+    """Index directory rows for in-process lookups and compile the approval routing table"""
+    by_kind = {kind: {} for kind in ORG_DIRECTORY_KINDS}
+    for kind, key, data in rows:
+        if kind in by_kind:
+            by_kind[kind][key] = data
+
+    location_departments = {}
+    for key, info in by_kind['location_department'].items():
+        location, _, department = key.partition('|')
+        location_departments[(location.strip().lower(), department.strip().lower())] = info
+
+    directory = {
+        'version': version,
+        'loaded_at': datetime.now(),
+        'department_managers': {name.strip().lower(): info for name, info in by_kind['department_manager'].items()},
+        'department_overrides': {name.strip().lower(): info for name, info in by_kind['department_override'].items()},
+        'location_departments': location_departments,
+        'division_overrides': {name.strip().upper(): info for name, info in by_kind['division_override'].items()},
+        'emp_code_overrides': {emp_code.strip(): info for emp_code, info in by_kind['emp_code_override'].items()},
+        'hod_emails': {emp_code: data['email'] for emp_code, data in by_kind['hod_email'].items()},
+        'manager_emails': {manager_id: data['email'] for manager_id, data in by_kind['manager_email'].items()},
+        'hod_access': by_kind['hod_access'],
+        'hardcoded_employees': by_kind['hardcoded_employee']
+    }
+    directory['routing'] = compile_approval_routing(directory)
+    return directory
+
+# Version 0 = built from the literals, used until the first successful poll
+ORG_DIRECTORY_STATE = {'snapshot': build_org_directory(seed_org_directory_rows(), 0), 'checked_at': 0.0, 'reloads': 0}
+ORG_DIRECTORY_LOCK = threading.Lock()
+
+def reload_org_directory(force=False):
+    """Swap in a fresh snapshot if the directory version changed; returns True if reloaded"""
+    conn = db_pool.getconn()
+    try:
+        with conn.cursor() as c:
+            c.execute('SELECT version FROM org_directory_version WHERE id = 1')
+            row = c.fetchone()
+            if not row or (not force and row[0] == ORG_DIRECTORY_STATE['snapshot']['version']):
+                conn.rollback()
+                return False
+
+            # Rows and version in one statement, so the snapshot matches its version
+            c.execute('''SELECT v.version, d.kind, d.key, d.data
+                        FROM org_directory_version v
+                        LEFT JOIN org_directory d ON TRUE
+                        WHERE v.id = 1''')
+            results = c.fetchall()
+        conn.rollback()
+    finally:
+        db_pool.putconn(conn)
+
+    version = results[0][0]
+    snapshot = build_org_directory([row[1:] for row in results if row[1] is not None], version)
+    ORG_DIRECTORY_STATE['snapshot'] = snapshot
+    ORG_DIRECTORY_STATE['reloads'] += 1
+    directory_log.info(f"📇 Organisation directory v{version} loaded ({len(results)} entries, pid {os.getpid()})")
+    return True
+
+def get_org_directory():
+    """Current directory snapshot; re-checks the version at most every ORG_DIRECTORY_POLL_SECONDS"""
+    if time.time() - ORG_DIRECTORY_STATE['checked_at'] >= ORG_DIRECTORY_POLL_SECONDS:
+        # One thread polls; the others keep using the current snapshot meanwhile
+        if ORG_DIRECTORY_LOCK.acquire(blocking=False):
+            try:
+                ORG_DIRECTORY_STATE['checked_at'] = time.time()
+                reload_org_directory()
+            except Exception as e:
+                directory_log.warning(f"⚠️ Could not refresh organisation directory, keeping v{ORG_DIRECTORY_STATE['snapshot']['version']}: {e}")
+            finally:
+                ORG_DIRECTORY_LOCK.release()
+    return ORG_DIRECTORY_STATE['snapshot']
+
+def seed_org_directory(cursor):
+    """Insert the literal mappings into an empty directory (existing entries are left alone)"""
+    for kind, key, data in seed_org_directory_rows():
+        cursor.execute('''INSERT INTO org_directory (kind, key, data)
+                          VALUES (%s, %s, %s::jsonb)
+                          ON CONFLICT (kind, key) DO NOTHING''', (kind, key, json.dumps(data)))
+
 def fetch_hod_dob_from_sap(emp_code):
     """Fetch HOD date of birth from SAP API for authentication"""
     try:
         # Use the same API endpoint as verify_sap_credentials
         url = f"{SAP_CONFIG['base_url']}EmpJob?$select=division,divisionNav/name,location,locationNav/name,seqNumber,startDate,userId,employmentNav/personNav/personalInfoNav/firstName,employmentNav/personNav/personalInfoNav/middleName,employmentNav/personNav/personalInfoNav/lastName,employmentNav/personNav/personalInfoNav/customString5,payGradeNav/name,customString10Nav/externalName,department,departmentNav/name,employmentNav/empJobRelationshipNav/relationshipTypeNav/externalCode,employmentNav/empJobRelationshipNav/relUserId,employmentNav/empJobRelationshipNav/relUserNav/defaultFullName,employmentNav/personNav/emailNav/emailAddress,employmentNav/personNav/emailNav/isPrimary,employmentNav/personNav/emailNav/emailTypeNav/picklistLabels/label,employmentNav/personNav/countryOfBirth,employmentNav/personNav/phoneNav/phoneNumber,employmentNav/personNav/phoneNav/phoneTypeNav/picklistLabels/label,employmentNav/personNav/personalInfoNav/gender,employmentNav/personNav/personalInfoNav/maritalStatusNav/picklistLabels/label,employmentNav/personNav/dateOfBirth,employmentNav/startDate,employmentNav/customString18,emplStatusNav/picklistLabels/label,employmentNav/personNav/homeAddressNavDEFLT/addressType,employmentNav/personNav/homeAddressNavDEFLT/address1,employmentNav/personNav/homeAddressNavDEFLT/address10,employmentNav/personNav/homeAddressNavDEFLT/address12,employmentNav/personNav/homeAddressNavDEFLT/address14,employmentNav/personNav/homeAddressNavDEFLT/stateNav/picklistLabels/label,employmentNav/personNav/homeAddressNavDEFLT/countyNav/picklistLabels/label,employmentNav/personNav/homeAddressNavDEFLT/cityNav/picklistLabels/label,managerId,managerUserNav/defaultFullName,employmentNav/personNav/personalInfoNav/customString10,employmentNav/personNav/personalInfoNav/customString11,employmentNav/personNav/personalInfoNav/customString8,employmentNav/personNav/personalInfoNav/customString9,customString6,employmentType,customString6Nav/id,customString6Nav/externalCode,customString6Nav/localeLabel,employmentTypeNav/id,employmentTypeNav/externalCode,employmentTypeNav/localeLabel,employmentNav/endDate,employmentNav/customDate6,eventReasonNav/externalCode,eventReasonNav/name&$expand=employmentNav/personNav/personalInfoNav,divisionNav,locationNav,payGradeNav,customString10Nav,departmentNav,employmentNav/empJobRelationshipNav/relationshipTypeNav,employmentNav/empJobRelationshipNav/relUserNav,employmentNav/personNav/emailNav/emailTypeNav/picklistLabels,employmentNav/personNav/phoneNav/phoneTypeNav/picklistLabels,employmentNav/personNav/personalInfoNav/maritalStatusNav/picklistLabels,emplStatusNav/picklistLabels,employmentNav/personNav/homeAddressNavDEFLT/stateNav/picklistLabels,employmentNav/personNav/homeAddressNavDEFLT/countyNav/picklistLabels,employmentNav/personNav/homeAddressNavDEFLT/cityNav/picklistLabels,managerUserNav,customString6Nav,employmentTypeNav,eventReasonNav&$filter=userId eq '{emp_code}'&$format=json&$orderby=employmentNav/startDate"
 
-        response = requests.get(
+        response = http_session().get(
             url,
             auth=HTTPBasicAuth(SAP_CONFIG['username'], SAP_CONFIG['password']),
             timeout=10
@@ -1330,7 +2152,7 @@ def fetch_hod_dob_from_sap(emp_code):
                                 # If it's already in DDMMYYYY format
                                 sap_dob_formatted = sap_dob_str
                     except Exception as e:
-                        print(f"Date conversion error for HOD {emp_code}: {e}")
+                        sap_log.error(f"Date conversion error for HOD {emp_code}: {e}")
                         sap_dob_formatted = None
 
                 return {
@@ -1342,15 +2164,16 @@ def fetch_hod_dob_from_sap(emp_code):
         return {'success': False, 'error': 'HOD not found in SAP'}
 
     except Exception as e:
-        print(f"Error fetching HOD DOB for {emp_code}: {str(e)}")
+        sap_log.error(f"Error fetching HOD DOB for {emp_code}: {str(e)}")
         return {'success': False, 'error': str(e)}
 
 def is_hod_authorized(emp_code):
     """Check if employee code is authorized for HOD dashboard access - RESTRICTED ACCESS"""
     # SECURITY: Only check hardcoded HOD access codes - database check disabled for security
-    # Only the specific HOD employee codes in HOD_ACCESS_CODES can access HOD dashboard
-    if emp_code in HOD_ACCESS_CODES:
-        return True, HOD_ACCESS_CODES[emp_code]
+    # Only the HOD employee codes in the directory's hod_access entries can access HOD dashboard
+    hod_access = get_org_directory()['hod_access']
+    if emp_code in hod_access:
+        return True, hod_access[emp_code]
 
     # Access denied for all other employee codes, even if they exist in database
     return False, None
@@ -1375,7 +2198,7 @@ def find_matching_requests_for_hod(hod_email, cursor):
     exact_matches = cursor.fetchall()
 
     if exact_matches:
-        print(f"✅ Found {len(exact_matches)} exact matches for HOD email: {hod_email}")
+        directory_log.debug(f"✅ Found {len(exact_matches)} exact matches for HOD email: {hod_email}")
         return exact_matches
 
     # Try case-insensitive match
@@ -1385,7 +2208,7 @@ def find_matching_requests_for_hod(hod_email, cursor):
     case_insensitive_matches = cursor.fetchall()
 
     if case_insensitive_matches:
-        print(f"✅ Found {len(case_insensitive_matches)} case-insensitive matches for HOD email: {hod_email}")
+        directory_log.debug(f"✅ Found {len(case_insensitive_matches)} case-insensitive matches for HOD email: {hod_email}")
         return case_insensitive_matches
 
     # Try partial match (in case there are extra spaces or characters)
@@ -1395,24 +2218,25 @@ def find_matching_requests_for_hod(hod_email, cursor):
     partial_matches = cursor.fetchall()
 
     if partial_matches:
-        print(f"✅ Found {len(partial_matches)} partial matches for HOD email: {hod_email}")
+        directory_log.debug(f"✅ Found {len(partial_matches)} partial matches for HOD email: {hod_email}")
         return partial_matches
 
-    print(f"❌ No matches found for HOD email: {hod_email}")
+    directory_log.error(f"❌ No matches found for HOD email: {hod_email}")
     return []
 
 def get_correct_hod_email(emp_code, sap_email):
     """Get the correct @nvtpower.com email for HOD, using mapping if SAP returns different domain"""
     try:
         # First check if we have a mapping for this HOD
-        if str(emp_code) in HOD_EMAIL_MAPPING:
-            mapped_email = HOD_EMAIL_MAPPING[str(emp_code)]
-            print(f"🔄 Found HOD email mapping, using correct @nvtpower.com email: {mapped_email}")
+        hod_emails = get_org_directory()['hod_emails']
+        if str(emp_code) in hod_emails:
+            mapped_email = hod_emails[str(emp_code)]
+            directory_log.debug(f"🔄 Found HOD email mapping, using correct @nvtpower.com email: {mapped_email}")
             return mapped_email
 
         # If SAP email is already @nvtpower.com, use it
         if sap_email and '@nvtpower.com' in sap_email:
-            print(f"✅ SAP email is already @nvtpower.com: {sap_email}")
+            directory_log.debug(f"✅ SAP email is already @nvtpower.com: {sap_email}")
             return sap_email
 
         # If SAP email has different domain, try to construct @nvtpower.com email
@@ -1420,15 +2244,15 @@ def get_correct_hod_email(emp_code, sap_email):
             # Extract the local part (before @)
             local_part = sap_email.split('@')[0]
             constructed_email = f"{local_part}@nvtpower.com"
-            print(f"🔄 Constructed @nvtpower.com email from SAP email: {constructed_email}")
+            directory_log.debug(f"🔄 Constructed @nvtpower.com email from SAP email: {constructed_email}")
             return constructed_email
 
         # Fallback: return the SAP email as is
-        print(f"⚠️ No mapping found, using SAP email as is: {sap_email}")
+        directory_log.warning(f"⚠️ No mapping found, using SAP email as is: {sap_email}")
         return sap_email
 
     except Exception as e:
-        print(f"❌ Error in get_correct_hod_email: {str(e)}")
+        directory_log.error(f"❌ Error in get_correct_hod_email: {str(e)}")
         return sap_email
 
 def fetch_manager_contact_from_sap(manager_id):
@@ -1458,7 +2282,7 @@ def fetch_manager_contact_from_sap(manager_id):
             f"&$filter=personIdExternal eq '{manager_id_str}'"
             f"&$format=json"
         )
-        response = requests.get(
+        response = http_session().get(
             email_url,
             auth=HTTPBasicAuth(SAP_CONFIG['username'], SAP_CONFIG['password']),
             timeout=8
@@ -1488,14 +2312,15 @@ def fetch_manager_contact_from_sap(manager_id):
             manager_email = preferred_email or primary_email or first_email or ''
 
         else:
-            print(f"❌ Manager email API failed for {manager_id_str} with status {response.status_code}")
+            sap_log.error(f"❌ Manager email API failed for {manager_id_str} with status {response.status_code}")
 
     except Exception as e:
-        print(f"❌ Error fetching manager email for {manager_id_str}: {e}")
+        sap_log.error(f"❌ Error fetching manager email for {manager_id_str}: {e}")
 
-    if not manager_email and str(manager_id_str) in MANAGER_EMAIL_MAPPING:
-        mapped_email = MANAGER_EMAIL_MAPPING[str(manager_id_str)]
-        print(f"🔄 Using mapped email as fallback for manager {manager_id_str}: {mapped_email}")
+    manager_emails = get_org_directory()['manager_emails']
+    if not manager_email and str(manager_id_str) in manager_emails:
+        mapped_email = manager_emails[str(manager_id_str)]
+        sap_log.debug(f"🔄 Using mapped email as fallback for manager {manager_id_str}: {mapped_email}")
         manager_email = mapped_email
 
     # ------------------------------------------------------------------
@@ -1509,7 +2334,7 @@ def fetch_manager_contact_from_sap(manager_id):
             f"&$filter=personIdExternal eq '{manager_id_str}'"
             f"&$format=json"
         )
-        response = requests.get(
+        response = http_session().get(
             phone_url,
             auth=HTTPBasicAuth(SAP_CONFIG['username'], SAP_CONFIG['password']),
             timeout=8
@@ -1557,10 +2382,10 @@ def fetch_manager_contact_from_sap(manager_id):
                     manager_phone = ''
 
         else:
-            print(f"❌ Manager phone API failed for {manager_id_str} with status {response.status_code}")
+            sap_log.error(f"❌ Manager phone API failed for {manager_id_str} with status {response.status_code}")
 
     except Exception as e:
-        print(f"❌ Error fetching manager phone for {manager_id_str}: {e}")
+        sap_log.error(f"❌ Error fetching manager phone for {manager_id_str}: {e}")
 
     contact_payload = {
         'manager_email': manager_email or '',
@@ -1586,7 +2411,7 @@ def verify_sap_credentials(emp_code, dob):
         # Use trimmed EmpJob endpoint
         url = build_empjob_url(emp_code)
 
-        response = requests.get(
+        response = http_session().get(
             url,
             auth=HTTPBasicAuth(SAP_CONFIG['username'], SAP_CONFIG['password']),
             timeout=10
@@ -1596,12 +2421,12 @@ def verify_sap_credentials(emp_code, dob):
             data = response.json()
             results = data.get('d', {}).get('results', [])
 
-            print(f"🔍 API Response status: {response.status_code}")
-            print(f"🔍 Number of results: {len(results)}")
+            sap_log.debug(f"🔍 API Response status: {response.status_code}", extra={'sampled': True})
+            sap_log.debug(f"🔍 Number of results: {len(results)}", extra={'sampled': True})
 
             if results:
                 employee_data = results[0]
-                print(f"🔍 Employee data received from SAP API")
+                sap_log.debug(f"🔍 Employee data received from SAP API")
 
                 # Extract employee details from the correct path
                 personal_info_nav = employee_data.get('employmentNav', {}).get('personNav', {}).get('personalInfoNav', {})
@@ -1616,7 +2441,7 @@ def verify_sap_credentials(emp_code, dob):
                     first_name = personal_info_nav.get('firstName', '')
                     middle_name = personal_info_nav.get('middleName', '')
                     last_name = personal_info_nav.get('lastName', '')
-                    print(f"🔍 Name extracted from direct personalInfoNav object")
+                    sap_log.debug(f"🔍 Name extracted from direct personalInfoNav object")
                 # Check if personalInfoNav has a results array
                 elif isinstance(personal_info_nav, dict) and 'results' in personal_info_nav:
                     results = personal_info_nav.get('results', [])
@@ -1624,14 +2449,14 @@ def verify_sap_credentials(emp_code, dob):
                         first_name = results[0].get('firstName', '')
                         middle_name = results[0].get('middleName', '')
                         last_name = results[0].get('lastName', '')
-                        print(f"🔍 Name extracted from personalInfoNav results array")
+                        sap_log.debug(f"🔍 Name extracted from personalInfoNav results array")
                 else:
-                    print(f"⚠️ Unable to extract name from personalInfoNav structure: {type(personal_info_nav)}")
+                    sap_log.warning(f"⚠️ Unable to extract name from personalInfoNav structure: {type(personal_info_nav)}")
 
-                print(f"🔍 Name extraction:")
-                print(f"   First Name: {first_name}")
-                print(f"   Middle Name: {middle_name}")
-                print(f"   Last Name: {last_name}")
+                sap_log.debug(f"🔍 Name extraction:")
+                sap_log.debug(f"   First Name: {first_name}")
+                sap_log.debug(f"   Middle Name: {middle_name}")
+                sap_log.debug(f"   Last Name: {last_name}")
 
                 sap_dob = ''
 
@@ -1671,13 +2496,13 @@ def verify_sap_credentials(emp_code, dob):
                                 # If it's already in DDMMYYYY format
                                 sap_dob_formatted = sap_dob_str
                     except Exception as e:
-                        print(f"Date conversion error: {e}")
+                        sap_log.error(f"Date conversion error: {e}")
                         sap_dob_formatted = None
 
                 # Get phone number from the correct path with enhanced extraction logic
-                print(f"🔍 PHONE EXTRACTION (STRICT MODE):")
+                sap_log.debug(f"🔍 PHONE EXTRACTION (STRICT MODE):")
                 phone_nav = employee_data.get('employmentNav', {}).get('personNav', {}).get('phoneNav', {})
-                print(f"  Raw phone data: {phone_nav}")
+                sap_log.debug(f"  Raw phone data: {phone_nav}")
 
                 phone_number = ""
                 phone_results = None
@@ -1691,11 +2516,11 @@ def verify_sap_credentials(emp_code, dob):
                     phone_item_at_index_1 = phone_results[1]
                     if isinstance(phone_item_at_index_1, dict) and phone_item_at_index_1.get('phoneNumber'):
                         phone_number = phone_item_at_index_1['phoneNumber']
-                        print(f"  ✅ Found required phone number at index 1: {phone_number}")
+                        sap_log.debug(f"  ✅ Found required phone number at index 1: {phone_number}")
                     else:
-                        print("  ⚠️ Item at index 1 is not a valid phone object or has no number.")
+                        sap_log.debug("  ⚠️ Item at index 1 is not a valid phone object or has no number.")
                 else:
-                    print("  ⚠️ Phone results list does not have an item at index 1. No other fallbacks will be used.")
+                    sap_log.debug("  ⚠️ Phone results list does not have an item at index 1. No other fallbacks will be used.")
 
                 if phone_number:
                     phone_number = ''.join(filter(str.isdigit, phone_number))
@@ -1707,12 +2532,12 @@ def verify_sap_credentials(emp_code, dob):
                             else:
                                 phone_number = '+91' + phone_number
                     else:
-                        print("  ⚠️ Phone number format invalid, using empty value")
+                        sap_log.debug("  ⚠️ Phone number format invalid, using empty value")
                         phone_number = ""
                 else:
-                    print("  ⚠️ No phone number found using the strict index 1 rule.")
+                    sap_log.debug("  ⚠️ No phone number found using the strict index 1 rule.")
 
-                print(f"  📱 Final phone number: {phone_number}")
+                sap_log.debug(f"  📱 Final phone number: {phone_number}")
 
                 # Get email from the correct path
                 email_nav = employee_data.get('employmentNav', {}).get('personNav', {}).get('emailNav', {})
@@ -1747,7 +2572,7 @@ def verify_sap_credentials(emp_code, dob):
                 if not department:
                     department = employee_data.get('department', '')
 
-                print(f"🔍 Department: {department}")
+                sap_log.debug(f"🔍 Department: {department}")
 
                 # Get division from the correct path
                 division = ''
@@ -1771,11 +2596,11 @@ def verify_sap_credentials(emp_code, dob):
                     if location_results:
                         location = location_results[0].get('name', '')
 
-                print(f"🔍 Division: {division}")
-                print(f"🔍 Location: {location}")
+                sap_log.debug(f"🔍 Division: {division}")
+                sap_log.debug(f"🔍 Location: {location}")
 
                 # Get manager information with enhanced debugging
-                print(f"🔍 Employee data keys: {list(employee_data.keys())}")
+                sap_log.debug(f"🔍 Employee data keys: {list(employee_data.keys())}")
 
                 # Try multiple ways to get manager ID
                 manager_id = employee_data.get('managerId', '')
@@ -1791,48 +2616,48 @@ def verify_sap_credentials(emp_code, dob):
                 manager_name = ''
                 manager_email = ''
 
-                print(f"🔍 Raw manager ID from API: {manager_id}")
-                print(f"🔍 Manager ID type: {type(manager_id)}")
+                sap_log.debug(f"🔍 Raw manager ID from API: {manager_id}")
+                sap_log.debug(f"🔍 Manager ID type: {type(manager_id)}")
 
                 # Get manager name from managerUserNav
                 manager_user_nav = employee_data.get('managerUserNav', {})
-                print(f"🔍 Manager user nav: {manager_user_nav}")
+                sap_log.debug(f"🔍 Manager user nav: {manager_user_nav}")
 
                 if manager_user_nav and 'defaultFullName' in manager_user_nav:
                     manager_name = manager_user_nav['defaultFullName']
-                    print(f"🔍 Manager name from API: {manager_name}")
+                    sap_log.debug(f"🔍 Manager name from API: {manager_name}")
                 else:
-                    print(f"⚠️ No manager name found in managerUserNav")
+                    sap_log.warning(f"⚠️ No manager name found in managerUserNav")
 
                 # If we have manager ID, fetch manager email and phone using the proven working method
                 manager_phone = ''
                 if manager_id and str(manager_id).strip():
-                    print(f"🔍 Fetching manager email for manager ID: {manager_id}")
+                    sap_log.debug(f"🔍 Fetching manager email for manager ID: {manager_id}")
                     manager_email = fetch_manager_email_from_sap(manager_id)
                     if manager_email:
-                        print(f"✅ Manager email fetched: {manager_email}")
+                        sap_log.debug(f"✅ Manager email fetched: {manager_email}")
                     else:
-                        print(f"⚠️ Could not fetch manager email for ID: {manager_id}")
+                        sap_log.warning(f"⚠️ Could not fetch manager email for ID: {manager_id}")
                         # Fallback: Try to construct email from manager name
                         if manager_name:
                             # Convert manager name to email format (firstname.lastname@nvtpower.com)
                             name_parts = manager_name.lower().split()
                             if len(name_parts) >= 2:
                                 fallback_email = f"{name_parts[0]}.{name_parts[1]}@nvtpower.com"
-                                print(f"🔄 Using fallback email format: {fallback_email}")
+                                sap_log.debug(f"🔄 Using fallback email format: {fallback_email}")
                                 manager_email = fallback_email
 
                     # Fetch manager phone number
-                    print(f"🔍 Fetching manager phone for manager ID: {manager_id}")
+                    sap_log.debug(f"🔍 Fetching manager phone for manager ID: {manager_id}")
                     manager_phone = fetch_manager_phone_from_sap(manager_id)
                     if manager_phone:
-                        print(f"✅ Manager phone fetched: {manager_phone}")
+                        sap_log.debug(f"✅ Manager phone fetched: {manager_phone}")
                     else:
-                        print(f"⚠️ Could not fetch manager phone for ID: {manager_id}")
+                        sap_log.warning(f"⚠️ Could not fetch manager phone for ID: {manager_id}")
                 else:
-                    print(f"⚠️ No valid manager ID found for employee: {emp_code}")
-                    print(f"⚠️ Manager ID value: '{manager_id}' (empty or None)")
-                    print(f"🔍 Full employee data for debugging: {employee_data}")
+                    sap_log.warning(f"⚠️ No valid manager ID found for employee: {emp_code}")
+                    sap_log.warning(f"⚠️ Manager ID value: '{manager_id}' (empty or None)")
+                    sap_log.debug(f"🔍 Full employee data for debugging: {employee_data}")
 
                 # Verify date of birth
                 if sap_dob_formatted and dob == sap_dob_formatted:
@@ -1841,7 +2666,7 @@ def verify_sap_credentials(emp_code, dob):
                     # Remove extra spaces between names
                     employee_name = ' '.join(employee_name.split())
 
-                    print(f"✅ Employee name constructed (without middle name): {employee_name}")
+                    sap_log.debug(f"✅ Employee name constructed (without middle name): {employee_name}")
 
                     return {
                         'success': True,
@@ -1857,15 +2682,122 @@ def verify_sap_credentials(emp_code, dob):
                         'manager_phone': manager_phone
                     }
                 else:
-                    print(f"DOB mismatch - Expected: {sap_dob_formatted}, Received: {dob}")
+                    sap_log.warning(f"⚠️ DOB mismatch for {emp_code}")
                     return {'success': False, 'error': 'Invalid date of birth'}
 
         return {'success': False, 'error': 'Employee not found'}
 
     except Exception as e:
-        print(f"SAP API Error: {str(e)}")
+        sap_log.error(f"SAP API Error: {str(e)}")
         return {'success': False, 'error': 'API connection failed'}
 
+# =============================================================================
+# CREDENTIAL VERIFICATION CACHE
+# =============================================================================
+# A successful SAP login stores a salted, secret-keyed hash of emp_code + DOB
+# together with the profile SAP returned. Repeat logins within
+# CREDENTIAL_CACHE_TTL_HOURS are verified against the hash without calling SAP;
+# a miss, a DOB that doesn't match the hash, or an expired entry goes to SAP.
+CREDENTIAL_CACHE_ENABLED = os.environ.get('CREDENTIAL_CACHE_ENABLED', 'true').lower() == 'true'
+CREDENTIAL_CACHE_TTL_HOURS = float(os.environ.get('CREDENTIAL_CACHE_TTL_HOURS', '12'))
+CREDENTIAL_HASH_ITERATIONS = 20000
+CREDENTIAL_PROFILE_FIELDS = ('employee_name', 'employee_email', 'employee_phone', 'department', 'division',
+                             'location', 'manager_id', 'manager_name', 'manager_email', 'manager_phone')
+CREDENTIAL_CACHE_METRICS = {'hits': 0, 'misses': 0, 'expired': 0, 'mismatches': 0, 'stores': 0, 'errors': 0}
+CREDENTIAL_CACHE_METRICS_LOCK = threading.Lock()
+
+def record_credential_cache_metric(name):
+    with CREDENTIAL_CACHE_METRICS_LOCK:
+        CREDENTIAL_CACHE_METRICS[name] += 1
+
+def hash_credentials(emp_code, dob, salt):
+    """Salted hash of emp_code + DOB, keyed with the app secret so the table alone can't be brute-forced"""
+    return hashlib.pbkdf2_hmac(
+        'sha256', f"{emp_code}:{dob}".encode(), salt + app.secret_key.encode(), CREDENTIAL_HASH_ITERATIONS
+    ).hex()
+
+def store_verified_credentials(emp_code, dob, result):
+    """Remember a successful SAP verification for CREDENTIAL_CACHE_TTL_HOURS"""
+    salt = secrets.token_bytes(16)
+    profile = {field: result.get(field, '') for field in CREDENTIAL_PROFILE_FIELDS}
+    conn = db_pool.getconn()
+    try:
+        with conn.cursor() as c:
+            c.execute('''INSERT INTO credential_cache (emp_code, salt, credential_hash, profile, verified_at, expires_at)
+                        VALUES (%s, %s, %s, %s::jsonb, NOW(), NOW() + %s * INTERVAL '1 hour')
+                        ON CONFLICT (emp_code) DO UPDATE SET
+                        salt = EXCLUDED.salt,
+                        credential_hash = EXCLUDED.credential_hash,
+                        profile = EXCLUDED.profile,
+                        verified_at = EXCLUDED.verified_at,
+                        expires_at = EXCLUDED.expires_at''',
+                     (emp_code, salt.hex(), hash_credentials(emp_code, dob, salt), json.dumps(profile),
+                      CREDENTIAL_CACHE_TTL_HOURS))
+        conn.commit()
+        record_credential_cache_metric('stores')
+    except Exception as e:
+        conn.rollback()
+        record_credential_cache_metric('errors')
+        auth_log.warning(f"⚠️ Could not cache verified credentials for {emp_code}: {e}")
+    finally:
+        db_pool.putconn(conn)
+
+def verify_cached_credentials(emp_code, dob):
+    """Return the cached verify_sap_credentials result, or None when SAP has to be asked"""
+    conn = db_pool.getconn()
+    try:
+        with conn.cursor() as c:
+            c.execute('''SELECT salt, credential_hash, profile, expires_at > NOW()
+                        FROM credential_cache WHERE emp_code = %s''', (emp_code,))
+            row = c.fetchone()
+        conn.rollback()
+    except Exception as e:
+        conn.rollback()
+        record_credential_cache_metric('errors')
+        auth_log.warning(f"⚠️ Credential cache lookup failed for {emp_code}: {e}")
+        return None
+    finally:
+        db_pool.putconn(conn)
+
+    if not row:
+        record_credential_cache_metric('misses')
+        return None
+    if not row[3]:
+        record_credential_cache_metric('expired')
+        return None
+    if not hmac.compare_digest(hash_credentials(emp_code, dob, bytes.fromhex(row[0])), row[1]):
+        record_credential_cache_metric('mismatches')
+        return None
+
+    record_credential_cache_metric('hits')
+    return {'success': True, **row[2]}
+
+def verify_credentials(emp_code, dob):
+    """verify_sap_credentials, answered from the credential cache when possible"""
+    emp_code = str(emp_code or '').strip()
+    if not CREDENTIAL_CACHE_ENABLED or not emp_code or not dob:
+        return verify_sap_credentials(emp_code, dob)
+
+    cached = verify_cached_credentials(emp_code, dob)
+    if cached:
+        auth_log.info(f"✅ Credentials for {emp_code} verified from cache")
+        return cached
+
+    result = verify_sap_credentials(emp_code, dob)
+    if result.get('success'):
+        store_verified_credentials(emp_code, dob, result)
+    return result
+
+def get_credential_cache_metrics():
+    """Process-local hit/miss counters plus the SAP share of verifications"""
+    with CREDENTIAL_CACHE_METRICS_LOCK:
+        metrics = dict(CREDENTIAL_CACHE_METRICS)
+    lookups = metrics['hits'] + metrics['misses'] + metrics['expired'] + metrics['mismatches']
+    metrics['lookups'] = lookups
+    metrics['sap_calls_avoided'] = metrics['hits']
+    metrics['hit_rate'] = round(metrics['hits'] / lookups, 3) if lookups else None
+    return metrics
+
 def clear_flash_messages():
     """Clear all flash messages from the session"""
     try:
@@ -1876,212 +2808,751 @@ def clear_flash_messages():
     except:
         pass  # Ignore any errors in clearing flash messages
 
-def log_login_attempt(emp_code, employee_name, success, error_message=None, ip_address=None):
-    """Log login attempts"""
+# Login attempts are queued in memory and written by a background thread in
+# batches (every LOGIN_AUDIT_BATCH_SIZE rows or LOGIN_AUDIT_FLUSH_MS), so a
+# login never waits on an audit INSERT/commit. Pending rows are flushed at exit;
+# if the queue is full (database down for a long time) new attempts are dropped
+# and counted rather than blocking logins.
+LOGIN_AUDIT_BATCH_SIZE = int(os.environ.get('LOGIN_AUDIT_BATCH_SIZE', '100'))
+LOGIN_AUDIT_FLUSH_MS = int(os.environ.get('LOGIN_AUDIT_FLUSH_MS', '500'))
+LOGIN_AUDIT_QUEUE_SIZE = int(os.environ.get('LOGIN_AUDIT_QUEUE_SIZE', '10000'))
+LOGIN_AUDIT_QUEUE = queue.Queue(maxsize=LOGIN_AUDIT_QUEUE_SIZE)
+LOGIN_AUDIT_STATE = {'thread': None, 'pid': None, 'stop': threading.Event(),
+                     'written': 0, 'batches': 0, 'dropped': 0, 'failed': 0}
+LOGIN_AUDIT_LOCK = threading.Lock()
+
+def write_login_audit_batch(rows):
+    """Insert a batch of login_logs rows in one statement; returns the rows still to retry (empty on success)"""
     conn = db_pool.getconn()
     try:
         with conn.cursor() as c:
-            c.execute('''INSERT INTO login_logs
-                        (emp_code, employee_name, login_time, ip_address, success, error_message)
-                        VALUES (%s, %s, %s, %s, %s, %s)''',
-                     (emp_code, employee_name, datetime.now(), ip_address, success, error_message))
-            conn.commit()
+            execute_values(c, '''INSERT INTO login_logs
+                                (emp_code, employee_name, login_time, ip_address, success, error_message)
+                                VALUES %s''', rows, page_size=len(rows))
+        conn.commit()
+        LOGIN_AUDIT_STATE['written'] += len(rows)
+        LOGIN_AUDIT_STATE['batches'] += 1
+        return []
+    except psycopg2.OperationalError as e:
+        # Connection/server trouble - keep the batch so the writer can retry it
+        conn.rollback()
+        auth_log.error(f"❌ Could not write {len(rows)} login audit row(s), will retry: {e}")
+        return rows
+    except Exception as e:
+        # A bad row fails the whole statement; retrying the batch would fail forever
+        conn.rollback()
+        auth_log.warning(f"⚠️ Login audit batch rejected ({e}), writing {len(rows)} row(s) one at a time")
+        return write_login_audit_rows(conn, rows)
     finally:
         db_pool.putconn(conn)
 
-def store_manager_info(manager_id, manager_name, manager_email, manager_phone=None, department=None):
-    """Store manager information in the managers table"""
-    conn = db_pool.getconn()
-    try:
-        with conn.cursor() as c:
-            c.execute('''INSERT INTO managers (emp_code, manager_name, manager_email, manager_phone, department)
-                        VALUES (%s, %s, %s, %s, %s)
-                        ON CONFLICT (emp_code)
-                        DO UPDATE SET
-                            manager_name = EXCLUDED.manager_name,
-                            manager_email = EXCLUDED.manager_email,
+def write_login_audit_rows(conn, rows):
+    """Insert rows one by one, dropping any the database rejects; returns the unwritten rows on a connection error"""
+    for i, row in enumerate(rows):
+        try:
+            with conn.cursor() as c:
+                c.execute('''INSERT INTO login_logs
+                             (emp_code, employee_name, login_time, ip_address, success, error_message)
+                             VALUES (%s, %s, %s, %s, %s, %s)''', row)
+            conn.commit()
+            LOGIN_AUDIT_STATE['written'] += 1
+        except psycopg2.OperationalError as e:
+            conn.rollback()
+            auth_log.error(f"❌ Could not write login audit row, will retry: {e}")
+            return rows[i:]
+        except Exception as e:
+            conn.rollback()
+            LOGIN_AUDIT_STATE['dropped'] += 1
+            auth_log.error(f"❌ Dropping login audit row {row[:2]}: {e}")
+    LOGIN_AUDIT_STATE['batches'] += 1
+    return []
+
+def drain_login_audit_queue(limit=None):
+    """Take up to `limit` queued rows without blocking"""
+    rows = []
+    while limit is None or len(rows) < limit:
+        try:
+            rows.append(LOGIN_AUDIT_QUEUE.get_nowait())
+        except queue.Empty:
+            break
+    return rows
+
+def login_audit_writer(stop_event):
+    """Background loop: wait for a row, gather a batch until it is full or the flush interval passes, write it"""
+    flush_seconds = LOGIN_AUDIT_FLUSH_MS / 1000
+    retry = []
+    while not stop_event.is_set():
+        batch = retry
+        if not batch:
+            try:
+                batch = [LOGIN_AUDIT_QUEUE.get(timeout=1)]
+            except queue.Empty:
+                continue
+
+        deadline = time.monotonic() + flush_seconds
+        while len(batch) < LOGIN_AUDIT_BATCH_SIZE and not stop_event.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(LOGIN_AUDIT_QUEUE.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        retry = write_login_audit_batch(batch)
+        if retry:
+            # Keep the batch for the next attempt, bounded so a long outage can't grow it forever
+            retry = retry[-LOGIN_AUDIT_QUEUE_SIZE:]
+            LOGIN_AUDIT_STATE['failed'] += 1
+            stop_event.wait(min(flush_seconds * 10, 30))
+
+    # Hand anything still held back to the exit flush
+    for row in retry:
+        try:
+            LOGIN_AUDIT_QUEUE.put_nowait(row)
+        except queue.Full:
+            LOGIN_AUDIT_STATE['dropped'] += 1
+
+def ensure_login_audit_writer():
+    """Start the writer thread in this process on first use (after any fork)"""
+    with LOGIN_AUDIT_LOCK:
+        thread = LOGIN_AUDIT_STATE['thread']
+        if thread and thread.is_alive() and LOGIN_AUDIT_STATE['pid'] == os.getpid():
+            return
+        stop_event = threading.Event()
+        thread = threading.Thread(target=login_audit_writer, args=(stop_event,), name='login-audit-writer', daemon=True)
+        if LOGIN_AUDIT_STATE['pid'] != os.getpid():
+            atexit.register(flush_login_audit)
+        LOGIN_AUDIT_STATE.update({'thread': thread, 'pid': os.getpid(), 'stop': stop_event})
+    thread.start()
+
+def flush_login_audit(timeout=5):
+    """Stop the writer and write whatever is still queued (registered with atexit)"""
+    thread = LOGIN_AUDIT_STATE['thread']
+    LOGIN_AUDIT_STATE['stop'].set()
+    if thread and thread.is_alive() and thread is not threading.current_thread():
+        thread.join(timeout=timeout)
+
+    while True:
+        rows = drain_login_audit_queue(LOGIN_AUDIT_BATCH_SIZE)
+        if not rows:
+            break
+        rows = write_login_audit_batch(rows)
+        if rows:
+            LOGIN_AUDIT_STATE['dropped'] += len(rows) + LOGIN_AUDIT_QUEUE.qsize()
+            auth_log.warning(f"⚠️ Lost {LOGIN_AUDIT_STATE['dropped']} login audit row(s) at shutdown")
+            break
+
+def log_login_attempt(emp_code, employee_name, success, error_message=None, ip_address=None):
+    """Queue a login attempt for the audit writer (never blocks the login)"""
+    try:
+        LOGIN_AUDIT_QUEUE.put_nowait((emp_code, employee_name, datetime.now(), ip_address, success, error_message))
+    except queue.Full:
+        LOGIN_AUDIT_STATE['dropped'] += 1
+        auth_log.warning(f"⚠️ Login audit queue full - dropped attempt for {emp_code}")
+        return
+    ensure_login_audit_writer()
+
+def store_manager_info(manager_id, manager_name, manager_email, manager_phone=None, department=None):
+    """Store manager information in the managers table"""
+    conn = db_pool.getconn()
+    try:
+        with conn.cursor() as c:
+            c.execute('''INSERT INTO managers (emp_code, manager_name, manager_email, manager_phone, department)
+                        VALUES (%s, %s, %s, %s, %s)
+                        ON CONFLICT (emp_code)
+                        DO UPDATE SET
+                            manager_name = EXCLUDED.manager_name,
+                            manager_email = EXCLUDED.manager_email,
                             manager_phone = EXCLUDED.manager_phone,
                             department = EXCLUDED.department,
                             is_active = TRUE''',
                      (manager_id, manager_name, manager_email, manager_phone, department))
             conn.commit()
-            print(f"✅ Manager info stored/updated: {manager_name} ({manager_email})")
+            directory_log.debug(f"✅ Manager info stored/updated: {manager_name} ({manager_email})")
     except Exception as e:
-        print(f"❌ Error storing manager info: {str(e)}")
+        directory_log.error(f"❌ Error storing manager info: {str(e)}")
     finally:
         db_pool.putconn(conn)
 
-def get_budget_info():
-    """Get current budget information"""
+# Budget spend is append-only: HOD approval reservations, their refunds and admin
+# corrections to 'used' are written to budget_ledger (hod_emp_code NULL = company
+# budget) instead of updating the budget_management / hod_budget counters in place.
+# rollup_budget_ledger folds new entries into those summary rows periodically;
+# reads add the not-yet-rolled deltas so they are always current.
+
+# HOD budget rows with unrolled ledger deltas applied
+HOD_BUDGET_SELECT = '''SELECT b.hod_emp_code, b.hod_name, b.hod_email, b.total_budget,
+                           b.used_budget + d.delta, b.remaining_budget - d.delta
+                    FROM hod_budget b
+                    CROSS JOIN LATERAL (
+                        SELECT COALESCE(SUM(l.amount), 0) AS delta FROM budget_ledger l
+                        WHERE l.rolled_up_at IS NULL AND l.budget_year = b.budget_year
+                        AND l.hod_emp_code = b.hod_emp_code
+                    ) d'''
+
+# Budgets are read on every dashboard load and approval but change rarely, so each
+# process keeps a snapshot. Writers NOTIFY budget_changed; a listener thread drops
+# the snapshot on notification and the TTL bounds staleness if the listener is down.
+BUDGET_CACHE_TTL_SECONDS = float(os.environ.get('BUDGET_CACHE_TTL_SECONDS', '300'))
+BUDGET_CHANGED_CHANNEL = 'budget_changed'
+BUDGET_CACHE = {'snapshot': None, 'loaded_at': 0.0, 'hits': 0, 'loads': 0, 'invalidations': 0,
+                'listener_thread': None, 'listener_pid': None}
+BUDGET_CACHE_LOCK = threading.Lock()
+
+def notify_budget_changed(cursor):
+    """Queue a budget_changed NOTIFY (delivered when the caller's transaction commits)"""
+    cursor.execute('SELECT pg_notify(%s, %s)', (BUDGET_CHANGED_CHANNEL, str(os.getpid())))
+
+def invalidate_budget_cache():
+    """Drop this process's budget snapshot so the next read reloads it"""
+    with BUDGET_CACHE_LOCK:
+        BUDGET_CACHE['snapshot'] = None
+        BUDGET_CACHE['invalidations'] += 1
+
+def budget_cache_listener():
+    """LISTEN for budget_changed and invalidate the snapshot; reconnects after errors"""
+    while True:
+        listen_conn = None
+        try:
+            listen_conn = psycopg2.connect(**app.config['DB_CONFIG'])
+            listen_conn.autocommit = True
+            with listen_conn.cursor() as c:
+                c.execute(f'LISTEN {BUDGET_CHANGED_CHANNEL}')
+            # Anything may have changed while we weren't listening
+            invalidate_budget_cache()
+
+            while True:
+                if select.select([listen_conn], [], [], 60)[0]:
+                    listen_conn.poll()
+                    if listen_conn.notifies:
+                        listen_conn.notifies.clear()
+                        invalidate_budget_cache()
+        except Exception as e:
+            budget_log.warning(f"⚠️ Budget cache listener error, falling back to TTL: {e}")
+        finally:
+            if listen_conn:
+                listen_conn.close()
+        time.sleep(BUDGET_CACHE_TTL_SECONDS / 10)
+
+def ensure_budget_cache_listener():
+    """Start the listener thread in this process on first use (after any fork)"""
+    with BUDGET_CACHE_LOCK:
+        thread = BUDGET_CACHE['listener_thread']
+        if thread and thread.is_alive() and BUDGET_CACHE.get('listener_pid') == os.getpid():
+            return
+        thread = threading.Thread(target=budget_cache_listener, name='budget-cache-listener', daemon=True)
+        BUDGET_CACHE['listener_thread'] = thread
+        BUDGET_CACHE['listener_pid'] = os.getpid()
+    thread.start()
+
+def load_budget_snapshot():
+    """Read the company budget and every HOD budget for the current year in one go"""
+    current_year = datetime.now().year
     conn = db_pool.getconn()
     try:
         with conn.cursor() as c:
-            current_year = datetime.now().year
-            c.execute('''SELECT total_budget, used_budget, remaining_budget
-                        FROM budget_management
-                        WHERE budget_year = %s''', (current_year,))
-            budget = c.fetchone()
+            c.execute('''SELECT b.total_budget, b.used_budget + d.delta, b.remaining_budget - d.delta
+                        FROM budget_management b
+                        CROSS JOIN LATERAL (
+                            SELECT COALESCE(SUM(l.amount), 0) AS delta FROM budget_ledger l
+                            WHERE l.rolled_up_at IS NULL AND l.budget_year = b.budget_year
+                            AND l.hod_emp_code IS NULL
+                        ) d
+                        WHERE b.budget_year = %s''', (current_year,))
+            company = c.fetchone()
+
+            c.execute(HOD_BUDGET_SELECT + '''
+                        WHERE b.budget_year = %s
+                        ORDER BY b.hod_name''', (current_year,))
+            hods = [{
+                'hod_emp_code': row[0],
+                'hod_name': row[1],
+                'hod_email': row[2],
+                'total_budget': float(row[3]),
+                'used_budget': float(row[4]),
+                'remaining_budget': float(row[5])
+            } for row in c.fetchall()]
+        conn.rollback()
+    finally:
+        db_pool.putconn(conn)
 
-            if budget:
-                return {
-                    'total_budget': float(budget[0]),
-                    'used_budget': float(budget[1]),
-                    'remaining_budget': float(budget[2])
-                }
-            else:
-                # Create default budget if not exists
+    return {
+        'year': current_year,
+        'company': {
+            'total_budget': float(company[0]),
+            'used_budget': float(company[1]),
+            'remaining_budget': float(company[2])
+        } if company else None,
+        'hods': hods,
+        'by_email': {hod['hod_email']: hod for hod in hods},
+        'by_emp_code': {hod['hod_emp_code']: hod for hod in hods}
+    }
+
+def get_budget_snapshot():
+    """Cached budget snapshot, reloaded after a budget_changed notification or the TTL"""
+    ensure_budget_cache_listener()
+    with BUDGET_CACHE_LOCK:
+        snapshot = BUDGET_CACHE['snapshot']
+        if (snapshot and snapshot['year'] == datetime.now().year
+                and time.time() - BUDGET_CACHE['loaded_at'] < BUDGET_CACHE_TTL_SECONDS):
+            BUDGET_CACHE['hits'] += 1
+            return snapshot
+        invalidations = BUDGET_CACHE['invalidations']
+
+    snapshot = load_budget_snapshot()
+    with BUDGET_CACHE_LOCK:
+        BUDGET_CACHE['loads'] += 1
+        # Don't install a snapshot that was invalidated while we were loading it
+        if BUDGET_CACHE['invalidations'] == invalidations:
+            BUDGET_CACHE['snapshot'] = snapshot
+            BUDGET_CACHE['loaded_at'] = time.time()
+    return snapshot
+
+def get_budget_info():
+    """Get current budget information"""
+    try:
+        company = get_budget_snapshot()['company']
+        if company:
+            return dict(company)
+
+        # Create default budget if not exists
+        conn = db_pool.getconn()
+        try:
+            with conn.cursor() as c:
                 c.execute('''INSERT INTO budget_management (total_budget, used_budget, remaining_budget, budget_year)
-                            VALUES (100000.00, 0.00, 100000.00, %s)''', (current_year,))
-                conn.commit()
-                return {
-                    'total_budget': 100000.00,
-                    'used_budget': 0.00,
-                    'remaining_budget': 100000.00
-                }
+                            VALUES (100000.00, 0.00, 100000.00, %s)''', (datetime.now().year,))
+                notify_budget_changed(c)
+            conn.commit()
+        finally:
+            db_pool.putconn(conn)
+        invalidate_budget_cache()
+        return {
+            'total_budget': 100000.00,
+            'used_budget': 0.00,
+            'remaining_budget': 100000.00
+        }
     except Exception as e:
-        print(f"❌ Error getting budget info: {str(e)}")
+        budget_log.error(f"❌ Error getting budget info: {str(e)}")
         return {
             'total_budget': 100000.00,
             'used_budget': 0.00,
             'remaining_budget': 100000.00
         }
-    finally:
-        db_pool.putconn(conn)
 
 def get_hod_budget_info_by_email(hod_email):
     """Get HOD-specific budget information from hod_budget table"""
-    conn = db_pool.getconn()
     try:
-        with conn.cursor() as c:
-            current_year = datetime.now().year
-            c.execute('''SELECT total_budget, used_budget, remaining_budget
-                        FROM hod_budget
-                        WHERE hod_email = %s AND budget_year = %s''', (hod_email, current_year))
-            budget = c.fetchone()
-
-            if budget:
-                return {
-                    'total_budget': float(budget[0]),
-                    'used_budget': float(budget[1]),
-                    'remaining_budget': float(budget[2])
-                }
-            else:
-                # Return default values if HOD budget not found
-                print(f"⚠️ HOD budget not found for email: {hod_email}")
-                return {
-                    'total_budget': 50000.00,
-                    'used_budget': 0.00,
-                    'remaining_budget': 50000.00
-                }
+        hod = get_budget_snapshot()['by_email'].get(hod_email)
+        if hod:
+            return {
+                'total_budget': hod['total_budget'],
+                'used_budget': hod['used_budget'],
+                'remaining_budget': hod['remaining_budget']
+            }
+        else:
+            # Return default values if HOD budget not found
+            budget_log.warning(f"⚠️ HOD budget not found for email: {hod_email}")
+            return {
+                'total_budget': 50000.00,
+                'used_budget': 0.00,
+                'remaining_budget': 50000.00
+            }
     except Exception as e:
-        print(f"❌ Error getting HOD budget info: {str(e)}")
+        budget_log.error(f"❌ Error getting HOD budget info: {str(e)}")
         return {
             'total_budget': 50000.00,
             'used_budget': 0.00,
             'remaining_budget': 50000.00
         }
-    finally:
-        db_pool.putconn(conn)
 
 def get_hod_budget_info(hod_emp_code):
     """Get HOD budget information for a specific HOD"""
-    conn = db_pool.getconn()
     try:
-        with conn.cursor() as c:
-            current_year = datetime.now().year
-            c.execute('''SELECT hod_emp_code, hod_name, hod_email, total_budget, used_budget, remaining_budget
-                        FROM hod_budget
-                        WHERE hod_emp_code = %s AND budget_year = %s''', (hod_emp_code, current_year))
-            result = c.fetchone()
-
-            if result:
-                return {
-                    'hod_emp_code': result[0],
-                    'hod_name': result[1],
-                    'hod_email': result[2],
-                    'total_budget': float(result[3]),
-                    'used_budget': float(result[4]),
-                    'remaining_budget': float(result[5])
-                }
-            else:
-                return None
+        hod = get_budget_snapshot()['by_emp_code'].get(hod_emp_code)
+        return dict(hod) if hod else None
     except Exception as e:
-        print(f"❌ Error getting HOD budget info for {hod_emp_code}: {str(e)}")
+        budget_log.error(f"❌ Error getting HOD budget info for {hod_emp_code}: {str(e)}")
         return None
-    finally:
-        db_pool.putconn(conn)
 
 def get_all_hod_budgets():
     """Get budget information for all HODs"""
+    try:
+        return [dict(hod) for hod in get_budget_snapshot()['hods']]
+    except Exception as e:
+        budget_log.error(f"❌ Error getting all HOD budgets: {str(e)}")
+        return []
+
+def append_budget_entry(cursor, amount, entry_type, hod_emp_code=None, request_id=None, note=None, budget_year=None):
+    """Append one ledger entry using the caller's cursor (positive amount = spend, negative = refund)"""
+    cursor.execute('''INSERT INTO budget_ledger (budget_year, hod_emp_code, request_id, entry_type, amount, note)
+                      VALUES (%s, %s, %s, %s, %s, %s)''',
+                   (budget_year or datetime.now().year, hod_emp_code, request_id, entry_type, amount, note))
+
+def rollup_budget_ledger():
+    """Fold not-yet-rolled ledger entries into budget_management / hod_budget in one transaction"""
+    stats = {'rows_scanned': 0, 'groups': 0, 'rows_unmatched': 0}
     conn = db_pool.getconn()
     try:
         with conn.cursor() as c:
-            current_year = datetime.now().year
-            # Use explicit column names to ensure correct order
-            c.execute('''SELECT
-                            hod_emp_code,
-                            hod_name,
-                            hod_email,
-                            total_budget,
-                            used_budget,
-                            remaining_budget
-                        FROM hod_budget
-                        WHERE budget_year = %s
-                        ORDER BY hod_name''', (current_year,))
-            results = c.fetchall()
+            # This every-minute job is what creates a new year's budget rows on Jan 1;
+            # entries can also reach a year before anything created its rows
+            c.execute('SELECT DISTINCT budget_year FROM budget_ledger WHERE rolled_up_at IS NULL')
+            for budget_year in sorted({row[0] for row in c.fetchall()} | {datetime.now().year}):
+                ensure_budget_year(c, budget_year)
+
+            # Only entries with a budget row to land in are marked; the rest wait for one
+            c.execute('''WITH rolled AS (
+                            UPDATE budget_ledger l SET rolled_up_at = NOW()
+                            WHERE l.rolled_up_at IS NULL
+                            AND CASE WHEN l.hod_emp_code IS NULL
+                                THEN EXISTS (SELECT 1 FROM budget_management b WHERE b.budget_year = l.budget_year)
+                                ELSE EXISTS (SELECT 1 FROM hod_budget h
+                                             WHERE h.hod_emp_code = l.hod_emp_code AND h.budget_year = l.budget_year)
+                            END
+                            RETURNING l.budget_year, l.hod_emp_code, l.amount
+                        )
+                        SELECT budget_year, hod_emp_code, SUM(amount), COUNT(*)
+                        FROM rolled GROUP BY budget_year, hod_emp_code''')
+            groups = c.fetchall()
 
-            # Debug: Print raw database results
-            print(f"🔍 Raw Database Results (first 3):")
-            for i, result in enumerate(results[:3]):
-                print(f"  Raw {i+1}: {result}")
-                print(f"    - hod_emp_code: {result[0]}")
-                print(f"    - hod_name: {result[1]}")
-                print(f"    - hod_email: {result[2]}")
-                print(f"    - total_budget: {result[3]}")
-                print(f"    - used_budget: {result[4]}")
-                print(f"    - remaining_budget: {result[5]}")
-
-            hod_budgets = []
-            for result in results:
-                hod_budgets.append({
-                    'hod_emp_code': result[0],
-                    'hod_name': result[1],
-                    'hod_email': result[2],
-                    'total_budget': float(result[3]),
-                    'used_budget': float(result[4]),
-                    'remaining_budget': float(result[5])
-                })
+            for budget_year, hod_emp_code, delta, count in groups:
+                stats['rows_scanned'] += count
+                if hod_emp_code is None:
+                    c.execute('''UPDATE budget_management
+                                SET used_budget = used_budget + %s,
+                                    remaining_budget = remaining_budget - %s,
+                                    updated_at = CURRENT_TIMESTAMP
+                                WHERE budget_year = %s''', (delta, delta, budget_year))
+                else:
+                    c.execute('''UPDATE hod_budget
+                                SET used_budget = used_budget + %s,
+                                    remaining_budget = remaining_budget - %s,
+                                    updated_at = CURRENT_TIMESTAMP
+                                WHERE hod_emp_code = %s AND budget_year = %s''', (delta, delta, hod_emp_code, budget_year))
+                if c.rowcount == 0:
+                    # Never mark entries rolled up without applying them
+                    raise RuntimeError(f"no budget row for {hod_emp_code or 'company'} in {budget_year}")
+            stats['groups'] = len(groups)
+
+            c.execute('SELECT COUNT(*) FROM budget_ledger WHERE rolled_up_at IS NULL')
+            stats['rows_unmatched'] = c.fetchone()[0]
+        conn.commit()
+        if stats['rows_scanned']:
+            budget_log.info(f"💰 Budget ledger rollup: {stats['rows_scanned']} entries into {stats['groups']} budget(s)")
+        if stats['rows_unmatched']:
+            budget_log.warning(f"⚠️ {stats['rows_unmatched']} budget ledger entries have no hod_budget row yet - left pending")
+    except Exception as e:
+        conn.rollback()
+        budget_log.error(f"❌ Error rolling up budget ledger: {e}")
+        stats['error'] = str(e)
+    finally:
+        db_pool.putconn(conn)
+    return stats
+
+# HOD approval checks budget atomically: a per-HOD advisory lock serializes
+# concurrent approvals, then one statement checks the remaining budget and moves
+# the request to Pending Admin Approval. HOD approval doesn't spend budget - the
+# real cost is entered by the admin - so nothing is reserved unless
+# HOD_APPROVAL_RESERVE_AMOUNT is set, in which case that amount is appended to
+# the ledger and released again if the admin rejects the request.
+HOD_APPROVAL_MIN_REMAINING = float(os.environ.get('HOD_APPROVAL_MIN_REMAINING', '500'))
+HOD_APPROVAL_RESERVE_AMOUNT = float(os.environ.get('HOD_APPROVAL_RESERVE_AMOUNT', '0'))
+HOD_DEFAULT_BUDGET = 50000.00  # Same fallback get_hod_budget_info_by_email uses for HODs without a row
+BUDGET_RESERVATION_MAX_RETRIES = int(os.environ.get('BUDGET_RESERVATION_MAX_RETRIES', '3'))
+BUDGET_LOCK_TIMEOUT_MS = int(os.environ.get('BUDGET_LOCK_TIMEOUT_MS', '5000'))
+BUDGET_LOCK_NAMESPACE = 727002  # First key of the (namespace, hashtext(hod_email)) advisory lock
+
+# Per-process contention metrics, exposed via /admin_budget_reservations
+BUDGET_RESERVATION_METRICS = {
+    'attempts': 0, 'approved': 0, 'insufficient_budget': 0, 'not_pending': 0,
+    'lock_contended': 0, 'lock_wait_seconds': 0.0, 'max_lock_wait_seconds': 0.0,
+    'retries': 0, 'errors': 0
+}
+BUDGET_RESERVATION_METRICS_LOCK = threading.Lock()
+
+def record_budget_reservation_metric(metric, amount=1):
+    """Increment a per-process budget reservation counter"""
+    with BUDGET_RESERVATION_METRICS_LOCK:
+        BUDGET_RESERVATION_METRICS[metric] += amount
+        if metric == 'lock_wait_seconds':
+            BUDGET_RESERVATION_METRICS['max_lock_wait_seconds'] = max(
+                BUDGET_RESERVATION_METRICS['max_lock_wait_seconds'], amount)
+
+def reserve_budget_and_approve(conn, request_id, hod_email, hod_response):
+    """
+    Approve a pending request after checking (and, if configured, reserving) HOD
+    budget in one transaction on `conn`.
+    Returns (outcome, remaining_budget) where outcome is 'approved',
+    'insufficient_budget' or 'not_pending'.
+    """
+    current_year = datetime.now().year
+    params = {
+        'request_id': request_id,
+        'hod_email': hod_email,
+        'hod_response': hod_response,
+        'approved_at': datetime.now(),
+        'budget_year': current_year,
+        'default_budget': HOD_DEFAULT_BUDGET,
+        'min_remaining': HOD_APPROVAL_MIN_REMAINING,
+        'amount': HOD_APPROVAL_RESERVE_AMOUNT
+    }
+
+    for attempt in range(BUDGET_RESERVATION_MAX_RETRIES + 1):
+        record_budget_reservation_metric('attempts')
+        try:
+            with conn.cursor() as c:
+                c.execute('SET LOCAL lock_timeout = %s', (BUDGET_LOCK_TIMEOUT_MS,))
+
+                # Serialize approvals for the same HOD, counting how often we had to wait
+                c.execute('SELECT pg_try_advisory_xact_lock(%s, hashtext(%s))', (BUDGET_LOCK_NAMESPACE, hod_email))
+                if not c.fetchone()[0]:
+                    record_budget_reservation_metric('lock_contended')
+                    wait_started = time.time()
+                    c.execute('SELECT pg_advisory_xact_lock(%s, hashtext(%s))', (BUDGET_LOCK_NAMESPACE, hod_email))
+                    record_budget_reservation_metric('lock_wait_seconds', time.time() - wait_started)
+
+                # Fresh snapshot after the lock, so earlier reservations are visible
+                c.execute('''WITH budget AS (
+                                SELECT b.hod_emp_code,
+                                       b.remaining_budget - COALESCE((
+                                           SELECT SUM(l.amount) FROM budget_ledger l
+                                           WHERE l.rolled_up_at IS NULL AND l.budget_year = b.budget_year
+                                           AND l.hod_emp_code = b.hod_emp_code
+                                       ), 0) AS remaining
+                                FROM hod_budget b
+                                WHERE b.hod_email = %(hod_email)s AND b.budget_year = %(budget_year)s
+                                LIMIT 1
+                            ), approved AS (
+                                UPDATE taxi_requests
+                                SET status = 'Pending Admin Approval', hod_response = %(hod_response)s,
+                                    hod_approval_date = %(approved_at)s
+                                WHERE id = %(request_id)s
+                                AND status IN ('Pending Manager Approval', 'Pending')
+                                AND COALESCE((SELECT remaining FROM budget), %(default_budget)s) >= %(min_remaining)s
+                                RETURNING id
+                            ), reserved AS (
+                                INSERT INTO budget_ledger (budget_year, hod_emp_code, request_id, entry_type, amount, note)
+                                SELECT %(budget_year)s, scope.hod_emp_code, approved.id, 'reservation', %(amount)s, 'HOD approval'
+                                FROM approved
+                                CROSS JOIN (SELECT NULL::TEXT AS hod_emp_code
+                                            UNION ALL SELECT hod_emp_code FROM budget) scope
+                                WHERE %(amount)s > 0
+                                RETURNING hod_emp_code, amount
+                            )
+                            SELECT COALESCE((SELECT remaining FROM budget), %(default_budget)s)
+                                       - COALESCE((SELECT SUM(amount) FROM reserved WHERE hod_emp_code IS NOT NULL), 0),
+                                   EXISTS (SELECT 1 FROM approved),
+                                   EXISTS (SELECT 1 FROM taxi_requests WHERE id = %(request_id)s
+                                           AND status IN ('Pending Manager Approval', 'Pending'))''', params)
+                remaining, approved, still_pending = c.fetchone()
+
+            if approved:
+                with conn.cursor() as c:
+                    notify_budget_changed(c)
+                conn.commit()
+                invalidate_budget_cache()
+                record_budget_reservation_metric('approved')
+                if HOD_APPROVAL_RESERVE_AMOUNT > 0:
+                    budget_log.info(f"💰 Reserved ₹{HOD_APPROVAL_RESERVE_AMOUNT:,.2f} for {request_id} ({hod_email}), remaining ₹{float(remaining):,.2f}")
+                else:
+                    budget_log.info(f"💰 Budget check passed for {request_id} ({hod_email}), remaining ₹{float(remaining):,.2f}")
+                return 'approved', float(remaining)
+
+            conn.rollback()
+            outcome = 'insufficient_budget' if still_pending else 'not_pending'
+            record_budget_reservation_metric(outcome)
+            return outcome, float(remaining)
+
+        except (psycopg2.extensions.TransactionRollbackError, psycopg2.OperationalError) as e:
+            conn.rollback()
+            # Deadlocks/serialization failures and lock_timeout (55P03) are worth retrying
+            retryable = isinstance(e, psycopg2.extensions.TransactionRollbackError) or getattr(e, 'pgcode', None) == '55P03'
+            if not retryable or attempt >= BUDGET_RESERVATION_MAX_RETRIES:
+                record_budget_reservation_metric('errors')
+                raise
+            record_budget_reservation_metric('retries')
+            budget_log.warning(f"⚠️ Budget reservation for {request_id} hit contention ({e.pgcode}), retrying")
+            time.sleep(0.05 * (attempt + 1) + random.uniform(0, 0.05))
+        except Exception:
+            conn.rollback()
+            record_budget_reservation_metric('errors')
+            raise
+
+def release_budget_reservation(cursor, request_id):
+    """Append refund entries cancelling whatever is still reserved for a request"""
+    cursor.execute('''INSERT INTO budget_ledger (budget_year, hod_emp_code, request_id, entry_type, amount, note)
+                      SELECT budget_year, hod_emp_code, request_id, 'refund', -SUM(amount), 'Reservation released'
+                      FROM budget_ledger
+                      WHERE request_id = %s AND entry_type IN ('reservation', 'refund')
+                      GROUP BY budget_year, hod_emp_code, request_id
+                      HAVING SUM(amount) > 0''', (request_id,))
+    if cursor.rowcount:
+        notify_budget_changed(cursor)
+    return cursor.rowcount
+
+# Burn-rate forecast: a daily job folds ledger spend into budget_burn_daily (per
+# HOD, department and day, recomputing only days touched since its last run) and
+# derives one budget_forecast row per budget. Budget pages read those small tables.
+BUDGET_FORECAST_WINDOW_DAYS = int(os.environ.get('BUDGET_FORECAST_WINDOW_DAYS', '28'))
+BUDGET_FORECAST_INTERVAL_HOURS = float(os.environ.get('BUDGET_FORECAST_INTERVAL_HOURS', '24'))
+# Admins record actual spend by raising 'used', which is written as an adjustment;
+# adjustments that lower it are corrections, not negative spend, so they are left out
+BUDGET_SPEND_ENTRY_TYPES = ['reservation', 'refund', 'adjustment']
+COMPANY_BUDGET_KEY = ''  # hod_emp_code of company-wide rows in the burn/forecast tables
+
+def refresh_budget_burn(cursor, since_date):
+    """Recompute budget_burn_daily for every day from since_date onwards; returns rows written"""
+    cursor.execute('''INSERT INTO budget_burn_daily (spend_date, hod_emp_code, department, amount, entries, updated_at)
+                      SELECT l.created_at::DATE, COALESCE(l.hod_emp_code, %s), COALESCE(t.department, 'Unassigned'),
+                             SUM(l.amount), COUNT(*), NOW()
+                      FROM budget_ledger l
+                      LEFT JOIN taxi_requests t ON t.id = l.request_id
+                      WHERE l.created_at >= %s AND l.entry_type = ANY(%s)
+                      AND (l.entry_type <> 'adjustment' OR l.amount > 0)
+                      GROUP BY 1, 2, 3
+                      ON CONFLICT (spend_date, hod_emp_code, department) DO UPDATE SET
+                      amount = EXCLUDED.amount,
+                      entries = EXCLUDED.entries,
+                      updated_at = NOW()''',
+                   (COMPANY_BUDGET_KEY, since_date, BUDGET_SPEND_ENTRY_TYPES))
+    return cursor.rowcount
+
+def forecast_budget(remaining, window_spend, this_week, last_week, today):
+    """Burn rate per day, projected exhaustion date and week-over-week change for one budget"""
+    burn_rate = max(float(window_spend or 0), 0.0) / BUDGET_FORECAST_WINDOW_DAYS
+    if remaining <= 0:
+        exhaustion_date = today
+    elif burn_rate > 0:
+        exhaustion_date = today + timedelta(days=int(remaining / burn_rate))
+    else:
+        exhaustion_date = None
+
+    this_week = float(this_week or 0)
+    last_week = float(last_week or 0)
+    wow_change_pct = round((this_week - last_week) / last_week * 100, 1) if last_week else None
+    return {
+        'burn_rate_per_day': round(burn_rate, 2),
+        'spend_this_week': this_week,
+        'spend_last_week': last_week,
+        'wow_change_pct': wow_change_pct,
+        'projected_exhaustion_date': exhaustion_date
+    }
+
+def refresh_budget_forecasts():
+    """Daily job: update budget_burn_daily incrementally and rebuild budget_forecast"""
+    stats = {'rows_scanned': 0, 'forecasts': 0, 'budgets_burning': 0}
+    today = datetime.now().date()
+    try:
+        watermark = load_job_watermark('budget_forecast')
+        full_scan = watermark is None
+        # Re-aggregate from the day before the last run so late commits on that day are included
+        since_date = datetime(today.year, 1, 1).date() if full_scan else watermark['watermark_date'] - timedelta(days=1)
+        stats['scan_mode'] = 'full' if full_scan else 'incremental'
+        snapshot = load_budget_snapshot()
+
+        conn = db_pool.getconn()
+        try:
+            with conn.cursor() as c:
+                stats['rows_scanned'] = refresh_budget_burn(c, since_date)
+
+                c.execute('''SELECT hod_emp_code,
+                                   SUM(amount) FILTER (WHERE spend_date > %(today)s - %(window)s),
+                                   SUM(amount) FILTER (WHERE spend_date > %(today)s - 7),
+                                   SUM(amount) FILTER (WHERE spend_date <= %(today)s - 7 AND spend_date > %(today)s - 14)
+                            FROM budget_burn_daily
+                            WHERE spend_date > %(today)s - GREATEST(%(window)s, 14)
+                            GROUP BY hod_emp_code''',
+                         {'today': today, 'window': BUDGET_FORECAST_WINDOW_DAYS})
+                spend = {row[0]: row[1:] for row in c.fetchall()}
+
+                budgets = [(COMPANY_BUDGET_KEY, snapshot['company'])] if snapshot['company'] else []
+                budgets += [(hod['hod_emp_code'], hod) for hod in snapshot['hods']]
+                for key, budget in budgets:
+                    forecast = forecast_budget(budget['remaining_budget'], *spend.get(key, (0, 0, 0)), today)
+                    c.execute('''INSERT INTO budget_forecast
+                                (hod_emp_code, budget_year, remaining_budget, burn_rate_per_day, spend_this_week,
+                                 spend_last_week, wow_change_pct, projected_exhaustion_date, computed_at)
+                                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, NOW())
+                                ON CONFLICT (hod_emp_code) DO UPDATE SET
+                                budget_year = EXCLUDED.budget_year,
+                                remaining_budget = EXCLUDED.remaining_budget,
+                                burn_rate_per_day = EXCLUDED.burn_rate_per_day,
+                                spend_this_week = EXCLUDED.spend_this_week,
+                                spend_last_week = EXCLUDED.spend_last_week,
+                                wow_change_pct = EXCLUDED.wow_change_pct,
+                                projected_exhaustion_date = EXCLUDED.projected_exhaustion_date,
+                                computed_at = NOW()''',
+                             (key, snapshot['year'], budget['remaining_budget'], forecast['burn_rate_per_day'],
+                              forecast['spend_this_week'], forecast['spend_last_week'], forecast['wow_change_pct'],
+                              forecast['projected_exhaustion_date']))
+                    stats['forecasts'] += 1
+                    if forecast['burn_rate_per_day'] > 0:
+                        stats['budgets_burning'] += 1
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            db_pool.putconn(conn)
 
-            return hod_budgets
+        save_job_watermark('budget_forecast', today, datetime.now(), full_scan)
+        budget_log.info(f"📈 Budget forecasts refreshed ({stats['scan_mode']}): {stats['rows_scanned']} daily rows, "
+                        f"{stats['forecasts']} budgets, {stats['budgets_burning']} with spend in the last {BUDGET_FORECAST_WINDOW_DAYS} days")
     except Exception as e:
-        print(f"❌ Error getting all HOD budgets: {str(e)}")
-        return []
+        budget_log.error(f"❌ Error refreshing budget forecasts: {e}")
+        stats['error'] = str(e)
+    return stats
+
+def get_budget_forecasts():
+    """Latest forecast per budget keyed by hod_emp_code (COMPANY_BUDGET_KEY for the company budget)"""
+    conn = db_pool.getconn()
+    try:
+        with conn.cursor() as c:
+            c.execute('''SELECT hod_emp_code, burn_rate_per_day, spend_this_week, spend_last_week,
+                               wow_change_pct, projected_exhaustion_date, computed_at
+                        FROM budget_forecast WHERE budget_year = %s''', (datetime.now().year,))
+            return {
+                row[0]: {
+                    'burn_rate_per_day': float(row[1]),
+                    'spend_this_week': float(row[2]),
+                    'spend_last_week': float(row[3]),
+                    'wow_change_pct': float(row[4]) if row[4] is not None else None,
+                    'projected_exhaustion_date': row[5],
+                    'computed_at': row[6]
+                } for row in c.fetchall()
+            }
+    except Exception as e:
+        budget_log.error(f"❌ Error getting budget forecasts: {e}")
+        return {}
     finally:
         db_pool.putconn(conn)
 
-def update_budget(cost):
-    """Update budget when a request is approved"""
+def get_budget_burn_by_month(hod_emp_code=COMPANY_BUDGET_KEY):
+    """Spend per month and department for the current year from budget_burn_daily"""
     conn = db_pool.getconn()
     try:
         with conn.cursor() as c:
-            current_year = datetime.now().year
-            c.execute('''UPDATE budget_management
-                        SET used_budget = used_budget + %s,
-                            remaining_budget = remaining_budget - %s,
-                            updated_at = CURRENT_TIMESTAMP
-                        WHERE budget_year = %s''', (cost, cost, current_year))
-            conn.commit()
-            print(f"✅ Budget updated: +₹{cost}")
+            c.execute('''SELECT TO_CHAR(spend_date, 'YYYY-MM'), department, SUM(amount), SUM(entries)
+                        FROM budget_burn_daily
+                        WHERE hod_emp_code = %s AND spend_date >= %s
+                        GROUP BY 1, 2
+                        ORDER BY 1, 2''', (hod_emp_code, datetime(datetime.now().year, 1, 1).date()))
+            return [
+                {'month': row[0], 'department': row[1], 'amount': float(row[2]), 'entries': int(row[3])}
+                for row in c.fetchall()
+            ]
     except Exception as e:
-        print(f"❌ Error updating budget: {str(e)}")
+        budget_log.error(f"❌ Error getting monthly budget burn: {e}")
+        return []
     finally:
         db_pool.putconn(conn)
 
 def send_own_vehicle_confirmation_email(user, reference_id):
     """Send confirmation email for own vehicle request to user only"""
     try:
-        if not EMAIL_CONFIGURED:
-            print("⚠️ Email not configured, skipping own vehicle confirmation email")
+        if not email_configured():
+            mail_log.warning("⚠️ Email not configured, skipping own vehicle confirmation email")
             return
 
         subject = f"Own Vehicle Request Confirmation - Reference ID: {reference_id}"
@@ -2164,17 +3635,17 @@ def send_own_vehicle_confirmation_email(user, reference_id):
         </html>"""
 
         send_email_flask_mail(user['employee_email'], subject, body, email_type='own_vehicle_confirmation')
-        print(f"✅ Own vehicle confirmation email sent to {user['employee_email']}")
+        mail_log.info(f"✅ Own vehicle confirmation email sent to {user['employee_email']}")
 
     except Exception as e:
-        print(f"❌ Error sending own vehicle confirmation email: {str(e)}")
+        mail_log.error(f"❌ Error sending own vehicle confirmation email: {str(e)}")
 
 def send_feedback_reminder_email(user, request_id, travel_date, from_location, to_location, travel_time, purpose, passengers, returning_ride, return_from_location, return_to_location, return_time):
-    """Send feedback reminder email to user 1 day after travel date"""
+    """Send feedback reminder email to user 1 day after travel date. Returns True if sent"""
     try:
-        if not EMAIL_CONFIGURED:
-            print("⚠️ Email not configured, skipping feedback reminder email")
-            return
+        if not email_configured():
+            scheduler_log.warning("⚠️ Email not configured, skipping feedback reminder email")
+            return False
 
         subject = f"Feedback Reminder - Taxi Request {request_id}"
 
@@ -2280,48 +3751,51 @@ def send_feedback_reminder_email(user, request_id, travel_date, from_location, t
         </body>
         </html>"""
 
-        send_email_flask_mail(user['employee_email'], subject, body, email_type='feedback_reminder')
-        print(f"✅ Feedback reminder email sent to {user['employee_email']} for request {request_id}")
+        sent = send_email_flask_mail(user['employee_email'], subject, body, email_type='feedback_reminder')
+        if sent:
+            scheduler_log.info(f"✅ Feedback reminder email sent to {user['employee_email']} for request {request_id}")
+        return sent
 
     except Exception as e:
-        print(f"❌ Error sending feedback reminder email: {str(e)}")
+        scheduler_log.error(f"❌ Error sending feedback reminder email: {str(e)}")
+        return False
 
 def send_feedback_reminder_whatsapp(user, request_id, travel_date, from_location, to_location, travel_time, purpose, passengers, returning_ride, return_from_location, return_to_location, return_time):
-    """Send feedback reminder WhatsApp notification to user 1 day after travel date"""
+    """
+    Send feedback reminder WhatsApp notification to user 1 day after travel date.
+    Returns True if sent, False if sending failed, None if skipped (not configured / no phone)
+    """
     try:
-        if not META_ACCESS_TOKEN or not WHATSAPP_PHONE_NUMBER_ID:
-            print("⚠️ WhatsApp API not configured, skipping feedback reminder WhatsApp notification")
-            return
+        if not get_service('whatsapp')['configured']:
+            scheduler_log.warning("⚠️ WhatsApp API not configured, skipping feedback reminder WhatsApp notification")
+            return None
 
         # Format user phone number for WhatsApp
         user_phone = format_phone_number(user.get('employee_phone', ''))
         if not user_phone:
-            print(f"⚠️ No valid phone number available for WhatsApp feedback notification to {user['employee_name']}")
-            return
+            scheduler_log.warning(f"⚠️ No valid phone number available for WhatsApp feedback notification to {user['employee_name']}")
+            return None
 
-        # Prepare parameters for the teximanagment_feedbac template
-        # Template expects: {{1}} = employee_name, {{2}} = request_id
-        parameters = [
-            user['employee_name'],  # {{1}} - employee name
-            request_id              # {{2}} - request ID
-        ]
+        parameters = {'employee_name': user['employee_name'], 'request_id': request_id}
 
         # Send WhatsApp notification using the teximanagment_feedbac template
         success = send_whatsapp_template(user_phone, "teximanagment_feedbac", "en", parameters)
 
         if success:
-            print(f"✅ Feedback reminder WhatsApp sent to {user_phone} for request {request_id}")
+            scheduler_log.info(f"✅ Feedback reminder WhatsApp sent to {user_phone} for request {request_id}")
         else:
-            print(f"❌ Failed to send feedback reminder WhatsApp to {user_phone} for request {request_id}")
+            scheduler_log.error(f"❌ Failed to send feedback reminder WhatsApp to {user_phone} for request {request_id}")
+        return success
 
     except Exception as e:
-        print(f"❌ Error sending feedback reminder WhatsApp: {str(e)}")
+        scheduler_log.error(f"❌ Error sending feedback reminder WhatsApp: {str(e)}")
+        return False
 
 def check_and_send_feedback_reminders():
     """Send manual feedback reminders for approved requests where travel date exceeded 24 hours (one-time only)"""
     try:
-        if not EMAIL_CONFIGURED:
-            print("⚠️ Email not configured, skipping manual feedback reminder check")
+        if not email_configured():
+            scheduler_log.warning("⚠️ Email not configured, skipping manual feedback reminder check")
             return
 
         conn = db_pool.getconn()
@@ -2352,7 +3826,8 @@ def check_and_send_feedback_reminders():
                 requests_to_remind = c.fetchall()
 
                 if requests_to_remind:
-                    print(f"📧 Found {len(requests_to_remind)} approved requests with travel date > 24 hours needing manual feedback reminders")
+                    scheduler_log.info(f"📧 Found {len(requests_to_remind)} approved requests with travel date > 24 hours needing manual feedback reminders")
+                    whatsapp_recipients = []
 
                     for request in requests_to_remind:
                         # Create user object for email function
@@ -2379,143 +3854,616 @@ def check_and_send_feedback_reminders():
                             return_time=request[29].strftime('%H:%M') if request[29] else 'N/A'
                         )
 
-                        # Send feedback reminder WhatsApp notification
-                        send_feedback_reminder_whatsapp(
-                            user=user,
-                            request_id=request[0],
-                            travel_date=request[8].strftime('%Y-%m-%d') if request[8] else 'N/A',
-                            from_location=request[6],
-                            to_location=request[7],
-                            travel_time=request[9].strftime('%H:%M') if request[9] else 'N/A',
-                            purpose=request[10] or 'N/A',
-                            passengers=request[11] or 'N/A',
-                            returning_ride=request[26] or 'no',
-                            return_from_location=request[27] or 'N/A',
-                            return_to_location=request[28] or 'N/A',
-                            return_time=request[29].strftime('%H:%M') if request[29] else 'N/A'
-                        )
+                        # WhatsApp reminders are rendered and sent in bulk after the loop
+                        user_phone = format_phone_number(request[4] or '')
+                        if user_phone:
+                            whatsapp_recipients.append((user_phone, {'employee_name': request[2], 'request_id': request[0]}))
 
                         # Mark manual reminder as sent
                         c.execute('''INSERT INTO feedback_reminders (request_id, reminder_type)
                                     VALUES (%s, %s)''', (request[0], 'manual'))
 
-                        print(f"📧 Manual feedback reminder sent for request {request[0]} to {request[3]}")
+                        scheduler_log.info(f"📧 Manual feedback reminder sent for request {request[0]} to {request[3]}")
 
                     conn.commit()
+
+                    if whatsapp_recipients and get_service('whatsapp')['configured']:
+                        send_whatsapp_template_bulk("teximanagment_feedbac", whatsapp_recipients)
                 else:
-                    print("📧 No approved requests found with travel date > 24 hours that need manual feedback reminders")
+                    scheduler_log.info("📧 No approved requests found with travel date > 24 hours that need manual feedback reminders")
 
         finally:
             db_pool.putconn(conn)
 
     except Exception as e:
-        print(f"❌ Error checking manual feedback reminders: {str(e)}")
+        scheduler_log.error(f"❌ Error checking manual feedback reminders: {str(e)}")
 
 # Removed send_automatic_24hour_reminder function - now handled by overdue reminder scheduler
 
+# Overdue reminders are claimed in chunks (the feedback_reminders marker is the claim)
+# and sent over a small thread pool, so one slow send doesn't hold up the batch
+REMINDER_CHUNK_SIZE = int(os.environ.get('REMINDER_CHUNK_SIZE', '25'))
+REMINDER_MAX_WORKERS = int(os.environ.get('REMINDER_MAX_WORKERS', '4'))
+
+# Incremental scans only look at requests that became eligible since the last run
+# (travel date crossed the cutoff, or approved since then); a full reconciliation
+# pass every REMINDER_FULL_SCAN_HOURS catches anything the watermark skipped,
+# e.g. requests whose reminders failed and were released for retry.
+REMINDER_FULL_SCAN_HOURS = int(os.environ.get('REMINDER_FULL_SCAN_HOURS', '24'))
+REMINDER_WATERMARK_OVERLAP_MINUTES = 5
+REMINDER_SWEEP_INTERVAL_MINUTES = int(os.environ.get('REMINDER_SWEEP_INTERVAL_MINUTES', '360'))
+
+def load_job_watermark(job_name):
+    """Return the persisted watermark for a job, or None if it has never completed"""
+    conn = db_pool.getconn()
+    try:
+        with conn.cursor() as c:
+            c.execute('''SELECT watermark_date, watermark_ts, last_full_scan_at
+                        FROM job_watermarks WHERE job_name = %s''', (job_name,))
+            row = c.fetchone()
+        conn.commit()
+    finally:
+        db_pool.putconn(conn)
+
+    if not row:
+        return None
+    return {'watermark_date': row[0], 'watermark_ts': row[1], 'last_full_scan_at': row[2]}
+
+def save_job_watermark(job_name, watermark_date, watermark_ts, full_scan):
+    """Advance a job's watermark after a successful run"""
+    conn = db_pool.getconn()
+    try:
+        with conn.cursor() as c:
+            c.execute('''INSERT INTO job_watermarks (job_name, watermark_date, watermark_ts, last_full_scan_at, updated_at)
+                        VALUES (%s, %s, %s, %s, NOW())
+                        ON CONFLICT (job_name) DO UPDATE SET
+                        watermark_date = EXCLUDED.watermark_date,
+                        watermark_ts = EXCLUDED.watermark_ts,
+                        last_full_scan_at = COALESCE(EXCLUDED.last_full_scan_at, job_watermarks.last_full_scan_at),
+                        updated_at = NOW()''',
+                     (job_name, watermark_date, watermark_ts, watermark_ts if full_scan else None))
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        scheduler_log.warning(f"⚠️ Could not save watermark for {job_name}: {e}")
+    finally:
+        db_pool.putconn(conn)
+
+def claim_overdue_reminders(cutoff_date, limit, exclude_ids, since_date=None, since_ts=None):
+    """
+    Claim up to `limit` overdue requests by inserting their 'overdue' markers; returns the claimed rows.
+    With since_date/since_ts only requests that became eligible after the watermark are considered.
+    """
+    conn = db_pool.getconn()
+    try:
+        with conn.cursor() as c:
+            c.execute('''WITH candidates AS (
+                            SELECT tr.id FROM taxi_requests tr
+                            WHERE tr.status = 'Approved'
+                            AND tr.type_of_ride = 'company_taxi'
+                            AND tr.travel_date < %s
+                            AND NOT (tr.id = ANY(%s))
+                            AND (%s::date IS NULL OR tr.travel_date >= %s::date OR tr.admin_response_date >= %s::timestamp)
+                            AND NOT EXISTS (SELECT 1 FROM feedback_reminders fr
+                                            WHERE fr.request_id = tr.id AND fr.reminder_type = 'overdue')
+                            AND NOT EXISTS (SELECT 1 FROM taxi_feedback tf WHERE tf.request_id = tr.id)
+                            ORDER BY tr.travel_date
+                            LIMIT %s
+                        ),
+                        claimed AS (
+                            INSERT INTO feedback_reminders (request_id, reminder_type)
+                            SELECT id, 'overdue' FROM candidates
+                            ON CONFLICT (request_id, reminder_type) DO NOTHING
+                            RETURNING request_id
+                        )
+                        SELECT tr.id, tr.employee_name, tr.employee_email, tr.employee_phone, tr.department,
+                               tr.from_location, tr.to_location, tr.travel_date, tr.travel_time, tr.purpose,
+                               tr.passengers, tr.returning_ride, tr.return_from_location, tr.return_to_location,
+                               tr.return_time
+                        FROM taxi_requests tr JOIN claimed ON claimed.request_id = tr.id''',
+                     (cutoff_date, list(exclude_ids), since_date, since_date, since_ts, limit))
+            rows = c.fetchall()
+        conn.commit()
+        return rows
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        db_pool.putconn(conn)
+
+def release_overdue_reminder(request_id):
+    """Remove the 'overdue' marker so a request whose reminders all failed is retried next run"""
+    conn = db_pool.getconn()
+    try:
+        with conn.cursor() as c:
+            c.execute("""DELETE FROM feedback_reminders
+                        WHERE request_id = %s AND reminder_type = 'overdue'""", (request_id,))
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        scheduler_log.error(f"❌ Could not release overdue reminder marker for {request_id}: {e}")
+    finally:
+        db_pool.putconn(conn)
+
+def send_overdue_reminder(row):
+    """Send the email + WhatsApp reminder for one claimed request; returns (request_id, email_sent, whatsapp_sent)"""
+    (request_id, employee_name, employee_email, employee_phone, department, from_location, to_location,
+     travel_date, travel_time, purpose, passengers, returning_ride, return_from_location,
+     return_to_location, return_time) = row
+
+    user = {
+        'employee_name': employee_name,
+        'employee_email': employee_email,
+        'employee_phone': employee_phone,
+        'department': department
+    }
+    details = dict(
+        user=user,
+        request_id=request_id,
+        travel_date=travel_date.strftime('%Y-%m-%d') if travel_date else 'N/A',
+        from_location=from_location,
+        to_location=to_location,
+        travel_time=travel_time.strftime('%H:%M') if travel_time else 'N/A',
+        purpose=purpose or 'N/A',
+        passengers=passengers or 'N/A',
+        returning_ride=returning_ride or 'no',
+        return_from_location=return_from_location or 'N/A',
+        return_to_location=return_to_location or 'N/A',
+        return_time=return_time.strftime('%H:%M') if return_time else 'N/A'
+    )
+
+    email_sent = send_feedback_reminder_email(**details)
+    whatsapp_sent = send_feedback_reminder_whatsapp(**details)
+
+    # Nothing reached the user - drop the claim so the next run tries again
+    if not email_sent and not whatsapp_sent:
+        release_overdue_reminder(request_id)
+    else:
+        scheduler_log.info(f"📧 Overdue reminder sent for request {request_id} to {employee_email}")
+
+    return request_id, email_sent, whatsapp_sent
+
 def check_and_send_overdue_reminders():
     """Check for overdue requests and send reminders (runs every 30 minutes)"""
+    stats = {
+        'claimed': 0, 'email_sent': 0, 'email_failed': 0,
+        'whatsapp_sent': 0, 'whatsapp_failed': 0, 'whatsapp_skipped': 0, 'released': 0
+    }
     try:
-        if not EMAIL_CONFIGURED:
-            print("⚠️ Email not configured, skipping overdue reminder check")
-            return
+        if not email_configured():
+            scheduler_log.warning("⚠️ Email not configured, skipping overdue reminder check")
+            return stats
+
+        # Get approved requests where travel date was more than 24 hours ago
+        run_started_at = datetime.now()
+        cutoff_date = (run_started_at - timedelta(hours=24)).date()
+        started = time.monotonic()
+        released_ids = set()
+
+        watermark = load_job_watermark('overdue_reminders')
+        full_scan = (
+            watermark is None or watermark['last_full_scan_at'] is None or
+            watermark['last_full_scan_at'] < run_started_at - timedelta(hours=REMINDER_FULL_SCAN_HOURS)
+        )
+        since_date = since_ts = None
+        if not full_scan:
+            since_date = watermark['watermark_date']
+            since_ts = watermark['watermark_ts'] - timedelta(minutes=REMINDER_WATERMARK_OVERLAP_MINUTES)
+        stats['scan_mode'] = 'full' if full_scan else 'incremental'
+
+        with ThreadPoolExecutor(max_workers=REMINDER_MAX_WORKERS) as executor:
+            while True:
+                chunk = claim_overdue_reminders(cutoff_date, REMINDER_CHUNK_SIZE, released_ids, since_date, since_ts)
+                if not chunk:
+                    break
 
-        conn = db_pool.getconn()
-        try:
-            with conn.cursor() as c:
-                # Get approved requests where travel date was more than 24 hours ago
-                cutoff_time = datetime.now() - timedelta(hours=24)
+                stats['claimed'] += len(chunk)
+                scheduler_log.info(f"📧 Claimed {len(chunk)} overdue requests needing reminders")
 
-                c.execute('''SELECT id, emp_code, employee_name, employee_email, employee_phone, department,
-                                   from_location, to_location, travel_date, travel_time, purpose, passengers,
-                                   status, manager_email, hod_response, hod_approval_date, admin_response, taxi_details,
-                                   submission_date, admin_response_date, created_at, assigned_cost, type_of_ride,
-                                   vehicle_company, vehicle_type, vehicle_number, returning_ride,
-                                   return_from_location, return_to_location, return_time
-                            FROM taxi_requests
-                            WHERE status = 'Approved'
-                            AND type_of_ride = 'company_taxi'
-                            AND travel_date < %s
-                            AND id NOT IN (
-                                SELECT DISTINCT request_id FROM feedback_reminders
-                                WHERE reminder_type = 'overdue'
-                            )
-                            AND id NOT IN (
-                                SELECT DISTINCT request_id FROM taxi_feedback
-                                WHERE request_id IS NOT NULL
-                            )''', (cutoff_time.date(),))
+                futures = [executor.submit(send_overdue_reminder, row) for row in chunk]
+                for future in as_completed(futures):
+                    try:
+                        request_id, email_sent, whatsapp_sent = future.result()
+                    except Exception as e:
+                        scheduler_log.error(f"❌ Error sending overdue reminder: {e}")
+                        continue
 
-                overdue_requests = c.fetchall()
+                    stats['email_sent' if email_sent else 'email_failed'] += 1
+                    if whatsapp_sent is None:
+                        stats['whatsapp_skipped'] += 1
+                    else:
+                        stats['whatsapp_sent' if whatsapp_sent else 'whatsapp_failed'] += 1
+                    if not email_sent and not whatsapp_sent:
+                        released_ids.add(request_id)
+                        stats['released'] += 1
+
+        save_job_watermark('overdue_reminders', cutoff_date, run_started_at, full_scan)
+
+        elapsed = time.monotonic() - started
+        stats['rows_scanned'] = stats['claimed']
+        stats['messages_sent'] = stats['email_sent'] + stats['whatsapp_sent']
+        stats['messages_failed'] = stats['email_failed'] + stats['whatsapp_failed']
+        stats['messages_attempted'] = stats['messages_sent'] + stats['messages_failed']
+        if stats['claimed']:
+            messages = stats['messages_sent']
+            stats['elapsed_seconds'] = round(elapsed, 2)
+            stats['messages_per_second'] = round(messages / elapsed, 2) if elapsed > 0 else messages
+            scheduler_log.info(f"📊 Overdue reminder run ({stats['scan_mode']}): {stats['claimed']} requests, {messages} messages in {elapsed:.1f}s "
+                  f"({stats['messages_per_second']} msg/s) | email failed: {stats['email_failed']}, "
+                  f"WhatsApp failed: {stats['whatsapp_failed']}, skipped: {stats['whatsapp_skipped']}, "
+                  f"released for retry: {stats['released']}")
+        else:
+            scheduler_log.info(f"📧 No overdue requests found needing reminders ({stats['scan_mode']} scan)")
 
-                if overdue_requests:
-                    print(f"📧 Found {len(overdue_requests)} overdue requests needing reminders")
+    except Exception as e:
+        scheduler_log.error(f"❌ Error checking overdue reminders: {str(e)}")
+        stats['error'] = str(e)
 
-                    for request in overdue_requests:
-                        # Create user object for email function
-                        user = {
-                            'employee_name': request[2],
-                            'employee_email': request[3],
-                            'employee_phone': request[4],
-                            'department': request[5]
-                        }
+    return stats
 
-                        # Send feedback reminder email
-                        send_feedback_reminder_email(
-                            user=user,
-                            request_id=request[0],
-                            travel_date=request[8].strftime('%Y-%m-%d') if request[8] else 'N/A',
-                            from_location=request[6],
-                            to_location=request[7],
-                            travel_time=request[9].strftime('%H:%M') if request[9] else 'N/A',
-                            purpose=request[10] or 'N/A',
-                            passengers=request[11] or 'N/A',
-                            returning_ride=request[26] or 'no',
-                            return_from_location=request[27] or 'N/A',
-                            return_to_location=request[28] or 'N/A',
-                            return_time=request[29].strftime('%H:%M') if request[29] else 'N/A'
+# =============================================================================
+# SCHEDULED ACTIONS (due-time queue)
+# =============================================================================
+# Per-request follow-ups (feedback reminders today; escalations / auto-close
+# later) are stored with the time they become due. The dispatcher in the
+# scheduler leader sleeps until the earliest due_at and is woken by NOTIFY when
+# an earlier action is queued, so nothing waits for the next polling interval.
+SCHEDULED_ACTIONS_CHANNEL = 'scheduled_actions'
+SCHEDULED_ACTION_BATCH_SIZE = 50
+SCHEDULED_ACTION_MAX_ATTEMPTS = 3
+SCHEDULED_ACTION_MAX_SLEEP_SECONDS = 300
+
+def schedule_action(cursor, action, request_id, due_at):
+    """
+    Queue (or reschedule) an action for a request using the caller's cursor, so it
+    commits with the caller's transaction. Listeners are notified on commit.
+    """
+    cursor.execute('''INSERT INTO scheduled_actions (action, request_id, due_at)
+                      VALUES (%s, %s, %s)
+                      ON CONFLICT (action, request_id) DO UPDATE SET
+                      due_at = EXCLUDED.due_at,
+                      status = 'pending',
+                      attempts = 0,
+                      last_error = NULL
+                      WHERE scheduled_actions.status <> 'done\'''', (action, request_id, due_at))
+    cursor.execute('SELECT pg_notify(%s, %s)', (SCHEDULED_ACTIONS_CHANNEL, due_at.isoformat()))
+
+def cancel_scheduled_actions(cursor, request_id, actions=None):
+    """Cancel a request's pending actions (all of them, or only the named ones)"""
+    if actions:
+        cursor.execute('''UPDATE scheduled_actions SET status = 'cancelled', completed_at = NOW()
+                          WHERE request_id = %s AND status = 'pending' AND action = ANY(%s)''',
+                       (request_id, list(actions)))
+    else:
+        cursor.execute('''UPDATE scheduled_actions SET status = 'cancelled', completed_at = NOW()
+                          WHERE request_id = %s AND status = 'pending\'''', (request_id,))
+    return cursor.rowcount
+
+def feedback_reminder_due_at(travel_date, travel_time=None):
+    """Feedback reminders fall due 24 hours after the trip"""
+    if isinstance(travel_date, str):
+        travel_date = datetime.strptime(travel_date, '%Y-%m-%d').date()
+    if isinstance(travel_time, str):
+        try:
+            travel_time = datetime.strptime(travel_time[:5], '%H:%M').time()
+        except ValueError:
+            travel_time = None
+    return datetime.combine(travel_date, travel_time or datetime.min.time()) + timedelta(hours=24)
+
+def handle_feedback_reminder_action(request_id, payload=None):
+    """Send the overdue feedback reminder for one request. Returns True when nothing is left to do"""
+    conn = db_pool.getconn()
+    try:
+        with conn.cursor() as c:
+            c.execute('''WITH claimed AS (
+                            INSERT INTO feedback_reminders (request_id, reminder_type)
+                            SELECT tr.id, 'overdue' FROM taxi_requests tr
+                            WHERE tr.id = %s
+                            AND tr.status = 'Approved'
+                            AND tr.type_of_ride = 'company_taxi'
+                            AND NOT EXISTS (SELECT 1 FROM taxi_feedback tf WHERE tf.request_id = tr.id)
+                            ON CONFLICT (request_id, reminder_type) DO NOTHING
+                            RETURNING request_id
                         )
+                        SELECT tr.id, tr.employee_name, tr.employee_email, tr.employee_phone, tr.department,
+                               tr.from_location, tr.to_location, tr.travel_date, tr.travel_time, tr.purpose,
+                               tr.passengers, tr.returning_ride, tr.return_from_location, tr.return_to_location,
+                               tr.return_time
+                        FROM taxi_requests tr JOIN claimed ON claimed.request_id = tr.id''', (request_id,))
+            row = c.fetchone()
+        conn.commit()
+    finally:
+        db_pool.putconn(conn)
 
-                        # Send feedback reminder WhatsApp notification
-                        send_feedback_reminder_whatsapp(
-                            user=user,
-                            request_id=request[0],
-                            travel_date=request[8].strftime('%Y-%m-%d') if request[8] else 'N/A',
-                            from_location=request[6],
-                            to_location=request[7],
-                            travel_time=request[9].strftime('%H:%M') if request[9] else 'N/A',
-                            purpose=request[10] or 'N/A',
-                            passengers=request[11] or 'N/A',
-                            returning_ride=request[26] or 'no',
-                            return_from_location=request[27] or 'N/A',
-                            return_to_location=request[28] or 'N/A',
-                            return_time=request[29].strftime('%H:%M') if request[29] else 'N/A'
+    if not row:
+        # Already reminded, feedback given, or no longer approved
+        scheduler_log.info(f"ℹ️ Feedback reminder for {request_id} no longer needed")
+        return True
+
+    _, email_sent, whatsapp_sent = send_overdue_reminder(row)
+    return bool(email_sent or whatsapp_sent)
+
+def handle_deferred_send_action(request_id, payload):
+    """Send a notification that was throttled during a web request. Returns True once sent"""
+    sender = DEFERRED_SENDERS.get(payload.get('send'))
+    if not sender:
+        raise ValueError(f"unknown deferred send '{payload.get('send')}'")
+    # No request context here, so the send waits for a slot like any background job
+    return sender(**payload['args'])
+
+# action name -> handler(request_id, payload) returning True when done, False to retry
+SCHEDULED_ACTION_HANDLERS = {
+    'feedback_reminder': handle_feedback_reminder_action,
+    'deferred_send': handle_deferred_send_action,
+}
+
+def claim_due_actions(limit=SCHEDULED_ACTION_BATCH_SIZE):
+    """Move due pending actions to 'running' and return them"""
+    conn = db_pool.getconn()
+    try:
+        with conn.cursor() as c:
+            c.execute('''UPDATE scheduled_actions SET status = 'running', attempts = attempts + 1
+                        WHERE id IN (
+                            SELECT id FROM scheduled_actions
+                            WHERE status = 'pending' AND due_at <= NOW()
+                            ORDER BY due_at
+                            LIMIT %s
+                            FOR UPDATE SKIP LOCKED
                         )
+                        RETURNING id, action, request_id, attempts, payload''', (limit,))
+            rows = c.fetchall()
+        conn.commit()
+        return rows
+    finally:
+        db_pool.putconn(conn)
 
-                        # Mark overdue reminder as sent
-                        c.execute('''INSERT INTO feedback_reminders (request_id, reminder_type)
-                                    VALUES (%s, %s)''', (request[0], 'overdue'))
+def finish_action(action_id, succeeded, attempts, error=None):
+    """Record the outcome of one action; failed actions are retried with backoff"""
+    conn = db_pool.getconn()
+    try:
+        with conn.cursor() as c:
+            if succeeded:
+                c.execute('''UPDATE scheduled_actions SET status = 'done', completed_at = NOW(), last_error = NULL
+                            WHERE id = %s''', (action_id,))
+            elif attempts >= SCHEDULED_ACTION_MAX_ATTEMPTS:
+                c.execute('''UPDATE scheduled_actions SET status = 'failed', completed_at = NOW(), last_error = %s
+                            WHERE id = %s''', (error, action_id))
+            else:
+                c.execute('''UPDATE scheduled_actions
+                            SET status = 'pending', last_error = %s,
+                                due_at = NOW() + (%s * INTERVAL '5 minutes')
+                            WHERE id = %s''', (error, attempts, action_id))
+        conn.commit()
+    finally:
+        db_pool.putconn(conn)
 
-                        print(f"📧 Overdue reminder sent for request {request[0]} to {request[3]}")
+def run_due_actions():
+    """Run every action that is due now; returns the number processed"""
+    processed = 0
+    while True:
+        due = claim_due_actions()
+        if not due:
+            return processed
 
-                    conn.commit()
-                else:
-                    # Only log occasionally to reduce spam
-                    import time
-                    current_minute = int(time.time() / 60)
-                    if current_minute % 10 == 0:  # Log every 10 minutes when no requests
-                        print(f"📧 No overdue requests found needing reminders")
+        for action_id, action, request_id, attempts, payload in due:
+            handler = SCHEDULED_ACTION_HANDLERS.get(action)
+            try:
+                if not handler:
+                    raise ValueError(f"no handler registered for action '{action}'")
+                succeeded = handler(request_id, payload)
+                finish_action(action_id, succeeded, attempts, None if succeeded else 'handler reported failure')
+            except Exception as e:
+                scheduler_log.error(f"❌ Scheduled action {action} for {request_id} failed: {e}")
+                finish_action(action_id, False, attempts, str(e))
+            processed += 1
 
-        finally:
-            db_pool.putconn(conn)
+def seconds_until_next_action():
+    """Seconds until the earliest pending action (capped), 0 if one is already due"""
+    conn = db_pool.getconn()
+    try:
+        with conn.cursor() as c:
+            c.execute('''SELECT EXTRACT(EPOCH FROM MIN(due_at) - NOW())
+                        FROM scheduled_actions WHERE status = 'pending\'''')
+            wait = c.fetchone()[0]
+        conn.commit()
+    finally:
+        db_pool.putconn(conn)
+
+    if wait is None:
+        return SCHEDULED_ACTION_MAX_SLEEP_SECONDS
+    return min(SCHEDULED_ACTION_MAX_SLEEP_SECONDS, max(0.0, float(wait)))
+
+def scheduled_action_dispatcher(stop_event):
+    """Sleep until the next action is due (or a NOTIFY arrives), run it, repeat until stop_event is set"""
+    listen_conn = None
+    try:
+        listen_conn = psycopg2.connect(**app.config['DB_CONFIG'])
+        listen_conn.autocommit = True
+        with listen_conn.cursor() as c:
+            c.execute(f'LISTEN {SCHEDULED_ACTIONS_CHANNEL}')
 
+        # Actions left 'running' by a previous leader that died mid-flight
+        with listen_conn.cursor() as c:
+            c.execute("UPDATE scheduled_actions SET status = 'pending' WHERE status = 'running'")
+
+        scheduler_log.info(f"⏰ Scheduled action dispatcher started (pid {os.getpid()})")
+        while not stop_event.is_set():
+            try:
+                processed = run_due_actions()
+                if processed:
+                    scheduler_log.info(f"⏰ Dispatched {processed} scheduled action(s)")
+                timeout = seconds_until_next_action()
+            except Exception as e:
+                scheduler_log.error(f"❌ Scheduled action dispatcher error: {e}")
+                timeout = 30
+
+            if timeout > 0 and select.select([listen_conn], [], [], timeout)[0]:
+                listen_conn.poll()
+                listen_conn.notifies.clear()
+    except Exception as e:
+        scheduler_log.error(f"❌ Scheduled action dispatcher stopped: {e}")
+    finally:
+        if listen_conn:
+            listen_conn.close()
+
+# =============================================================================
+# OUTBOUND RATE LIMITING (shared across gunicorn workers and the scheduler)
+# =============================================================================
+# Token buckets live in the rate_limit_buckets table so every worker process
+# draws from the same budget. Each send takes one token from the channel bucket
+# and one from the per-recipient bucket; callers wait (queue) while throttled.
+# Background jobs may queue for RATE_LIMIT_MAX_WAIT_SECONDS, but sends made while
+# serving a web request (submit/approve/admin responses) only wait
+# RATE_LIMIT_REQUEST_MAX_WAIT_SECONDS so a burst can't hold request threads
+# until the gunicorn timeout; after that the send is handed to the scheduled
+# action dispatcher as a 'deferred_send' and goes out when the limits allow.
+RATE_LIMIT_CONFIG = {
+    'whatsapp': {
+        'per_second': float(os.environ.get('WHATSAPP_RATE_LIMIT_PER_SECOND', '10')),
+        'burst': float(os.environ.get('WHATSAPP_RATE_LIMIT_BURST', '20')),
+        'recipient_per_minute': float(os.environ.get('WHATSAPP_RECIPIENT_LIMIT_PER_MINUTE', '6'))
+    },
+    'smtp': {
+        'per_second': float(os.environ.get('SMTP_RATE_LIMIT_PER_SECOND', '5')),
+        'burst': float(os.environ.get('SMTP_RATE_LIMIT_BURST', '10')),
+        'recipient_per_minute': float(os.environ.get('SMTP_RECIPIENT_LIMIT_PER_MINUTE', '10'))
+    }
+}
+RATE_LIMIT_MAX_WAIT_SECONDS = float(os.environ.get('RATE_LIMIT_MAX_WAIT_SECONDS', '120'))
+RATE_LIMIT_REQUEST_MAX_WAIT_SECONDS = float(os.environ.get('RATE_LIMIT_REQUEST_MAX_WAIT_SECONDS', '3'))
+
+# Per-process throttle metrics, exposed via /admin_rate_limits
+RATE_LIMIT_METRICS = {
+    channel: {'acquired': 0, 'throttled': 0, 'wait_seconds': 0.0, 'timeouts': 0, 'deferred': 0, 'errors': 0,
+              'upstream_429': 0}
+    for channel in RATE_LIMIT_CONFIG
+}
+RATE_LIMIT_METRICS_LOCK = threading.Lock()
+
+def record_rate_limit_metric(channel, metric, amount=1):
+    """Increment a per-process rate limit counter"""
+    with RATE_LIMIT_METRICS_LOCK:
+        if channel in RATE_LIMIT_METRICS:
+            RATE_LIMIT_METRICS[channel][metric] += amount
+
+def _try_take_tokens(buckets):
+    """
+    Atomically take one token from every bucket in [(key, per_second, burst)].
+    Returns 0 if the tokens were taken, otherwise the seconds to wait before retrying.
+    """
+    conn = db_pool.getconn()
+    try:
+        with conn.cursor() as c:
+            state = []
+            # Lock buckets in a stable order so concurrent callers can't deadlock
+            for key, per_second, burst in sorted(buckets):
+                c.execute('''INSERT INTO rate_limit_buckets (bucket_key, tokens, updated_at)
+                            VALUES (%s, %s, clock_timestamp())
+                            ON CONFLICT (bucket_key) DO NOTHING''', (key, burst))
+                c.execute('''SELECT tokens, EXTRACT(EPOCH FROM clock_timestamp() - updated_at)
+                            FROM rate_limit_buckets WHERE bucket_key = %s FOR UPDATE''', (key,))
+                tokens, elapsed = c.fetchone()
+                tokens = min(burst, float(tokens) + max(0.0, float(elapsed)) * per_second)
+                state.append((key, per_second, tokens))
+
+            wait_seconds = max([(1 - tokens) / per_second for _, per_second, tokens in state if tokens < 1] or [0])
+            for key, _, tokens in state:
+                if wait_seconds == 0:
+                    tokens -= 1
+                c.execute('''UPDATE rate_limit_buckets SET tokens = %s, updated_at = clock_timestamp()
+                            WHERE bucket_key = %s''', (tokens, key))
+        conn.commit()
+        return wait_seconds
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        db_pool.putconn(conn)
+
+def rate_limit_max_wait():
+    """How long a send may wait for a slot from the current thread"""
+    return RATE_LIMIT_REQUEST_MAX_WAIT_SECONDS if has_request_context() else RATE_LIMIT_MAX_WAIT_SECONDS
+
+def acquire_send_slot(channel, recipient=None, max_wait=None, defer=None):
+    """
+    Block until the channel (and recipient) rate limits allow one more send; returns True
+    to send now. After max_wait seconds (default rate_limit_max_wait()) it returns False
+    when `defer` (default: inside a web request) so the caller queues the send with
+    defer_send(), otherwise the send proceeds. Fails open on DB errors.
+    """
+    config = RATE_LIMIT_CONFIG.get(channel)
+    if not config:
+        return True
+    if max_wait is None:
+        max_wait = rate_limit_max_wait()
+    if defer is None:
+        defer = has_request_context()
+
+    buckets = [(channel, config['per_second'], config['burst'])]
+    if recipient and config['recipient_per_minute'] > 0:
+        buckets.append((f"{channel}:{str(recipient).strip().lower()}",
+                        config['recipient_per_minute'] / 60.0, max(1.0, config['recipient_per_minute'])))
+
+    started = time.monotonic()
+    throttled = False
+    while True:
+        try:
+            wait_seconds = _try_take_tokens(buckets)
+        except Exception as e:
+            app_log.warning(f"⚠️ Rate limiter unavailable for {channel}, sending without limit: {e}")
+            record_rate_limit_metric(channel, 'errors')
+            return True
+
+        if wait_seconds == 0:
+            break
+
+        waited = time.monotonic() - started
+        if waited + wait_seconds > max_wait:
+            record_rate_limit_metric(channel, 'timeouts')
+            if defer:
+                return False
+            app_log.warning(f"⚠️ Rate limit wait for {channel} exceeded {max_wait:.0f}s, sending anyway")
+            break
+
+        if not throttled:
+            app_log.info(f"⏳ {channel} throttled for {recipient or 'channel'} - queueing for {wait_seconds:.1f}s")
+            record_rate_limit_metric(channel, 'throttled')
+            throttled = True
+        time.sleep(wait_seconds)
+
+    record_rate_limit_metric(channel, 'acquired')
+    record_rate_limit_metric(channel, 'wait_seconds', time.monotonic() - started)
+    return True
+
+def defer_send(channel, send, **args):
+    """
+    Queue a throttled send as a 'deferred_send' scheduled action (`send` names a
+    DEFERRED_SENDERS entry called with **args). Returns False if it couldn't be queued.
+    """
+    conn = db_pool.getconn()
+    try:
+        with conn.cursor() as c:
+            c.execute('''INSERT INTO scheduled_actions (action, request_id, due_at, payload)
+                        VALUES ('deferred_send', NULL, NOW(), %s)''',
+                     (json.dumps({'send': send, 'args': args}, default=str),))
+            c.execute('SELECT pg_notify(%s, %s)', (SCHEDULED_ACTIONS_CHANNEL, datetime.now().isoformat()))
+        conn.commit()
+        record_rate_limit_metric(channel, 'deferred')
+        app_log.info(f"📮 {channel} throttled - {send} queued for the scheduler")
+        return True
     except Exception as e:
-        print(f"❌ Error checking overdue reminders: {str(e)}")
+        conn.rollback()
+        app_log.error(f"❌ Could not queue throttled {send}, sending now: {e}")
+        return False
+    finally:
+        db_pool.putconn(conn)
 
 def send_whatsapp_notification(phone_number, message):
     """Send WhatsApp notification using Facebook Graph API"""
     try:
-        if not META_ACCESS_TOKEN or not WHATSAPP_PHONE_NUMBER_ID:
-            print("⚠️ WhatsApp API not configured - skipping WhatsApp notification")
+        whatsapp = get_service('whatsapp')
+        if not whatsapp['configured']:
+            whatsapp_log.warning("⚠️ WhatsApp API not configured - skipping WhatsApp notification")
             return False
 
         # Clean phone number (remove any non-digit characters except +)
@@ -2524,10 +4472,10 @@ def send_whatsapp_notification(phone_number, message):
             # Assume Indian number if no country code
             clean_phone = '+91' + clean_phone
 
-        url = f"{WHATSAPP_API_URL}{WHATSAPP_PHONE_NUMBER_ID}/messages"
+        url = f"{whatsapp['api_url']}{whatsapp['phone_number_id']}/messages"
 
         headers = {
-            'Authorization': f'Bearer {META_ACCESS_TOKEN}',
+            'Authorization': f"Bearer {whatsapp['access_token']}",
             'Content-Type': 'application/json'
         }
 
@@ -2540,32 +4488,35 @@ def send_whatsapp_notification(phone_number, message):
             }
         }
 
-        response = requests.post(url, headers=headers, json=data)
+        if not acquire_send_slot('whatsapp', clean_phone) and \
+                defer_send('whatsapp', 'whatsapp_notification', phone_number=phone_number, message=message):
+            return True
+        response = http_session().post(url, headers=headers, json=data)
+        if response.status_code == 429:
+            record_rate_limit_metric('whatsapp', 'upstream_429')
 
         if response.status_code == 200:
-            print(f"✅ WhatsApp notification sent successfully to {clean_phone}")
+            whatsapp_log.info(f"✅ WhatsApp notification sent successfully to {clean_phone}")
             return True
         else:
-            print(f"❌ WhatsApp notification failed: {response.status_code} - {response.text}")
+            whatsapp_log.error(f"❌ WhatsApp notification failed: {response.status_code} - {response.text}")
             return False
 
     except Exception as e:
-        print(f"❌ Error sending WhatsApp notification: {e}")
+        whatsapp_log.error(f"❌ Error sending WhatsApp notification: {e}")
         return False
 
 def send_email_flask_mail(to_email, subject, body, attachment_path=None, email_type='general'):
     """Send email using Flask-Mail with NVTI Mail Server"""
     try:
         # Check if email is configured
-        if not EMAIL_CONFIGURED:
-            print(f"⚠️ Email not configured. Skipping email to {to_email}")
-            print("   Please update your .env file with proper email credentials")
+        if not email_configured():
+            mail_log.warning(f"⚠️ Email not configured (set the MAIL_* variables in .env). Skipping email to {to_email}")
             return False
 
         # Validate email domain for @nvtpower.com
         if not to_email.endswith('@nvtpower.com'):
-            print(f"⚠️ Email domain not allowed: {to_email}")
-            print("   Only @nvtpower.com emails are allowed")
+            mail_log.warning(f"⚠️ Email domain not allowed (only @nvtpower.com): {to_email}")
             return False
 
         # Always send to actual recipient (production mode)
@@ -2587,9 +4538,11 @@ def send_email_flask_mail(to_email, subject, body, attachment_path=None, email_t
         else:
             email_body = body
 
-        print(f"📧 Sending {email_type} email to actual recipient: {actual_recipient}")
+        mail_log.debug(f"📧 Sending {email_type} email to actual recipient: {actual_recipient}", extra={'sampled': True})
 
         # Use application context to ensure Flask-Mail works in background tasks
+        from flask_mail import Message
+
         with app.app_context():
             msg = Message(
                 subject=email_subject,
@@ -2605,66 +4558,27 @@ def send_email_flask_mail(to_email, subject, body, attachment_path=None, email_t
                         data=fp.read()
                     )
 
-            mail.send(msg)
-            print(f"✅ Email sent successfully to {actual_recipient}")
-
-        # Display email content in terminal for debugging
-        print(f"\n📧 EMAIL CONTENT DETAILS:")
-        print(f"   Subject: {email_subject}")
-        print(f"   Recipient: {actual_recipient}")
-        print(f"   Email Type: {email_type}")
-        print(f"   Content Length: {len(email_body)} characters")
-
-        # Extract and display key information from email body
-        if email_type == 'user_confirmation':
-            print(f"\n📋 USER CONFIRMATION EMAIL CONTENT:")
-            # Extract request details from HTML
-            import re
-            request_id_match = re.search(r'Request ID:</strong></td>\s*<td[^>]*>([^<]+)</td>', email_body)
-            status_match = re.search(r'Status:</strong></td>\s*<td[^>]*>([^<]+)</td>', email_body)
-            from_match = re.search(r'From:</strong></td>\s*<td[^>]*>([^<]+)</td>', email_body)
-            to_match = re.search(r'To:</strong></td>\s*<td[^>]*>([^<]+)</td>', email_body)
-            date_match = re.search(r'Date:</strong></td>\s*<td[^>]*>([^<]+)</td>', email_body)
-            time_match = re.search(r'Time:</strong></td>\s*<td[^>]*>([^<]+)</td>', email_body)
-
-            if request_id_match:
-                print(f"   Request ID: {request_id_match.group(1)}")
-            if status_match:
-                print(f"   Status: {status_match.group(1)}")
-            if from_match:
-                print(f"   From: {from_match.group(1)}")
-            if to_match:
-                print(f"   To: {to_match.group(1)}")
-            if date_match:
-                print(f"   Date: {date_match.group(1)}")
-            if time_match:
-                print(f"   Time: {time_match.group(1)}")
-
-        elif email_type in ['hod_approval', 'admin_approval']:
-            print(f"\n📋 {email_type.upper().replace('_', ' ')} EMAIL CONTENT:")
-            # Extract key details for HOD/Admin emails
-            import re
-            request_id_match = re.search(r'Request ID:</strong></td>\s*<td[^>]*>([^<]+)</td>', email_body)
-            employee_match = re.search(r'Employee:</strong></td>\s*<td[^>]*>([^<]+)</td>', email_body)
-            department_match = re.search(r'Department:</strong></td>\s*<td[^>]*>([^<]+)</td>', email_body)
-
-            if request_id_match:
-                print(f"   Request ID: {request_id_match.group(1)}")
-            if employee_match:
-                print(f"   Employee: {employee_match.group(1)}")
-            if department_match:
-                print(f"   Department: {department_match.group(1)}")
-
-        print(f"\n📋 EMAIL BODY PREVIEW (First 800 characters):")
-        preview = email_body[:800] + "..." if len(email_body) > 800 else email_body
-        print(f"   {preview}")
-        print(f"\n" + "="*80)
+            if not acquire_send_slot('smtp', actual_recipient) and \
+                    defer_send('smtp', 'email', to_email=to_email, subject=subject, body=body,
+                               attachment_path=attachment_path, email_type=email_type):
+                return True
+            get_service('mail')['client'].send(msg)
+            mail_log.info(f"✅ Email sent successfully to {actual_recipient}")
+
+        # Email content is only logged at DEBUG (and then sampled) - never at INFO
+        if mail_log.isEnabledFor(logging.DEBUG):
+            mail_log.debug(f"📋 {email_type} email content", extra={'sampled': True, 'fields': {
+                'subject': email_subject,
+                'recipient': actual_recipient,
+                'email_type': email_type,
+                'length': len(email_body),
+                'preview': email_body[:800]
+            }})
 
         return True
 
     except Exception as e:
-        print(f"❌ Email sending error: {str(e)}")
-        print(f"   Check your NVTI Mail Server configuration in .env file")
+        mail_log.error(f"❌ Email sending error (check the NVTI Mail Server configuration in .env): {str(e)}")
         return False
 
 
@@ -2680,30 +4594,30 @@ def test_whatsapp_connection():
     if not phone_number_id or not access_token:
         return False
 
-    url = f"https://graph.facebook.com/v21.0/{phone_number_id}"
+    url = f"{get_service('whatsapp')['api_url']}{phone_number_id}"
     headers = {
         "Authorization": f"Bearer {access_token}",
         "Content-Type": "application/json"
     }
 
     try:
-        resp = requests.get(url, headers=headers, timeout=10)
-        print(f"🔍 WhatsApp API Connection Test: {resp.status_code}")
+        resp = http_session().get(url, headers=headers, timeout=10)
+        whatsapp_log.debug(f"🔍 WhatsApp API Connection Test: {resp.status_code}")
         if resp.status_code == 200:
-            print("✅ WhatsApp API endpoint is reachable")
+            whatsapp_log.info("✅ WhatsApp API endpoint is reachable")
             return True
         else:
-            print(f"❌ WhatsApp API endpoint returned: {resp.status_code} - {resp.text}")
+            whatsapp_log.error(f"❌ WhatsApp API endpoint returned: {resp.status_code} - {resp.text}")
             return False
     except Exception as e:
-        print(f"❌ WhatsApp API connection test failed: {e}")
+        whatsapp_log.error(f"❌ WhatsApp API connection test failed: {e}")
         return False
 
 def test_feedback_whatsapp_template():
     """Test the feedback WhatsApp template with sample data"""
     try:
-        if not META_ACCESS_TOKEN or not WHATSAPP_PHONE_NUMBER_ID:
-            print("⚠️ WhatsApp API not configured, skipping feedback template test")
+        if not get_service('whatsapp')['configured']:
+            whatsapp_log.warning("⚠️ WhatsApp API not configured, skipping feedback template test")
             return False
 
         # Test with sample data
@@ -2714,7 +4628,7 @@ def test_feedback_whatsapp_template():
         test_request_id = 'TEST123'
 
         # Test the feedback reminder WhatsApp function
-        print("🧪 Testing feedback WhatsApp template...")
+        whatsapp_log.info("🧪 Testing feedback WhatsApp template...")
         send_feedback_reminder_whatsapp(
             user=test_user,
             request_id=test_request_id,
@@ -2730,147 +4644,274 @@ def test_feedback_whatsapp_template():
             return_time='N/A'
         )
 
-        print("✅ Feedback WhatsApp template test completed")
+        whatsapp_log.info("✅ Feedback WhatsApp template test completed")
         return True
 
     except Exception as e:
-        print(f"❌ Feedback WhatsApp template test failed: {e}")
+        whatsapp_log.error(f"❌ Feedback WhatsApp template test failed: {e}")
         return False
 
-def send_whatsapp_template(to_phone, template_name, lang_code, parameters):
+# Declarative registry of approved WhatsApp templates. `body` lists the body
+# placeholders in order ({{1}}, {{2}}, ...): a plain name is required, a
+# (name, default) pair is optional and falls back to the default when empty.
+# `buttons` lists (sub_type, index, param_name) for dynamic button components.
+WHATSAPP_TEMPLATES = {
+    'otp_login_verification': {
+        'language': 'en',
+        'body': ['otp'],
+        'buttons': [('url', 0, 'otp')]
+    },
+    'user_query_submission_one_way': {
+        'language': 'en',
+        'body': ['employee_name', 'request_id', 'from_location', 'to_location', 'travel_time', 'travel_date',
+                 ('ride_type', 'One Way Ride')]
+    },
+    'user_query_submission_two_way': {
+        'language': 'en',
+        'body': ['employee_name', 'request_id', 'from_location', 'to_location', 'travel_time', 'travel_date',
+                 ('return_from_location', 'N/A'), ('return_to_location', 'N/A'), ('return_time', 'N/A')]
+    },
+    'hod_approval': {
+        'language': 'en',
+        'body': ['manager_name', 'employee_name', 'request_id', 'from_location', 'to_location', 'travel_time',
+                 'travel_date', ('return_from_location', 'N/A'), ('return_to_location', 'N/A'), ('return_time', 'N/A')]
+    },
+    'admin_approval': {
+        'language': 'en',
+        'body': ['admin_name', 'employee_name', 'request_id', 'from_location', 'to_location', 'travel_time',
+                 'travel_date', ('return_from_location', 'N/A'), ('return_to_location', 'N/A'), ('return_time', 'N/A')]
+    },
+    'user_hod_approval_reject': {
+        'language': 'en',
+        'body': ['employee_name', 'hod_name', 'request_id', 'from_location', 'to_location', 'travel_time',
+                 'travel_date', ('return_from_location', 'N/A'), ('return_to_location', 'N/A'), ('return_time', 'N/A'),
+                 'status']
+    },
+    'user_admin_approval_reject': {
+        'language': 'en',
+        'body': ['employee_name', 'admin_name', 'request_id', 'from_location', 'to_location', 'travel_time',
+                 'travel_date', ('return_from_location', 'N/A'), ('return_to_location', 'N/A'), ('return_time', 'N/A'),
+                 'status', ('taxi_details', 'Not provided')]
+    },
+    'teximanagment_feedbac': {
+        'language': 'en',
+        'body': ['employee_name', 'request_id']
+    },
+    'pending_approval_digest': {
+        'language': 'en',
+        'body': ['recipient_name', 'request_count', 'request_ids']
+    }
+}
+
+def compile_whatsapp_template(template_name, spec):
+    """Precompute the payload skeleton and parameter schema for one registered template"""
+    fields = [(field, None) if isinstance(field, str) else tuple(field) for field in spec['body']]
+    return {
+        'name': template_name,
+        'language': spec.get('language', 'en'),
+        'fields': fields,
+        'field_names': {name for name, _ in fields} | {param for _, _, param in spec.get('buttons', [])},
+        'required': sum(1 for _, default in fields if default is None),
+        'buttons': list(spec.get('buttons', [])),
+        'skeleton': {
+            "messaging_product": "whatsapp",
+            "type": "template",
+            "template": {"name": template_name, "language": {"code": spec.get('language', 'en')}}
+        }
+    }
+
+COMPILED_WHATSAPP_TEMPLATES = {name: compile_whatsapp_template(name, spec) for name, spec in WHATSAPP_TEMPLATES.items()}
+
+def _whatsapp_template_values(compiled, parameters):
+    """Validate parameters (dict by name, or legacy positional list) and return {name: text}"""
+    if isinstance(parameters, dict):
+        unknown = set(parameters) - compiled['field_names']
+        if unknown:
+            raise ValueError(f"unknown parameter(s) {sorted(unknown)}")
+        supplied = parameters
+    else:
+        parameters = list(parameters or [])
+        if not compiled['required'] <= len(parameters) <= len(compiled['fields']):
+            raise ValueError(f"expected {compiled['required']}-{len(compiled['fields'])} parameters, got {len(parameters)}")
+        supplied = {name: value for (name, _), value in zip(compiled['fields'], parameters)}
+
+    values = {}
+    for name, default in compiled['fields']:
+        value = supplied.get(name)
+        if value is None or str(value).strip() == '':
+            if default is None:
+                raise ValueError(f"missing required parameter '{name}'")
+            value = default
+        values[name] = str(value)
+    for _, _, param in compiled['buttons']:
+        if param not in values:
+            if supplied.get(param) in (None, ''):
+                raise ValueError(f"missing required button parameter '{param}'")
+            values[param] = str(supplied[param])
+    return values
+
+def render_whatsapp_template(to_phone, template_name, parameters, lang_code=None):
+    """Fill a registered template's skeleton for one recipient. Raises ValueError if invalid"""
+    compiled = COMPILED_WHATSAPP_TEMPLATES.get(template_name)
+    if not compiled:
+        raise ValueError(f"template '{template_name}' is not registered")
+
+    values = _whatsapp_template_values(compiled, parameters)
+    components = [{"type": "body", "parameters": [{"type": "text", "text": values[name]} for name, _ in compiled['fields']]}]
+    for sub_type, index, param in compiled['buttons']:
+        components.append({
+            "type": "button",
+            "sub_type": sub_type,
+            "index": index,
+            "parameters": [{"type": "text", "text": values[param]}]
+        })
+
+    template = dict(compiled['skeleton']['template'], components=components)
+    if lang_code and lang_code != compiled['language']:
+        template['language'] = {"code": lang_code}
+    return dict(compiled['skeleton'], to=to_phone, template=template)
+
+def render_whatsapp_template_bulk(template_name, recipients, lang_code=None):
     """
-    Send a WhatsApp template message using Meta's Cloud API v21.0.
-    :param to_phone: Recipient phone number in international format, e.g. '919999999999'
-    :param template_name: Name of the approved template, e.g. 'user_query_submission_one_way'
-    :param lang_code: Language code, e.g. 'en'
-    :param parameters: List of text values for the template placeholders (in order)
-    :return: True if sent, False otherwise
+    Render one payload per (to_phone, parameters) pair.
+    Returns (payloads, errors) - invalid rows are reported in errors instead of raising.
+    """
+    payloads, errors = [], []
+    for to_phone, parameters in recipients:
+        try:
+            payloads.append(render_whatsapp_template(to_phone, template_name, parameters, lang_code))
+        except ValueError as e:
+            errors.append((to_phone, str(e)))
+    return payloads, errors
+
+def post_whatsapp_payload(payload, max_wait=None, defer=None):
+    """
+    POST a rendered template payload to the Cloud API with retries. Returns True if sent
+    (or, when `defer`, queued for the scheduler because it was throttled).
+    max_wait bounds each rate-limit / 429 wait (default rate_limit_max_wait()).
     """
+    if max_wait is None:
+        max_wait = rate_limit_max_wait()
+    if defer is None:
+        defer = has_request_context()
     phone_number_id = os.environ.get('WHATSAPP_PHONE_NUMBER_ID')
     access_token = os.environ.get('META_ACCESS_TOKEN')
 
     # Validate environment variables
     if not phone_number_id:
-        print("❌ WHATSAPP_PHONE_NUMBER_ID not found in environment variables")
+        whatsapp_log.error("❌ WHATSAPP_PHONE_NUMBER_ID not found in environment variables")
         return False
 
     if not access_token:
-        print("❌ META_ACCESS_TOKEN not found in environment variables")
+        whatsapp_log.error("❌ META_ACCESS_TOKEN not found in environment variables")
         return False
 
-    url = f"https://graph.facebook.com/v21.0/{phone_number_id}/messages"
+    url = f"{get_service('whatsapp')['api_url']}{phone_number_id}/messages"
     headers = {
         "Authorization": f"Bearer {access_token}",
         "Content-Type": "application/json"
     }
+    template_name = payload['template']['name']
+    to_phone = payload['to']
 
-    payload = {
-        "messaging_product": "whatsapp",
-        "to": to_phone,
-        "type": "template",
-        "template": {
-            "name": template_name,
-            "language": {"code": lang_code}
-        }
-    }
-
-    components = []
-
-    if parameters:
-        print(f"🔍 Processing parameters for template: {template_name}")
-        print(f"🔍 Parameters count: {len(parameters)}")
-
-        if template_name == "otp_login_verification" and len(parameters) >= 1:
-            print(f"🔍 Using otp_login_verification template logic")
-            components.append({
-                "type": "body",
-                "parameters": [
-                    {"type": "text", "text": str(parameters[0])},
-                ]
-            })
-            components.append({
-                "type": "button",
-                "sub_type": "url",
-                "index": 0,
-                "parameters": [{"type": "text", "text": str(parameters[0])}]
-            })
-        elif template_name == "user_query_submission_one_way":
-            print(f"🔍 Using user_query_submission_one_way template logic")
-            components.append({"type": "body", "parameters": [{"type": "text", "text": str(val)} for val in parameters]})
-        elif template_name == "user_query_submission_two_way":
-            print(f"🔍 Using user_query_submission_two_way template logic")
-            components.append({"type": "body", "parameters": [{"type": "text", "text": str(val)} for val in parameters]})
-        elif template_name == "hod_approval":
-            print(f"🔍 Using hod_approval template logic")
-            components.append({"type": "body", "parameters": [{"type": "text", "text": str(val)} for val in parameters]})
-        elif template_name == "user_hod_approval_reject":
-            print(f"🔍 Using user_hod_approval_reject template logic")
-            components.append({"type": "body", "parameters": [{"type": "text", "text": str(val)} for val in parameters]})
-        elif template_name == "admin_approval":
-            print(f"🔍 Using admin_approval template logic")
-            components.append({"type": "body", "parameters": [{"type": "text", "text": str(val)} for val in parameters]})
-        elif template_name == "user_admin_approval_reject":
-            print(f"🔍 Using user_admin_approval_reject template logic")
-            components.append({"type": "body", "parameters": [{"type": "text", "text": str(val)} for val in parameters]})
-        elif template_name == "teximanagment_feedbac":
-            print(f"🔍 Using teximanagment_feedbac template logic")
-            components.append({"type": "body", "parameters": [{"type": "text", "text": str(val)} for val in parameters]})
-        else:
-            print(f"⚠️ No template logic found for: {template_name}")
-    else:
-        print(f"⚠️ No parameters provided")
-
-    if components:
-        payload["template"]["components"] = components
-        print(f"🔍 Components added to payload: {len(components)} components")
-    else:
-        print(f"⚠️ No components added to payload")
-
-    # Debug: Print the payload being sent
-    print(f"🔍 WhatsApp API Debug:")
-    print(f"   URL: {url}")
-    print(f"   Phone Number ID: {phone_number_id}")
-    print(f"   Template: {template_name}")
-    print(f"   Parameters: {parameters}")
-    print(f"   Components: {components}")
-    print(f"   Payload: {json.dumps(payload, indent=2)}")
+    whatsapp_log.debug(f"📱 WhatsApp {template_name} -> {to_phone} ({len(payload['template']['components'][0]['parameters'])} params)",
+                       extra={'sampled': True})
 
     # Retry logic for connection issues
     max_retries = 3
     for attempt in range(max_retries):
         try:
-            resp = requests.post(url, headers=headers, json=payload, timeout=15)
-            print(f"WhatsApp API response (attempt {attempt + 1}): {resp.status_code} {resp.text}")
+            # Every attempt, including retries, draws from the shared budget
+            if not acquire_send_slot('whatsapp', to_phone, max_wait=max_wait, defer=defer) and \
+                    defer_send('whatsapp', 'whatsapp_payload', payload=payload):
+                return True
+            resp = http_session().post(url, headers=headers, json=payload, timeout=15)
+            whatsapp_log.debug(f"WhatsApp API response (attempt {attempt + 1}): {resp.status_code} {resp.text}",
+                               extra={'sampled': True})
+            if resp.status_code == 429:
+                record_rate_limit_metric('whatsapp', 'upstream_429')
+                retry_after = resp.headers.get('Retry-After', '')
+                backoff = int(retry_after) if retry_after.isdigit() else 5 * (attempt + 1)
+                if attempt < max_retries - 1 and backoff <= max_wait:
+                    whatsapp_log.info(f"🚦 WhatsApp API throttled (429) - backing off {backoff}s before retry")
+                    time.sleep(backoff)
+                    continue
+                return defer and defer_send('whatsapp', 'whatsapp_payload', payload=payload)
             if resp.status_code == 200:
                 response_data = resp.json()
                 message_id = response_data.get('messages', [{}])[0].get('id', 'N/A')
-                print(f"✅ {template_name} sent successfully! Message ID: {message_id}")
+                whatsapp_log.info(f"✅ {template_name} sent successfully! Message ID: {message_id}")
                 return True
             else:
-                print(f"❌ Failed to send {template_name} - Status: {resp.status_code}")
+                whatsapp_log.error(f"❌ Failed to send {template_name} - Status: {resp.status_code}")
                 if attempt < max_retries - 1:
-                    print(f"🔄 Retrying in 2 seconds... (attempt {attempt + 2}/{max_retries})")
+                    whatsapp_log.info(f"🔄 Retrying in 2 seconds... (attempt {attempt + 2}/{max_retries})")
                     time.sleep(2)
                 else:
                     return False
         except requests.exceptions.ConnectionError as e:
-            print(f"🔌 Connection error (attempt {attempt + 1}): {e}")
+            whatsapp_log.warning(f"🔌 Connection error (attempt {attempt + 1}): {e}")
             if attempt < max_retries - 1:
-                print(f"🔄 Retrying in 3 seconds... (attempt {attempt + 2}/{max_retries})")
+                whatsapp_log.info(f"🔄 Retrying in 3 seconds... (attempt {attempt + 2}/{max_retries})")
                 time.sleep(3)
             else:
-                print(f"❌ Max retries reached. Failed to send {template_name}")
+                whatsapp_log.error(f"❌ Max retries reached. Failed to send {template_name}")
                 return False
         except Exception as e:
-            print(f"WhatsApp API error (attempt {attempt + 1}): {e}")
+            whatsapp_log.error(f"WhatsApp API error (attempt {attempt + 1}): {e}")
             if attempt < max_retries - 1:
-                print(f"🔄 Retrying in 2 seconds... (attempt {attempt + 2}/{max_retries})")
+                whatsapp_log.info(f"🔄 Retrying in 2 seconds... (attempt {attempt + 2}/{max_retries})")
                 time.sleep(2)
             else:
                 return False
 
     return False
 
+def send_whatsapp_template(to_phone, template_name, lang_code, parameters):
+    """
+    Send a WhatsApp template message using Meta's Cloud API (WHATSAPP_API_URL, v21.0 by default).
+    :param to_phone: Recipient phone number in international format, e.g. '919999999999'
+    :param template_name: Name of a template registered in WHATSAPP_TEMPLATES, e.g. 'user_query_submission_one_way'
+    :param lang_code: Language code, e.g. 'en'
+    :param parameters: Dict of named placeholder values (see WHATSAPP_TEMPLATES), or a list in placeholder order
+    :return: True if sent, False otherwise
+    """
+    try:
+        payload = render_whatsapp_template(to_phone, template_name, parameters, lang_code)
+    except ValueError as e:
+        whatsapp_log.error(f"❌ Invalid WhatsApp template call for {template_name}: {e}")
+        return False
+
+    return post_whatsapp_payload(payload)
+
+def send_whatsapp_template_bulk(template_name, recipients, lang_code=None, max_workers=None):
+    """
+    Render and send one template to many recipients (e.g. reminder batches).
+    :param recipients: iterable of (to_phone, parameters) pairs
+    :return: dict with sent / failed / invalid counts
+    """
+    payloads, errors = render_whatsapp_template_bulk(template_name, recipients, lang_code)
+    for to_phone, error in errors:
+        whatsapp_log.error(f"❌ Skipping {template_name} for {to_phone}: {error}")
+
+    stats = {'sent': 0, 'failed': 0, 'invalid': len(errors)}
+    if payloads:
+        # Pool threads have no request context, so decide the wait budget here
+        max_wait, defer = rate_limit_max_wait(), has_request_context()
+        with ThreadPoolExecutor(max_workers=max_workers or REMINDER_MAX_WORKERS) as executor:
+            for sent in executor.map(lambda payload: post_whatsapp_payload(payload, max_wait, defer), payloads):
+                stats['sent' if sent else 'failed'] += 1
+
+    whatsapp_log.info(f"📊 Bulk {template_name}: {stats['sent']} sent, {stats['failed']} failed, {stats['invalid']} invalid")
+    return stats
+
+# defer_send() names -> the function the dispatcher calls again outside the request
+DEFERRED_SENDERS = {
+    'email': send_email_flask_mail,
+    'whatsapp_notification': send_whatsapp_notification,
+    'whatsapp_payload': post_whatsapp_payload,
+}
+
 def format_phone_number(phone):
     """Format phone number for WhatsApp (remove spaces, ensure country code)"""
     if not phone:
@@ -2889,6 +4930,492 @@ def format_phone_number(phone):
 
     return cleaned
 
+# =============================================================================
+# APPROVAL NOTIFICATION DIGEST
+# =============================================================================
+# Recipients listed in NOTIFICATION_DIGEST_RECIPIENTS get their pending-approval
+# notifications grouped into one email/WhatsApp summary per window instead of one
+# message per request. Format: "email[:minutes],email[:minutes]", e.g.
+# "mohit.agarwal@nvtpower.com:15,nitika.arora@nvtpower.com:30"
+NOTIFICATION_DIGEST_WINDOW_MINUTES = int(os.environ.get('NOTIFICATION_DIGEST_WINDOW_MINUTES', '15'))
+DIGEST_WHATSAPP_TEMPLATE = 'pending_approval_digest'
+
+# Statuses a request must still be in for its digest entry to be worth sending
+DIGEST_PENDING_STATUS = {
+    'hod_approval': 'Pending Manager Approval',
+    'admin_approval': 'Pending Admin Approval'
+}
+
+def parse_digest_recipients(raw_value):
+    """Parse the NOTIFICATION_DIGEST_RECIPIENTS setting into {email: window_minutes}"""
+    recipients = {}
+    for entry in (raw_value or '').split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        email, _, minutes = entry.partition(':')
+        window = NOTIFICATION_DIGEST_WINDOW_MINUTES
+        if minutes.strip():
+            try:
+                window = max(1, int(minutes))
+            except ValueError:
+                scheduler_log.warning(f"⚠️ Invalid digest window '{minutes}' for {email}, using {window} minutes")
+        recipients[email.strip().lower()] = window
+    return recipients
+
+NOTIFICATION_DIGEST_RECIPIENTS = parse_digest_recipients(os.environ.get('NOTIFICATION_DIGEST_RECIPIENTS', ''))
+
+def get_digest_window_minutes(recipient_email):
+    """Return the digest window for a recipient, or None if they get instant notifications"""
+    if not recipient_email:
+        return None
+    return NOTIFICATION_DIGEST_RECIPIENTS.get(recipient_email.strip().lower())
+
+def is_same_day_trip(travel_date):
+    """Same-day (or already past) trips are urgent and always notify immediately"""
+    try:
+        if isinstance(travel_date, str):
+            travel_date = datetime.strptime(travel_date, '%Y-%m-%d').date()
+        elif isinstance(travel_date, datetime):
+            travel_date = travel_date.date()
+        return travel_date <= datetime.now().date()
+    except Exception:
+        # If we can't tell, don't hold the notification back
+        return True
+
+def queue_approval_digest(notification_type, recipient_email, recipient_name, recipient_phone,
+                          request_id, employee_name, from_location, to_location, travel_date, travel_time):
+    """
+    Queue a pending-approval notification for the recipient's next digest.
+    Returns True if queued, False if the caller should notify immediately
+    (digest not enabled for this recipient, urgent same-day trip, or DB error).
+    """
+    if get_digest_window_minutes(recipient_email) is None:
+        return False
+
+    if is_same_day_trip(travel_date):
+        scheduler_log.info(f"⚡ Same-day trip {request_id} - bypassing digest for {recipient_email}")
+        return False
+
+    conn = db_pool.getconn()
+    try:
+        with conn.cursor() as c:
+            c.execute('''INSERT INTO notification_digest_queue
+                        (notification_type, recipient_email, recipient_name, recipient_phone,
+                         request_id, employee_name, from_location, to_location, travel_date, travel_time)
+                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)''',
+                     (notification_type, recipient_email.strip().lower(), recipient_name, recipient_phone,
+                      request_id, employee_name, from_location, to_location, str(travel_date), str(travel_time)))
+        conn.commit()
+        scheduler_log.info(f"🗂️ Queued {notification_type} for {recipient_email} digest (request {request_id})")
+        return True
+    except Exception as e:
+        conn.rollback()
+        scheduler_log.error(f"❌ Error queueing digest notification, sending immediately: {e}")
+        return False
+    finally:
+        db_pool.putconn(conn)
+
+def send_approval_digest_email(recipient_email, recipient_name, notification_type, items):
+    """Send one summary email covering all queued requests for a recipient"""
+    is_admin = notification_type == 'admin_approval'
+    action_label = 'Admin Action Required' if is_admin else 'Manager Approval Required'
+    dashboard_label = 'Go to Admin Dashboard' if is_admin else 'Go to Manager Dashboard'
+
+    rows = ''.join(f"""
+            <tr>
+                <td style="padding: 8px; border-bottom: 1px solid #dee2e6;">{item['request_id']}</td>
+                <td style="padding: 8px; border-bottom: 1px solid #dee2e6;">{item['employee_name']}</td>
+                <td style="padding: 8px; border-bottom: 1px solid #dee2e6;">{item['from_location']} → {item['to_location']}</td>
+                <td style="padding: 8px; border-bottom: 1px solid #dee2e6;">{item['travel_date']} {item['travel_time']}</td>
+            </tr>""" for item in items)
+
+    subject = f"{len(items)} Taxi Request(s) - {action_label}"
+    body = f"""<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <title>{subject}</title>
+</head>
+<body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333; max-width: 700px; margin: 0 auto; padding: 20px;">
+    <div style="background-color: #f8f9fa; padding: 20px; border-radius: 8px; border-left: 4px solid #dc3545;">
+        <h2 style="color: #dc3545; margin-top: 0;">🚨 Taxi Requests - {action_label}</h2>
+        <p>Dear {recipient_name},</p>
+        <p>The following {len(items)} taxi request(s) are waiting for your review:</p>
+        <table style="width: 100%; border-collapse: collapse; background: white;">
+            <tr style="background-color: #e9ecef;">
+                <th style="padding: 8px; text-align: left;">Request ID</th>
+                <th style="padding: 8px; text-align: left;">Employee</th>
+                <th style="padding: 8px; text-align: left;">Route</th>
+                <th style="padding: 8px; text-align: left;">Travel</th>
+            </tr>{rows}
+        </table>
+        <div style="text-align: center; margin: 20px 0;">
+            <a href="{APP_URL}/" style="display: inline-block; background: linear-gradient(45deg, #007bff, #0056b3); color: white; padding: 12px 24px; text-decoration: none; border-radius: 6px; font-weight: bold;">
+                {dashboard_label}
+            </a>
+        </div>
+        <hr style="border: none; border-top: 1px solid #dee2e6; margin: 20px 0;">
+        <p style="font-size: 12px; color: #6c757d; text-align: center; margin: 0;">
+            <em>This is an automated digest from the Taxi Management System.</em>
+        </p>
+    </div>
+</body>
+</html>"""
+    return send_email_flask_mail(recipient_email, subject, body, email_type=notification_type)
+
+def flush_approval_digests():
+    """Send due approval digests - one email/WhatsApp per recipient per window"""
+    stats = {'rows_scanned': 0, 'messages_attempted': 0, 'messages_sent': 0, 'messages_failed': 0, 'digests': 0}
+    conn = db_pool.getconn()
+    try:
+        with conn.cursor() as c:
+            c.execute('''SELECT recipient_email, notification_type, MIN(queued_at)
+                        FROM notification_digest_queue
+                        WHERE sent_at IS NULL
+                        GROUP BY recipient_email, notification_type''')
+            groups = c.fetchall()
+
+        now = datetime.now()
+        for recipient_email, notification_type, oldest_queued_at in groups:
+            # Recipients removed from the digest list are flushed straight away
+            window = get_digest_window_minutes(recipient_email) or 0
+            if oldest_queued_at > now - timedelta(minutes=window):
+                continue
+
+            # Claim the batch atomically so concurrent workers don't send it twice
+            with conn.cursor() as c:
+                c.execute('''UPDATE notification_digest_queue q
+                            SET sent_at = NOW()
+                            FROM taxi_requests tr
+                            WHERE q.request_id = tr.id
+                            AND q.recipient_email = %s AND q.notification_type = %s
+                            AND q.sent_at IS NULL
+                            RETURNING q.id, q.recipient_name, q.recipient_phone, q.request_id,
+                                      q.employee_name, q.from_location, q.to_location,
+                                      q.travel_date, q.travel_time, tr.status''',
+                         (recipient_email, notification_type))
+                claimed = c.fetchall()
+            conn.commit()
+            stats['rows_scanned'] += len(claimed)
+
+            # Skip requests that were already actioned while waiting in the queue
+            pending_status = DIGEST_PENDING_STATUS.get(notification_type)
+            items = [{
+                'request_id': row[3], 'employee_name': row[4], 'from_location': row[5],
+                'to_location': row[6], 'travel_date': row[7], 'travel_time': row[8]
+            } for row in claimed if row[9] == pending_status]
+
+            if not items:
+                scheduler_log.info(f"ℹ️ Digest for {recipient_email} had no requests still pending - nothing sent")
+                continue
+
+            recipient_name = claimed[0][1] or 'Manager'
+            recipient_phone = next((row[2] for row in claimed if row[2]), None)
+            scheduler_log.info(f"📬 Sending {notification_type} digest with {len(items)} request(s) to {recipient_email}")
+
+            email_sent = send_approval_digest_email(recipient_email, recipient_name, notification_type, items)
+            stats['digests'] += 1
+            stats['messages_attempted'] += 1
+            stats['messages_sent' if email_sent else 'messages_failed'] += 1
+
+            whatsapp_sent = False
+            try:
+                phone = format_phone_number(recipient_phone)
+                if phone:
+                    stats['messages_attempted'] += 1
+                    request_ids = ', '.join(item['request_id'] for item in items)
+                    whatsapp_sent = send_whatsapp_template(phone, DIGEST_WHATSAPP_TEMPLATE, "en", {
+                        'recipient_name': recipient_name,
+                        'request_count': len(items),
+                        'request_ids': request_ids
+                    })
+                    stats['messages_sent' if whatsapp_sent else 'messages_failed'] += 1
+            except Exception as whatsapp_error:
+                stats['messages_failed'] += 1
+                scheduler_log.error(f"❌ Error sending WhatsApp digest: {whatsapp_error}")
+
+            if not email_sent and not whatsapp_sent:
+                # Nothing went out - release the batch so the next run retries it
+                with conn.cursor() as c:
+                    c.execute('UPDATE notification_digest_queue SET sent_at = NULL WHERE id = ANY(%s)',
+                              ([row[0] for row in claimed],))
+                conn.commit()
+                scheduler_log.warning(f"⚠️ Digest delivery failed for {recipient_email}, will retry next run")
+
+    except Exception as e:
+        conn.rollback()
+        scheduler_log.error(f"❌ Error flushing approval digests: {e}", exc_info=True)
+        stats['error'] = str(e)
+    finally:
+        db_pool.putconn(conn)
+
+    return stats
+
+# =============================================================================
+# PENDING REQUEST RE-ROUTING
+# =============================================================================
+# Requests keep the manager_email they were submitted with, so after an approver
+# mapping changes the ones still waiting for HOD approval stay with the old HOD.
+# reroute_pending_requests re-resolves them through the routing rules and moves
+# them in keyset-paginated chunks; each chunk commits together with the run's
+# progress row, so an interrupted run resumes after the last committed request.
+# Runs requested from the admin page are only queued; the scheduler leader advances
+# the oldest queued run for REROUTE_QUEUE_SLICE_SECONDS every REROUTE_QUEUE_POLL_SECONDS,
+# so SAP lookups never run inside a web request.
+REROUTE_CHUNK_SIZE = int(os.environ.get('REROUTE_CHUNK_SIZE', '200'))
+REROUTE_CHUNK_PAUSE_SECONDS = float(os.environ.get('REROUTE_CHUNK_PAUSE_SECONDS', '0.5'))
+REROUTE_QUEUE_POLL_SECONDS = int(os.environ.get('REROUTE_QUEUE_POLL_SECONDS', '60'))
+REROUTE_QUEUE_SLICE_SECONDS = float(os.environ.get('REROUTE_QUEUE_SLICE_SECONDS', '45'))
+REROUTE_PENDING_STATUS = DIGEST_PENDING_STATUS['hod_approval']
+
+def reroute_employee_record(emp_code, department, sap_details_cache, use_sap=True):
+    """Routing input for a request's employee - SAP department/location/division when available"""
+    record = {'emp_code': emp_code, 'department': department}
+    if use_sap and emp_code:
+        if emp_code not in sap_details_cache:
+            sap_details_cache[emp_code] = fetch_actual_employee_details_from_sap(emp_code)
+        details = sap_details_cache[emp_code]
+        if details:
+            record['department'] = details.get('department') or department
+            record['division'] = details.get('division', '')
+            record['location'] = details.get('location', '')
+    return record
+
+def start_reroute_run(conn, dry_run, notify, chunk_size, started_by, restart=False,
+                      use_sap=True, queued=False, run_id=None):
+    """
+    Create a reroute_runs row, or pick up the latest interrupted one; returns (run_id, last_request_id).
+    run_id continues that run. queued=True leaves the run for run_queued_reroutes; the
+    CLI never resumes a queued run, the scheduler leader owns it.
+    """
+    with conn.cursor() as c:
+        if run_id:
+            c.execute('SELECT last_request_id FROM reroute_runs WHERE id = %s', (run_id,))
+            row = c.fetchone()
+            conn.commit()
+            return run_id, (row[0] if row else '') or ''
+
+        if restart and not dry_run:
+            c.execute('''UPDATE reroute_runs SET finished_at = NOW(), error = 'abandoned', queued = FALSE
+                        WHERE finished_at IS NULL AND NOT dry_run''')
+        elif not dry_run:
+            c.execute('''SELECT id, last_request_id FROM reroute_runs
+                        WHERE finished_at IS NULL AND NOT dry_run
+                        AND (%s OR NOT queued)
+                        ORDER BY id DESC LIMIT 1''', (queued,))
+            row = c.fetchone()
+            if row:
+                if queued:
+                    c.execute('''UPDATE reroute_runs SET queued = TRUE, notify = notify OR %s, updated_at = NOW()
+                                WHERE id = %s''', (notify, row[0]))
+                conn.commit()
+                return row[0], row[1] or ''
+
+        c.execute('''INSERT INTO reroute_runs (dry_run, notify, chunk_size, started_by, use_sap, queued)
+                    VALUES (%s, %s, %s, %s, %s, %s) RETURNING id''',
+                  (dry_run, notify, chunk_size, started_by, use_sap, queued))
+        run_id = c.fetchone()[0]
+    conn.commit()
+    return run_id, ''
+
+def reroute_pending_requests(chunk_size=None, dry_run=False, notify=False, use_sap=True,
+                             pause_seconds=None, started_by='cli', restart=False,
+                             run_id=None, max_seconds=None):
+    """
+    Move requests pending HOD approval to the approver the routing rules pick now.
+    Requests whose employee falls through to the SAP reporting manager are left alone.
+    With notify=True each new approver gets one digest listing all of their moved requests.
+    run_id continues an existing run; with max_seconds the run stops after that long
+    (stats['paused']) and is left to resume from its last chunk.
+    """
+    chunk_size = chunk_size or REROUTE_CHUNK_SIZE
+    pause_seconds = REROUTE_CHUNK_PAUSE_SECONDS if pause_seconds is None else pause_seconds
+    stats = {'run_id': None, 'dry_run': dry_run, 'resumed_from': None, 'chunks': 0, 'rows_scanned': 0,
+             'rows_rerouted': 0, 'rows_unchanged': 0, 'rows_sap_manager': 0, 'rows_skipped': 0,
+             'approvers_notified': 0, 'paused': False, 'changes': []}
+    started = time.monotonic()
+
+    try:
+        reload_org_directory(force=True)
+    except Exception as e:
+        directory_log.warning(f"⚠️ Could not reload organisation directory, routing with v{ORG_DIRECTORY_STATE['snapshot']['version']}: {e}")
+    directory = get_org_directory()
+    routing = directory['routing']
+    sap_details_cache = {}
+    notified_approvers = set()
+
+    conn = db_pool.getconn()
+    try:
+        run_id, last_request_id = start_reroute_run(conn, dry_run, notify, chunk_size, started_by, restart,
+                                                    use_sap=use_sap, run_id=run_id)
+        stats['run_id'] = run_id
+        if last_request_id:
+            stats['resumed_from'] = last_request_id
+            directory_log.info(f"🧭 Resuming re-routing run {run_id} after request {last_request_id}")
+        directory_log.info(f"🧭 Re-routing pending requests with organisation directory v{directory['version']} "
+              f"(chunk {chunk_size}, dry run: {dry_run}, notify: {notify})")
+
+        while True:
+            if max_seconds and time.monotonic() - started >= max_seconds:
+                stats['paused'] = True
+                break
+
+            with conn.cursor() as c:
+                c.execute('''SELECT id, emp_code, department, manager_email, employee_name,
+                                    from_location, to_location, travel_date, travel_time
+                            FROM taxi_requests
+                            WHERE status = %s
+                            AND (hod_response IS NULL OR hod_response = '')
+                            AND id > %s
+                            ORDER BY id
+                            LIMIT %s''', (REROUTE_PENDING_STATUS, last_request_id, chunk_size))
+                rows = c.fetchall()
+            # Don't hold a transaction open across the SAP lookups below
+            conn.commit()
+            if not rows:
+                break
+
+            moves = []
+            for row in rows:
+                route = resolve_approver(reroute_employee_record(row[1], row[2], sap_details_cache, use_sap), routing)
+                if not route:
+                    stats['rows_sap_manager'] += 1
+                    continue
+                new_email = (route['manager'].get('manager_email') or '').strip()
+                if not new_email or new_email.lower() == (row[3] or '').strip().lower():
+                    stats['rows_unchanged'] += 1
+                    continue
+                moves.append((row, route))
+
+            stats['chunks'] += 1
+            stats['rows_scanned'] += len(rows)
+            last_request_id = rows[-1][0]
+
+            if dry_run:
+                chunk_changes = [{
+                    'request_id': row[0],
+                    'old_manager_email': row[3],
+                    'new_manager_email': route['manager']['manager_email'],
+                    'reason': route['reason']
+                } for row, route in moves]
+                stats['rows_rerouted'] += len(moves)
+                stats['changes'] += chunk_changes
+                # Dry runs record what they would move, so a queued one can be read back later
+                with conn.cursor() as c:
+                    c.execute('''UPDATE reroute_runs SET
+                                last_request_id = %s,
+                                rows_scanned = rows_scanned + %s,
+                                rows_rerouted = rows_rerouted + %s,
+                                changes = COALESCE(changes, '[]'::JSONB) || %s::JSONB,
+                                updated_at = NOW()
+                                WHERE id = %s''', (last_request_id, len(rows), len(moves),
+                                                    json.dumps(chunk_changes), run_id))
+                conn.commit()
+                continue
+
+            with conn.cursor() as c:
+                moved_ids = set()
+                if moves:
+                    # Only move rows nobody actioned or re-routed since they were read
+                    c.execute('''UPDATE taxi_requests t
+                                SET manager_email = v.new_email
+                                FROM unnest(%s::text[], %s::text[], %s::text[]) AS v(id, old_email, new_email)
+                                WHERE t.id = v.id
+                                AND t.status = %s
+                                AND (t.hod_response IS NULL OR t.hod_response = '')
+                                AND t.manager_email IS NOT DISTINCT FROM v.old_email
+                                RETURNING t.id''',
+                             ([row[0] for row, _ in moves], [row[3] for row, _ in moves],
+                              [route['manager']['manager_email'].strip() for _, route in moves],
+                              REROUTE_PENDING_STATUS))
+                    moved_ids = {result[0] for result in c.fetchall()}
+
+                    # Queued digest entries for the previous approver are no longer theirs to act on
+                    c.execute('''DELETE FROM notification_digest_queue
+                                WHERE request_id = ANY(%s)
+                                AND notification_type = 'hod_approval'
+                                AND sent_at IS NULL''', (list(moved_ids),))
+
+                    if notify:
+                        for row, route in moves:
+                            if row[0] not in moved_ids:
+                                continue
+                            manager = route['manager']
+                            c.execute('''INSERT INTO notification_digest_queue
+                                        (notification_type, recipient_email, recipient_name, recipient_phone,
+                                         request_id, employee_name, from_location, to_location, travel_date, travel_time)
+                                        VALUES ('hod_approval', %s, %s, %s, %s, %s, %s, %s, %s, %s)''',
+                                     (manager['manager_email'].strip().lower(), manager.get('manager_name'),
+                                      manager.get('manager_phone'), row[0], row[4], row[5], row[6],
+                                      str(row[7]), str(row[8])))
+                            notified_approvers.add(manager['manager_email'].strip().lower())
+
+                stats['rows_rerouted'] += len(moved_ids)
+                stats['rows_skipped'] += len(moves) - len(moved_ids)
+                c.execute('''UPDATE reroute_runs SET
+                            last_request_id = %s,
+                            rows_scanned = rows_scanned + %s,
+                            rows_rerouted = rows_rerouted + %s,
+                            updated_at = NOW()
+                            WHERE id = %s''', (last_request_id, len(rows), len(moved_ids), run_id))
+            conn.commit()
+            directory_log.info(f"🧭 Re-routing chunk {stats['chunks']}: {len(rows)} scanned, {len(moved_ids)} moved (up to {last_request_id})")
+
+            if pause_seconds:
+                time.sleep(pause_seconds)
+
+        if not stats['paused']:
+            with conn.cursor() as c:
+                c.execute('''UPDATE reroute_runs SET finished_at = NOW(), updated_at = NOW(), queued = FALSE
+                            WHERE id = %s''', (run_id,))
+            conn.commit()
+    except Exception as e:
+        conn.rollback()
+        directory_log.error(f"❌ Error re-routing pending requests (run {stats['run_id']} can be resumed): {e}", exc_info=True)
+        stats['error'] = str(e)
+    finally:
+        db_pool.putconn(conn)
+
+    # The digest flush sends approvers outside NOTIFICATION_DIGEST_RECIPIENTS on its next run
+    stats['approvers_notified'] = len(notified_approvers)
+    directory_log.info(f"✅ Re-routing {'dry run ' if dry_run else ''}{'paused' if stats['paused'] else 'finished'}: "
+          f"{stats['rows_rerouted']} of {stats['rows_scanned']} pending request(s) {'would move' if dry_run else 'moved'}, "
+          f"{stats['approvers_notified']} approver(s) notified")
+    return stats
+
+def run_queued_reroutes():
+    """Scheduler job: advance the oldest queued re-routing run for up to REROUTE_QUEUE_SLICE_SECONDS"""
+    conn = db_pool.getconn()
+    try:
+        with conn.cursor() as c:
+            c.execute('''SELECT id, dry_run, notify, chunk_size, use_sap, started_by FROM reroute_runs
+                        WHERE queued AND finished_at IS NULL
+                        ORDER BY id LIMIT 1''')
+            run = c.fetchone()
+        conn.commit()
+    finally:
+        db_pool.putconn(conn)
+
+    if not run:
+        return {'rows_scanned': 0}
+
+    run_id, dry_run, notify, chunk_size, use_sap, started_by = run
+    stats = reroute_pending_requests(chunk_size=chunk_size, dry_run=dry_run, notify=notify, use_sap=use_sap,
+                                     started_by=started_by, run_id=run_id, max_seconds=REROUTE_QUEUE_SLICE_SECONDS)
+    if 'error' in stats:
+        # Leave the run unfinished (resumable with `python -m app reroute-pending`) instead of retrying forever
+        conn = db_pool.getconn()
+        try:
+            with conn.cursor() as c:
+                c.execute('''UPDATE reroute_runs SET queued = FALSE, error = %s, updated_at = NOW()
+                            WHERE id = %s''', (stats['error'], run_id))
+            conn.commit()
+        finally:
+            db_pool.putconn(conn)
+    # job_runs.details keeps the counters, not the list of moves
+    return {key: value for key, value in stats.items() if key != 'changes'}
+
 
 @app.route('/')
 def index():
@@ -2916,8 +5443,9 @@ def login():
             return render_template('login.html')
 
         # Check hardcoded employees first (Expats not in SAP API)
-        if emp_code in HARDCODED_EMPLOYEES:
-            employee = HARDCODED_EMPLOYEES[emp_code]
+        hardcoded_employees = get_org_directory()['hardcoded_employees']
+        if emp_code in hardcoded_employees:
+            employee = hardcoded_employees[emp_code]
             # Verify DOB matches (normalize the format by removing dashes and converting to DDMMYYYY)
             normalized_input_dob = dob.replace('-', '').replace('/', '')
             normalized_stored_dob = employee['dob'].replace('-', '').replace('/', '')
@@ -2940,7 +5468,7 @@ def login():
                     'sap_last_refresh': time.time(),
                     'is_hardcoded': True  # Flag to identify hardcoded employees
                 }
-                apply_location_based_manager(
+                apply_approval_route(
                     session['user'],
                     log_context=f"Login override for {emp_code}"
                 )
@@ -2948,11 +5476,11 @@ def login():
                 # Log successful hardcoded login
                 log_login_attempt(emp_code, employee['employee_name'], True, ip_address=request.remote_addr)
 
-                print(f"✅ Hardcoded employee login successful: {employee['employee_name']} ({emp_code})")
-                print(f"   Department: {employee['department']}")
-                print(f"   Division: {employee.get('division', 'N/A')}")
-                print(f"   Location: {employee.get('location', 'N/A')}")
-                print(f"   Manager: {employee['manager_name']} ({employee['manager_email']})")
+                auth_log.info(f"✅ Hardcoded employee login successful: {employee['employee_name']} ({emp_code})")
+                auth_log.debug(f"   Department: {employee['department']}")
+                auth_log.debug(f"   Division: {employee.get('division', 'N/A')}")
+                auth_log.debug(f"   Location: {employee.get('location', 'N/A')}")
+                auth_log.debug(f"   Manager: {employee['manager_name']} ({employee['manager_email']})")
 
                 flash('Login successful!', 'success')
                 return redirect(url_for('user_dashboard'))
@@ -2978,7 +5506,7 @@ def login():
                 'authenticated': True,
                 'sap_last_refresh': time.time()
             }
-            apply_location_based_manager(
+            apply_approval_route(
                 session['user'],
                 log_context="Login override for 9024436"
             )
@@ -3005,7 +5533,7 @@ def login():
                 'authenticated': True,
                 'sap_last_refresh': time.time()
             }
-            apply_location_based_manager(
+            apply_approval_route(
                 session['user'],
                 log_context="Login override for 9017113"
             )
@@ -3017,7 +5545,7 @@ def login():
             return redirect(url_for('user_dashboard'))
 
         # Verify credentials using SAP API
-        result = verify_sap_credentials(emp_code, dob)
+        result = verify_credentials(emp_code, dob)
 
         if result['success']:
             # Log successful login
@@ -3060,14 +5588,14 @@ def login():
                         session['user']['display_manager_name'] = actual_manager_info.get('manager_name', '')
                         session['user']['display_manager_email'] = actual_manager_info.get('manager_email', '')
                         session['user']['display_manager_phone'] = actual_manager_info.get('manager_phone', '')
-                        print(f"🔄 Manager {emp_code} logging as user: Using actual reporting manager {actual_manager_info.get('manager_name', 'N/A')}")
+                        auth_log.info(f"🔄 Manager {emp_code} logging as user: Using actual reporting manager {actual_manager_info.get('manager_name', 'N/A')}")
                     else:
                         # Fallback to original info if no actual manager found
                         session['user']['display_manager_id'] = original_manager_id
                         session['user']['display_manager_name'] = original_manager_name
                         session['user']['display_manager_email'] = original_manager_email
                         session['user']['display_manager_phone'] = original_manager_phone
-                        print(f"⚠️ Manager {emp_code}: No actual reporting manager found, using original info")
+                        auth_log.warning(f"⚠️ Manager {emp_code}: No actual reporting manager found, using original info")
                 else:
                     # Keep original manager info for display purposes (not self-managing)
                     session['user']['display_manager_id'] = original_manager_id
@@ -3081,52 +5609,26 @@ def login():
                 session['user']['manager_email'] = 'mohit.agrawal@nvtpower.com'
                 session['user']['manager_phone'] = '7743967028'
 
-            # Special case: Override manager for specific employees
-            # These employees should have Mohit Agarwal as their manager instead of the default admin
-            special_employees = [
-                '9023649',  # Jayesh Sinha
-                '9025421',  # Rajan Vashisht
-                '9024436',  # Ankur Tandon
-                '9023422',  # Mohit Agarwal (himself)
-                '9017113',  # Tribhuvan Agnihotri
-                '9021930',  # Brijesh Rao
-                '9022826',  # Pawan Kumar Tyagi
-                '9023418',  # Nishant Sharma
-                '9012706',  # Manoj Saini
-                '9025968',  # Vivek Saini
-                '9024785',  # Vinod Kumar
-                '9022761',  # Nitika Arora
-                '9017113',  # Tribhuvan Agnihotri
-                '9025802'   # Shivam Chaturvedi
-            ]
-
-            if emp_code in special_employees:
-                print(f"🔄 Special case: Overriding manager for employee {emp_code} ({result['employee_name']})")
-                session['user']['manager_id'] = '9023422'
-                session['user']['manager_name'] = 'Mohit Agarwal'
-                session['user']['manager_email'] = 'mohit.agarwal@nvtpower.com'
-                session['user']['manager_phone'] = '7743967028'
-                print(f"✅ Manager overridden to: Mohit Agarwal (mohit.agarwal@nvtpower.com)")
-
-            location_override = apply_location_based_manager(
+            # Department, location, division and emp_code overrides (see APPROVAL_ROUTING)
+            approver_route = apply_approval_route(
                 session['user'],
                 log_context=f"Login override for {emp_code}"
             )
-            if location_override:
-                print(
+            if approver_route:
+                auth_log.debug(
                     f"   Location: {session['user'].get('location', 'N/A')} | "
                     f"Department: {session['user'].get('department', 'N/A')}"
                 )
 
-            # Debug: Print manager information (after potential override)
-            print(f"👤 User session created for: {result['employee_name']}")
-            print(f"   Manager ID: {session['user']['manager_id']}")
-            print(f"   Manager Name: {session['user']['manager_name']}")
-            print(f"   Manager Email: {session['user']['manager_email']}")
-            print(f"   Manager Phone: {session['user']['manager_phone']}")
+            # Debug: Log manager information (after potential override)
+            auth_log.info(f"👤 User session created for: {result['employee_name']}")
+            auth_log.debug(f"   Manager ID: {session['user']['manager_id']}")
+            auth_log.debug(f"   Manager Name: {session['user']['manager_name']}")
+            auth_log.debug(f"   Manager Email: {session['user']['manager_email']}")
+            auth_log.debug(f"   Manager Phone: {session['user']['manager_phone']}")
             if session['user']['manager_email']:
                 email_domain = session['user']['manager_email'].split('@')[1] if '@' in session['user']['manager_email'] else 'N/A'
-                print(f"   Manager Email Domain: @{email_domain}")
+                auth_log.debug(f"   Manager Email Domain: @{email_domain}")
 
 
             flash('Login successful!', 'success')
@@ -3187,7 +5689,7 @@ def hod_login():
                 log_login_attempt(emp_code, 'Invalid Format', False, 'Invalid DOB format', request.remote_addr)
                 return render_template('hod_login.html')
 
-            print(f"🔍 HOD Login attempt: {emp_code} from IP: {request.remote_addr}")
+            auth_log.debug(f"🔍 HOD Login attempt: {emp_code} from IP: {request.remote_addr}")
 
             # Special hardcoded login for employee 9017113 (Tribhuvan Agnihotri) - DOB not in SAP API
             if emp_code == '9017113' and dob == '07031962':
@@ -3224,7 +5726,7 @@ def hod_login():
 
         if is_authorized:
             # Try to verify credentials using SAP API
-            result = verify_sap_credentials(emp_code, dob)
+            result = verify_credentials(emp_code, dob)
 
             if result['success']:
                 # SAP API verification successful - use SAP data
@@ -3237,7 +5739,7 @@ def hod_login():
                 # SPECIAL HARDCODED OVERRIDE for Nishant Sharma (9023418)
                 if emp_code == '9023418':
                     correct_hod_email = 'nishant.sharma@nvtpower.com'
-                    print(f"🔧 HARDCODED OVERRIDE: Using correct email for Nishant Sharma: {correct_hod_email}")
+                    auth_log.debug(f"🔧 HARDCODED OVERRIDE: Using correct email for Nishant Sharma: {correct_hod_email}")
 
                 # Store HOD info in session using the new mapping system
                 session['hod'] = {
@@ -3259,7 +5761,7 @@ def hod_login():
                 return redirect(url_for('hod_dashboard'))
             else:
                 # SAP API failed - DOB validation failed, deny access
-                print(f"❌ SAP API validation failed for HOD {emp_code}: {result.get('error', 'Unknown error')}")
+                auth_log.error(f"❌ SAP API validation failed for HOD {emp_code}: {result.get('error', 'Unknown error')}")
                 log_login_attempt(emp_code, 'Unknown', False, f'SAP API validation failed: {result.get("error", "Unknown error")}', request.remote_addr)
                 flash('Invalid credentials. Please check your employee code and date of birth.', 'error')
                 return render_template('hod_login.html')
@@ -3270,7 +5772,7 @@ def hod_login():
             return render_template('hod_login.html')
 
     except Exception as e:
-        print(f"❌ Error in HOD login for emp_code '{emp_code}': {str(e)}")
+        auth_log.error(f"❌ Error in HOD login for emp_code '{emp_code}': {str(e)}")
         flash('An error occurred during login. Please try again.', 'error')
         return render_template('hod_login.html')
 
@@ -3287,7 +5789,7 @@ def admin_login():
             return render_template('admin_login.html')
 
         # Verify credentials using SAP API (same as regular login)
-        result = verify_sap_credentials(emp_code, dob)
+        result = verify_credentials(emp_code, dob)
 
         if result['success']:
             # Check if this employee is an admin in the database
@@ -3330,62 +5832,27 @@ def admin_login():
 
     return render_template('admin_login.html')
 
-def get_department_manager_for_approval(user_department):
-    """Get the department-specific manager for approval routing"""
-    try:
-        dept_manager = get_department_manager(user_department)
-        if dept_manager:
-            print(f"✅ Using department manager for approval: {dept_manager['manager_name']} for department: {user_department}")
-            return dept_manager
-        else:
-            print(f"⚠️ No department-specific manager found for: {user_department}")
-            return None
-    except Exception as e:
-        print(f"❌ Error getting department manager for approval: {str(e)}")
-        return None
-
 # Removed process_hardcoded_hod_login function for security - all HOD logins must use SAP API validation
 
 def get_actual_manager_for_display(emp_code, user):
     """Get the actual manager information for display purposes for special employees by fetching from SAP API"""
     try:
-        print(f"🔍 Fetching actual manager from SAP API for employee: {emp_code}")
-
-        # CHECK FOR ELECTRIC VEHICLE BUSINESS DIVISION FIRST - Override to Pawan Tyagi
-        # This check overrides department-specific HOD logic
-        user_division = user.get('division', '').strip().upper()
-        if user_division == 'ELECTRIC VEHICLE BUSINESS' or 'ELECTRIC VEHICLE BUSINESS' in user_division:
-            print(f"✅ Electric Vehicle Business Division detected for {emp_code}: Returning Pawan Tyagi as manager")
-            return {
-                'manager_id': '9022826',
-                'manager_name': 'Pawan Tyagi',
-                'manager_email': 'pawan.tyagi@nvtpower.com',
-                'manager_phone': '+919765497863'
-            }
-
-        # Check if this is a special employee first - if so, don't apply department-specific logic
-        special_employees = ['9023649', '9025421', '9024436', '9023422', '9017113', '9021930', '9022826', '9023418', '9012706', '9025968', '9024785', '9022761', '9025802']
-        if emp_code in special_employees:
-            print(f"⚠️ Employee {emp_code} is a special employee - skipping department-specific manager logic")
-            return None
-
-        # Get user's department
-        user_department = user.get('department', '')
+        directory_log.debug(f"🔍 Fetching actual manager from SAP API for employee: {emp_code}")
 
-        # First check if there's a department-specific manager mapping
-        dept_manager = get_department_manager(user_department)
-        if dept_manager:
-            print(f"✅ Found department-specific manager: {dept_manager['manager_name']} for department: {user_department}")
-            return dept_manager
+        # Routing overrides (department, location, division, emp_code) decide first
+        route = resolve_approver({**user, 'emp_code': emp_code})
+        if route:
+            directory_log.debug(f"✅ Approver for {emp_code} via {route['reason']}")
+            return route['manager']
 
-        # If no department-specific manager, fetch actual manager data from SAP API
+        # If no override applies, fetch actual manager data from SAP API
         actual_manager_data = fetch_actual_manager_from_sap(emp_code)
 
         if actual_manager_data:
-            print(f"✅ Found actual manager from SAP: {actual_manager_data['manager_name']} ({actual_manager_data['manager_email']})")
+            directory_log.debug(f"✅ Found actual manager from SAP: {actual_manager_data['manager_name']} ({actual_manager_data['manager_email']})")
             return actual_manager_data
         else:
-            print(f"⚠️ Could not fetch actual manager from SAP for {emp_code}, using fallback")
+            directory_log.warning(f"⚠️ Could not fetch actual manager from SAP for {emp_code}, using fallback")
             # Fallback to original user data if SAP fetch fails
             return {
                 'manager_id': user.get('manager_id', ''),
@@ -3395,7 +5862,7 @@ def get_actual_manager_for_display(emp_code, user):
             }
 
     except Exception as e:
-        print(f"❌ Error in get_actual_manager_for_display: {str(e)}")
+        directory_log.error(f"❌ Error in get_actual_manager_for_display: {str(e)}")
         # Fallback to original user data
         return {
             'manager_id': user.get('manager_id', ''),
@@ -3407,7 +5874,7 @@ def get_actual_manager_for_display(emp_code, user):
 def fetch_actual_manager_from_sap(emp_code):
     """Fetch the actual manager information from SAP API for display purposes"""
     try:
-        print(f"🔍 Fetching actual manager from SAP for employee: {emp_code}")
+        sap_log.debug(f"🔍 Fetching actual manager from SAP for employee: {emp_code}")
         cache_key = str(emp_code).strip()
         if cache_key:
             cached_manager = _get_cached_value('actual_manager', cache_key)
@@ -3417,7 +5884,7 @@ def fetch_actual_manager_from_sap(emp_code):
         # Use the same trimmed EmpJob query that's used in login
         url = build_empjob_url(emp_code)
 
-        response = requests.get(
+        response = http_session().get(
             url,
             auth=HTTPBasicAuth(SAP_CONFIG['username'], SAP_CONFIG['password']),
             timeout=12
@@ -3435,7 +5902,7 @@ def fetch_actual_manager_from_sap(emp_code):
                 manager_name = employee_data.get('managerUserNav', {}).get('defaultFullName', '')
 
                 if manager_id and manager_name:
-                    print(f"✅ Found manager from SAP: {manager_name} (ID: {manager_id})")
+                    sap_log.debug(f"✅ Found manager from SAP: {manager_name} (ID: {manager_id})")
 
                     # Fetch manager's email and phone from SAP
                     manager_email = fetch_manager_email_from_sap(manager_id)
@@ -3451,23 +5918,23 @@ def fetch_actual_manager_from_sap(emp_code):
                         _set_cached_value('actual_manager', cache_key, manager_payload)
                     return manager_payload
                 else:
-                    print(f"⚠️ No manager found in SAP data for employee: {emp_code}")
+                    sap_log.warning(f"⚠️ No manager found in SAP data for employee: {emp_code}")
                     return None
             else:
-                print(f"⚠️ No employee data found in SAP for: {emp_code}")
+                sap_log.warning(f"⚠️ No employee data found in SAP for: {emp_code}")
                 return None
         else:
-            print(f"❌ SAP API error for employee {emp_code}: {response.status_code}")
+            sap_log.error(f"❌ SAP API error for employee {emp_code}: {response.status_code}")
             return None
 
     except Exception as e:
-        print(f"❌ Error fetching actual manager from SAP for {emp_code}: {str(e)}")
+        sap_log.error(f"❌ Error fetching actual manager from SAP for {emp_code}: {str(e)}")
         return None
 
 def fetch_actual_employee_details_from_sap(emp_code):
     """Fetch actual employee details from SAP API for display purposes"""
     try:
-        print(f"🔍 Fetching actual employee details from SAP for: {emp_code}")
+        sap_log.debug(f"🔍 Fetching actual employee details from SAP for: {emp_code}")
         cache_key = str(emp_code).strip()
         if cache_key:
             cached_details = _get_cached_value('employee_details', cache_key)
@@ -3477,7 +5944,7 @@ def fetch_actual_employee_details_from_sap(emp_code):
         # Use the same trimmed EmpJob query that's used in login
         url = build_empjob_url(emp_code)
 
-        response = requests.get(
+        response = http_session().get(
             url,
             auth=HTTPBasicAuth(SAP_CONFIG['username'], SAP_CONFIG['password']),
             timeout=12
@@ -3506,7 +5973,7 @@ def fetch_actual_employee_details_from_sap(emp_code):
                     first_name = personal_info_nav.get('firstName', '')
                     middle_name = personal_info_nav.get('middleName', '')
                     last_name = personal_info_nav.get('lastName', '')
-                    print(f"🔍 [fetch_actual_employee] Name extracted from direct personalInfoNav object")
+                    sap_log.debug(f"🔍 [fetch_actual_employee] Name extracted from direct personalInfoNav object")
                 # Check if personalInfoNav has a results array
                 elif isinstance(personal_info_nav, dict) and 'results' in personal_info_nav:
                     results = personal_info_nav.get('results', [])
@@ -3514,14 +5981,14 @@ def fetch_actual_employee_details_from_sap(emp_code):
                         first_name = results[0].get('firstName', '')
                         middle_name = results[0].get('middleName', '')
                         last_name = results[0].get('lastName', '')
-                        print(f"🔍 [fetch_actual_employee] Name extracted from personalInfoNav results array")
+                        sap_log.debug(f"🔍 [fetch_actual_employee] Name extracted from personalInfoNav results array")
 
                 # Construct employee name without middle name (First Name + Last Name only)
                 employee_name = f"{first_name} {last_name}".strip()
                 # Remove extra spaces between names
                 employee_name = ' '.join(employee_name.split())
 
-                print(f"✅ [fetch_actual_employee] Employee name constructed (without middle name): {employee_name}")
+                sap_log.debug(f"✅ [fetch_actual_employee] Employee name constructed (without middle name): {employee_name}")
 
                 # Get employee email
                 employee_email = ''
@@ -3592,7 +6059,7 @@ def fetch_actual_employee_details_from_sap(emp_code):
                         if loc_results and len(loc_results) > 0:
                             location = loc_results[0].get('name', '')
 
-                print(f"✅ Found employee details from SAP: {employee_name} ({employee_email}) - {department} - {division} - {location}")
+                sap_log.debug(f"✅ Found employee details from SAP: {employee_name} ({employee_email}) - {department} - {division} - {location}")
 
                 employee_payload = {
                     'employee_name': employee_name,
@@ -3606,14 +6073,14 @@ def fetch_actual_employee_details_from_sap(emp_code):
                     _set_cached_value('employee_details', cache_key, employee_payload)
                 return employee_payload
             else:
-                print(f"⚠️ No employee data found in SAP for: {emp_code}")
+                sap_log.warning(f"⚠️ No employee data found in SAP for: {emp_code}")
                 return None
         else:
-            print(f"❌ SAP API error for employee {emp_code}: {response.status_code}")
+            sap_log.error(f"❌ SAP API error for employee {emp_code}: {response.status_code}")
             return None
 
     except Exception as e:
-        print(f"❌ Error fetching actual employee details from SAP for {emp_code}: {str(e)}")
+        sap_log.error(f"❌ Error fetching actual employee details from SAP for {emp_code}: {str(e)}")
         return None
 
 @app.route('/user_dashboard')
@@ -3630,7 +6097,8 @@ def user_dashboard():
     # Enhanced manager information display for all users
     emp_code = user.get('emp_code', '')
     is_hardcoded = user.get('is_hardcoded', False)
-    special_employees = ['9023649', '9025421', '9024436', '9023422', '9017113', '9021930', '9022826', '9023418', '9012706', '9025968', '9024785', '9022761', '9025802']
+    emp_code_overrides = get_org_directory()['emp_code_overrides']
+    is_override_employee = emp_code in emp_code_overrides
 
     sap_refresh_ttl_seconds = SAP_REFRESH_TTL_SECONDS
     last_refresh_ts = user.get('sap_last_refresh')
@@ -3657,16 +6125,11 @@ def user_dashboard():
             'manager_email': user.get('manager_email', ''),
             'manager_phone': user.get('manager_phone', '')
         }
-        print(f"🔄 Hardcoded employee {emp_code}: Using stored manager info - {display_manager_info.get('manager_name', 'N/A')}")
+        web_log.debug(f"🔄 Hardcoded employee {emp_code}: Using stored manager info - {display_manager_info.get('manager_name', 'N/A')}")
     # Store original manager info for display purposes
     # For special employees, show Mohit Agarwal as manager; for others, use current manager info
-    elif emp_code in special_employees:
-        display_manager_info = {
-            'manager_id': '9023422',  # Mohit Agarwal's ID
-            'manager_name': 'Mohit Agarwal',  # Mohit Agarwal
-            'manager_email': 'mohit.agarwal@nvtpower.com',  # mohit.agarwal@nvtpower.com
-            'manager_phone': '7743967028'  # 7743967028
-        }
+    elif is_override_employee:
+        display_manager_info = {**emp_code_overrides[emp_code]}
     else:
         display_manager_info = {
             'manager_id': user.get('manager_id', ''),
@@ -3680,14 +6143,14 @@ def user_dashboard():
         # Skip SAP API calls for hardcoded employees
         if not is_hardcoded:
             if should_refresh_sap:
-                if emp_code not in special_employees:
+                if not is_override_employee:
                     # Get the enhanced manager info (department-specific or from SAP API)
                     enhanced_manager_info = get_actual_manager_for_display(emp_code, user)
                     if enhanced_manager_info:
                         display_manager_info = enhanced_manager_info
-                        print(f"🔄 Employee {emp_code}: Displaying enhanced manager info - {enhanced_manager_info.get('manager_name', 'N/A')}")
+                        web_log.debug(f"🔄 Employee {emp_code}: Displaying enhanced manager info - {enhanced_manager_info.get('manager_name', 'N/A')}")
                 else:
-                    print(f"🔄 Employee {emp_code}: Special employee - showing Mohit Agarwal as manager")
+                    web_log.debug(f"🔄 Employee {emp_code}: Special employee - showing Mohit Agarwal as manager")
 
                 # Also fetch actual employee details from SAP API for display
                 actual_employee_info = fetch_actual_employee_details_from_sap(emp_code)
@@ -3695,41 +6158,25 @@ def user_dashboard():
                     # Update user data for display purposes and persist to session
                     user = {**user, **actual_employee_info}
                     session['user'].update(actual_employee_info)
-                    print(f"🔄 Employee {emp_code}: Updated employee details from SAP for display")
+                    web_log.debug(f"🔄 Employee {emp_code}: Updated employee details from SAP for display")
 
                 session['user']['sap_last_refresh'] = time.time()
             else:
-                if emp_code in special_employees:
-                    print(f"🔄 Employee {emp_code}: Special employee - showing Mohit Agarwal as manager")
-                print(f"⏭️ Employee {emp_code}: Using cached SAP data (last refresh < {sap_refresh_ttl_seconds}s)")
+                if is_override_employee:
+                    web_log.debug(f"🔄 Employee {emp_code}: Special employee - showing Mohit Agarwal as manager")
+                web_log.debug(f"⏭️ Employee {emp_code}: Using cached SAP data (last refresh < {sap_refresh_ttl_seconds}s)")
 
     except Exception as e:
-        print(f"⚠️ Error fetching enhanced manager info for {emp_code}: {str(e)}")
+        web_log.warning(f"⚠️ Error fetching enhanced manager info for {emp_code}: {str(e)}")
         # Keep original manager info if fetch fails
 
-    user_division = user.get('division', '').strip().upper()
-    # CHECK FOR ELECTRIC VEHICLE BUSINESS DIVISION - Override manager to Pawan Tyagi
-    # This check overrides department-specific HOD logic
-    if user_division == 'ELECTRIC VEHICLE BUSINESS' or 'ELECTRIC VEHICLE BUSINESS' in user_division:
-        display_manager_info = {
-            'manager_id': '9022826',
-            'manager_name': 'Pawan Tyagi',
-            'manager_email': 'pawan.tyagi@nvtpower.com',
-            'manager_phone': '+919765497863'
-        }
-        # Also update session for approval routing
-        session['user']['manager_id'] = '9022826'
-        session['user']['manager_name'] = 'Pawan Tyagi'
-        session['user']['manager_email'] = 'pawan.tyagi@nvtpower.com'
-        session['user']['manager_phone'] = '+919765497863'
-        print(f"✅ Electric Vehicle Business Division detected for {emp_code}: Manager set to Pawan Tyagi")
-
-    location_override = apply_location_based_manager(
+    # Routing overrides apply to both the displayed manager and approval routing
+    approver_route = apply_approval_route(
         session['user'],
         display_target=display_manager_info,
         log_context=f"User dashboard override for {emp_code}"
     )
-    if location_override:
+    if approver_route:
         user = session['user']
 
     # For special employees, keep backend routing to Mohit Agarwal (don't change session data)
@@ -3777,7 +6224,7 @@ def user_dashboard():
                             req_list[23] = timestamps[2]  # admin_response_date
                             req_list[24] = timestamps[3]  # created_at
                     except Exception as timestamp_error:
-                        print(f"Warning: Could not get timestamps for request {req[0]}: {timestamp_error}")
+                        web_log.warning(f"Warning: Could not get timestamps for request {req[0]}: {timestamp_error}")
                         # Keep the 'N/A' placeholders
 
                     # Check if feedback exists for this request
@@ -3787,7 +6234,7 @@ def user_dashboard():
                             c.execute('SELECT id FROM taxi_feedback WHERE request_id = %s', (req[0],))
                             feedback_exists = c.fetchone() is not None
                         except Exception as feedback_error:
-                            print(f"Warning: Could not check feedback for request {req[0]}: {feedback_error}")
+                            web_log.warning(f"Warning: Could not check feedback for request {req[0]}: {feedback_error}")
 
                     # Add feedback info to the request tuple
                     req_list.append(feedback_exists)  # feedback_exists (index 25)
@@ -3795,7 +6242,7 @@ def user_dashboard():
                     requests.append(tuple(req_list))
 
             except Exception as e:
-                print(f"Error in user dashboard query: {e}")
+                web_log.error(f"Error in user dashboard query: {e}")
                 # Fallback to empty list if query fails completely
                 requests = []
 
@@ -3845,7 +6292,7 @@ def create_own_vehicle_request():
             recent_request = c.fetchone()
 
             if recent_request:
-                print(f"⚠️ User {user['emp_code']} already has a recent own vehicle request: {recent_request[0]}")
+                web_log.warning(f"⚠️ User {user['emp_code']} already has a recent own vehicle request: {recent_request[0]}")
                 flash('You already have a recent own vehicle request. Please wait a few minutes before creating another.', 'info')
                 return redirect(url_for('user_dashboard'))
     finally:
@@ -3875,7 +6322,7 @@ def create_own_vehicle_request():
                      (reference_id, None))
 
             conn.commit()
-            print(f"✅ Own vehicle request created: {reference_id}")
+            web_log.info(f"✅ Own vehicle request created: {reference_id}")
 
             # Send email only to user (no manager/admin emails)
             send_own_vehicle_confirmation_email(user, reference_id)
@@ -3884,7 +6331,7 @@ def create_own_vehicle_request():
             return redirect(url_for('user_dashboard'))
 
     except Exception as e:
-        print(f"❌ Error creating own vehicle request: {str(e)}")
+        web_log.error(f"❌ Error creating own vehicle request: {str(e)}")
         flash('Error creating own vehicle request. Please try again.', 'error')
         return redirect(url_for('user_dashboard'))
     finally:
@@ -3901,45 +6348,15 @@ def submit_request():
     emp_code = user.get('emp_code', '')
     user_department = user.get('department', '')
 
-    user_division = user.get('division', '').strip().upper()
-    # CHECK FOR ELECTRIC VEHICLE BUSINESS DIVISION - Override manager to Pawan Tyagi
-    # This check overrides department-specific HOD logic
-    if user_division == 'ELECTRIC VEHICLE BUSINESS' or 'ELECTRIC VEHICLE BUSINESS' in user_division:
-        session['user']['manager_id'] = '9022826'
-        session['user']['manager_name'] = 'Pawan Tyagi'
-        session['user']['manager_email'] = 'pawan.tyagi@nvtpower.com'
-        session['user']['manager_phone'] = '+919765497863'
-        user = session['user']
-        print(f"✅ Electric Vehicle Business Division detected for {emp_code}: Using Pawan Tyagi for approval routing")
-    # Check if this is a special employee - they should always use Mohit Agarwal
-    elif emp_code in ['9023649', '9025421', '9024436', '9023422', '9017113', '9021930', '9022826', '9023418', '9012706', '9025968', '9024785', '9022761', '9025802']:
-        # Special employees always use Mohit Agarwal for approval routing
-        session['user']['manager_id'] = '9023422'
-        session['user']['manager_name'] = 'Mohit Agarwal'
-        session['user']['manager_email'] = 'mohit.agarwal@nvtpower.com'
-        session['user']['manager_phone'] = '7743967028'
-        user = session['user']  # Update user variable with new data
-        print(f"🔄 Special employee {emp_code}: Using Mohit Agarwal for approval routing")
-    else:
-        # Get department-specific manager for approval routing
-        dept_manager = get_department_manager_for_approval(user_department)
-        if dept_manager:
-            # Override manager information for approval routing
-            session['user']['manager_id'] = dept_manager['manager_id']
-            session['user']['manager_name'] = dept_manager['manager_name']
-            session['user']['manager_email'] = dept_manager['manager_email']
-            session['user']['manager_phone'] = dept_manager['manager_phone']
-            user = session['user']  # Update user variable with new data
-            print(f"🔄 Using department manager for approval: {dept_manager['manager_name']} for department: {user_department}")
-        else:
-            print(f"⚠️ No department-specific manager found for: {user_department}, using default manager")
-
-    location_override = apply_location_based_manager(
+    # One lookup covers the department, location, EV division, emp_code and department-mapping rules
+    approver_route = apply_approval_route(
         session['user'],
-        log_context=f"Submit request override for {emp_code}"
+        log_context=f"Submit request routing for {emp_code}"
     )
-    if location_override:
+    if approver_route:
         user = session['user']
+    else:
+        web_log.warning(f"⚠️ No routing rule for {emp_code} ({user_department}), using default manager")
 
     # Check for pending feedback before allowing new requests
     conn = db_pool.getconn()
@@ -3994,9 +6411,15 @@ def submit_request():
         conn = db_pool.getconn()
         try:
             with conn.cursor() as c:
-                print(f"🔍 Debug: Inserting taxi request with ID: {request_id}")
-                print(f"🔍 Debug: User data: {user}")
-                print(f"🔍 Debug: Form data: {from_location}, {to_location}, {travel_date}, {travel_time}, {purpose}, {passengers}, type_of_ride: {type_of_ride}, vehicle: {vehicle_company} {vehicle_type} {vehicle_number}, returning_ride: {returning_ride}, return_locations: {return_from_location} -> {return_to_location}, return_time: {return_time}, taxi_reason: {taxi_reason}")
+                if web_log.isEnabledFor(logging.DEBUG):
+                    web_log.debug(f"🔍 Inserting taxi request {request_id}", extra={'fields': {
+                        'request_id': request_id,
+                        'emp_code': user['emp_code'],
+                        'type_of_ride': type_of_ride,
+                        'returning_ride': returning_ride,
+                        'passengers': passengers,
+                        'has_taxi_reason': bool(taxi_reason)
+                    }})
 
                 c.execute('''INSERT INTO taxi_requests
                             (id, emp_code, employee_name, employee_email, employee_phone, department,
@@ -4011,25 +6434,29 @@ def submit_request():
                     c.execute('''INSERT INTO taxi_reason (reference_id, reason)
                                 VALUES (%s, %s)''',
                              (request_id, taxi_reason))
-                    print(f"✅ Debug: Taxi reason saved for request ID: {request_id}")
                 else:
                     # Insert NULL reason for users who don't have vehicle or have vehicle but don't need taxi
                     c.execute('''INSERT INTO taxi_reason (reference_id, reason)
                                 VALUES (%s, %s)''',
                              (request_id, None))
-                    print(f"✅ Debug: NULL taxi reason saved for request ID: {request_id}")
 
                 conn.commit()
 
-                print(f"✅ Debug: Taxi request saved successfully with ID: {request_id}")
+                web_log.debug(f"✅ Debug: Taxi request saved successfully with ID: {request_id}")
 
             # Send notification to user's manager and confirmation to user
             # Get user's manager information from session
             manager_email = user.get('manager_email', '')
             manager_name = user.get('manager_name', 'Manager')
 
-            if manager_email:
-                print(f"📧 Sending approval request to user's manager: {manager_name} ({manager_email})")
+            # Managers on the digest list get this request in their next summary instead
+            if manager_email and queue_approval_digest('hod_approval', manager_email, manager_name, user.get('manager_phone', ''),
+                                                       request_id, user['employee_name'], from_location, to_location,
+                                                       travel_date, travel_time):
+                store_manager_info(user.get('manager_id', ''), manager_name, manager_email, user.get('employee_phone', ''), user.get('department', ''))
+                web_log.info(f"🗂️ Approval request {request_id} added to digest for {manager_name} ({manager_email})")
+            elif manager_email:
+                web_log.debug(f"📧 Sending approval request to user's manager: {manager_name} ({manager_email})")
 
                 # Store manager information in database
                 store_manager_info(user.get('manager_id', ''), manager_name, manager_email, user.get('employee_phone', ''), user.get('department', ''))
@@ -4176,46 +6603,30 @@ def submit_request():
                     if manager_phone:
                         hod_phone = format_phone_number(manager_phone)
                         if hod_phone:
-                            # Check if it's a two-way ride
-                            if returning_ride == 'yes':
-                                # Two-way ride: include all parameters including return details
-                                hod_parameters = [
-                                    hod_name,                        # {{1}} - HOD name
-                                    user['employee_name'],          # {{2}} - Employee name
-                                    request_id,                     # {{3}} - Reference ID
-                                    from_location,                  # {{4}} - From
-                                    to_location,                    # {{5}} - To
-                                    travel_time,                    # {{6}} - Time
-                                    travel_date,                    # {{7}} - Date
-                                    return_from_location if return_from_location else 'Not specified',  # {{8}} - From (return journey)
-                                    return_to_location if return_to_location else 'Not specified',      # {{9}} - To (return journey)
-                                    return_time if return_time else 'Not specified',                    # {{10}} - Returning Ride time
-                                ]
-                            else:
-                                # One-way ride: use N/A for return details
-                                hod_parameters = [
-                                    hod_name,                        # {{1}} - HOD name
-                                    user['employee_name'],          # {{2}} - Employee name
-                                    request_id,                     # {{3}} - Reference ID
-                                    from_location,                  # {{4}} - From
-                                    to_location,                    # {{5}} - To
-                                    travel_time,                    # {{6}} - Time
-                                    travel_date,                    # {{7}} - Date
-                                    'N/A',                          # {{8}} - From (return journey - N/A for one-way)
-                                    'N/A',                          # {{9}} - To (return journey - N/A for one-way)
-                                    'N/A',                          # {{10}} - Returning Ride time (N/A for one-way)
-                                ]
-
-                            print(f"📱 Sending WhatsApp notification to HOD: {hod_phone}")
+                            is_two_way = returning_ride == 'yes'
+                            hod_parameters = {
+                                'manager_name': hod_name,
+                                'employee_name': user['employee_name'],
+                                'request_id': request_id,
+                                'from_location': from_location,
+                                'to_location': to_location,
+                                'travel_time': travel_time,
+                                'travel_date': travel_date,
+                                'return_from_location': (return_from_location or 'Not specified') if is_two_way else 'N/A',
+                                'return_to_location': (return_to_location or 'Not specified') if is_two_way else 'N/A',
+                                'return_time': (return_time or 'Not specified') if is_two_way else 'N/A'
+                            }
+
+                            web_log.debug(f"📱 Sending WhatsApp notification to HOD: {hod_phone}")
                             send_whatsapp_template(hod_phone, "hod_approval", "en", hod_parameters)
                         else:
-                            print(f"⚠️ No valid phone number found for HOD: {hod_name}")
+                            web_log.warning(f"⚠️ No valid phone number found for HOD: {hod_name}")
                     else:
-                        print(f"⚠️ No manager phone found in user session for HOD: {hod_name}")
+                        web_log.warning(f"⚠️ No manager phone found in user session for HOD: {hod_name}")
                 except Exception as whatsapp_error:
-                    print(f"❌ Error sending WhatsApp notification to HOD: {whatsapp_error}")
+                    web_log.error(f"❌ Error sending WhatsApp notification to HOD: {whatsapp_error}")
             else:
-                print(f"⚠️ No manager email found for user: {user['employee_name']}")
+                web_log.warning(f"⚠️ No manager email found for user: {user['employee_name']}")
 
             # Send confirmation email to user based on vehicle type
             user_email_subject = f"Taxi Request Submitted - Waiting for Manager Approval - {request_id}"
@@ -4454,37 +6865,27 @@ def submit_request():
                 user_phone = format_phone_number(user.get('employee_phone', ''))
                 if user_phone:
                     # Send WhatsApp notification to user
+                    parameters = {
+                        'employee_name': user['employee_name'],
+                        'request_id': request_id,
+                        'from_location': from_location,
+                        'to_location': to_location,
+                        'travel_time': travel_time,
+                        'travel_date': travel_date
+                    }
                     if returning_ride == 'yes':
-                        # Two-way ride template
                         template_name = "user_query_submission_two_way"
-                        parameters = [
-                            user['employee_name'],  # {{1}} - Employee name
-                            request_id,             # {{2}} - Reference ID
-                            from_location,          # {{3}} - From
-                            to_location,            # {{4}} - To
-                            travel_time,            # {{5}} - Time
-                            travel_date,            # {{6}} - Date
-                            return_from_location,   # {{7}} - From (return journey)
-                            return_to_location,     # {{8}} - To (return journey)
-                            return_time             # {{9}} - Returning Ride
-                        ]
+                        parameters.update(return_from_location=return_from_location,
+                                          return_to_location=return_to_location,
+                                          return_time=return_time)
                     else:
-                        # One-way ride template
                         template_name = "user_query_submission_one_way"
-                        parameters = [
-                            user['employee_name'],  # {{1}} - Employee name
-                            request_id,             # {{2}} - Reference ID
-                            from_location,          # {{3}} - From
-                            to_location,            # {{4}} - To
-                            travel_time,            # {{5}} - Time
-                            travel_date,            # {{6}} - Date
-                            "One Way Ride"          # {{7}} - Type of Ride
-                        ]
-
-                    print(f"📱 Sending WhatsApp notification to user: {user_phone}")
+                        parameters['ride_type'] = "One Way Ride"
+
+                    web_log.debug(f"📱 Sending WhatsApp notification to user: {user_phone}")
                     send_whatsapp_template(user_phone, template_name, "en", parameters)
                 else:
-                    print(f"⚠️ No valid phone number found for user: {user['employee_name']}")
+                    web_log.warning(f"⚠️ No valid phone number found for user: {user['employee_name']}")
 
                 # Send WhatsApp notification to HOD/Manager - COMMENTED OUT
                 # manager_phone = format_phone_number(user.get('manager_phone', ''))
@@ -4525,7 +6926,7 @@ def submit_request():
 
 
             except Exception as e:
-                print(f"❌ Error sending WhatsApp notifications: {str(e)}")
+                web_log.error(f"❌ Error sending WhatsApp notifications: {str(e)}")
                 # Don't fail the request if WhatsApp fails
 
             flash(f'Taxi request submitted successfully! Request ID: {request_id}', 'success')
@@ -4558,7 +6959,7 @@ def hod_dashboard():
     # SPECIAL HARDCODED OVERRIDE for Nishant Sharma (9023418) - Force correct email
     if hod_emp_code == '9023418':
         hod_email = 'nishant.sharma@nvtpower.com'
-        print(f"🔧 HOD DASHBOARD OVERRIDE: Forcing correct email for Nishant Sharma: {hod_email}")
+        web_log.debug(f"🔧 HOD DASHBOARD OVERRIDE: Forcing correct email for Nishant Sharma: {hod_email}")
         # Update session with correct email
         session['hod']['hod_email'] = hod_email
 
@@ -4566,10 +6967,10 @@ def hod_dashboard():
     is_master_login = (hod_emp_code == '9025857')
 
     # Debug logging
-    print(f"🔍 HOD Dashboard - HOD Email: {hod_email}")
-    print(f"🔍 HOD Dashboard - HOD Name: {hod.get('hod_name', 'Unknown')}")
-    print(f"🔍 HOD Dashboard - HOD Emp Code: {hod_emp_code}")
-    print(f"🔍 HOD Dashboard - Master Login: {is_master_login}")
+    web_log.debug(f"🔍 HOD Dashboard - HOD Email: {hod_email}")
+    web_log.debug(f"🔍 HOD Dashboard - HOD Name: {hod.get('hod_name', 'Unknown')}")
+    web_log.debug(f"🔍 HOD Dashboard - HOD Emp Code: {hod_emp_code}")
+    web_log.debug(f"🔍 HOD Dashboard - Master Login: {is_master_login}")
 
     # Get status filter from URL parameters
     status_filter = request.args.get('status', '')
@@ -4711,21 +7112,21 @@ def hod_dashboard():
             try:
                 if is_master_login:
                     # Master login - Execute query directly without manager_email filtering
-                    print(f"🔍 Master Login - Executing query for ALL requests")
+                    web_log.debug(f"🔍 Master Login - Executing query for ALL requests")
                     c.execute(query, query_params)
                     basic_requests = c.fetchall()
-                    print(f"🔍 Master Login - Found {len(basic_requests)} requests")
+                    web_log.debug(f"🔍 Master Login - Found {len(basic_requests)} requests")
                 else:
                     # Regular HOD - Use flexible matching but respect status filter
-                    print(f"🔍 Regular HOD - Looking for requests with manager_email: {hod_email}")
-                    print(f"🔍 Regular HOD - Status filter: {status_filter}")
+                    web_log.debug(f"🔍 Regular HOD - Looking for requests with manager_email: {hod_email}")
+                    web_log.debug(f"🔍 Regular HOD - Status filter: {status_filter}")
 
                     # Check if this HOD is Mohit Agarwal - if so, also include special employee requests
-                    special_employees = ['9023649', '9025421', '9024436', '9023422', '9017113', '9021930', '9022826', '9023418', '9012706', '9025968', '9024785', '9022761', '9025802']
+                    special_employees = sorted(get_org_directory()['emp_code_overrides'])
                     is_mohit_agarwal = (hod_emp_code == '9023422')
 
                     if is_mohit_agarwal:
-                        print(f"🔍 HOD is Mohit Agarwal - Will include special employee requests")
+                        web_log.debug(f"🔍 HOD is Mohit Agarwal - Will include special employee requests")
                         # For Mohit Agarwal, get requests for both his direct reports AND special employees
                         matching_requests = find_matching_requests_for_hod(hod_email, c)
 
@@ -4746,7 +7147,7 @@ def hod_dashboard():
                                 unique_requests.append(req)
                                 seen_ids.add(req[0])
                         matching_requests = unique_requests
-                        print(f"🔍 Mohit Agarwal - Found {len(matching_requests)} total requests (including special employees)")
+                        web_log.debug(f"🔍 Mohit Agarwal - Found {len(matching_requests)} total requests (including special employees)")
                     else:
                         # Use flexible matching to find requests for this HOD
                         matching_requests = find_matching_requests_for_hod(hod_email, c)
@@ -4779,15 +7180,15 @@ def hod_dashboard():
 
                         c.execute(full_query, request_ids)
                         basic_requests = c.fetchall()
-                        print(f"🔍 Found {len(basic_requests)} filtered request details for HOD email: {hod_email}")
+                        web_log.debug(f"🔍 Found {len(basic_requests)} filtered request details for HOD email: {hod_email}")
                     else:
                         # Fallback to original query if no flexible matches found
-                        print(f"🔍 Regular HOD - Using fallback query")
-                        print(f"🔍 Regular HOD - Query: {query}")
-                        print(f"🔍 Regular HOD - Query Params: {query_params}")
+                        web_log.debug(f"🔍 Regular HOD - Using fallback query")
+                        web_log.debug(f"🔍 Regular HOD - Query: {query}")
+                        web_log.debug(f"🔍 Regular HOD - Query Params: {query_params}")
                         c.execute(query, query_params)
                         basic_requests = c.fetchall()
-                        print(f"🔍 Found {len(basic_requests)} requests using original query for HOD email: {hod_email}")
+                        web_log.debug(f"🔍 Found {len(basic_requests)} requests using original query for HOD email: {hod_email}")
 
                 # Now build the full request data with safe timestamp handling
                 requests = []
@@ -4805,7 +7206,7 @@ def hod_dashboard():
                         if timestamp_result:
                             submission_date = timestamp_result[0]
                     except Exception as timestamp_error:
-                        print(f"Warning: Could not get timestamp for request {req[0]}: {timestamp_error}")
+                        web_log.warning(f"Warning: Could not get timestamp for request {req[0]}: {timestamp_error}")
 
                     # Build the final request tuple to match template expectations
                     # [0-14] = basic fields, [15] = submission_date
@@ -4814,14 +7215,14 @@ def hod_dashboard():
                     requests.append(tuple(final_request))
 
             except Exception as e:
-                print(f"Error in HOD dashboard query: {e}")
+                web_log.error(f"Error in HOD dashboard query: {e}")
                 # Fallback to empty list if query fails completely
                 requests = []
 
             # Get status counts based on master login status
             if is_master_login:
                 # Master login - Get counts for ALL requests
-                print(f"🔍 Master Login - Getting status counts for ALL requests")
+                web_log.debug(f"🔍 Master Login - Getting status counts for ALL requests")
                 c.execute('''SELECT status, COUNT(*)
                             FROM taxi_requests
                             WHERE travel_date IS NOT NULL
@@ -4878,8 +7279,8 @@ def hod_dashboard():
                                 AND travel_date <= '2100-12-31' ''', (normalize_email_for_matching(hod_email),))
                     pending_hod_count = c.fetchone()[0]
 
-            print(f"🔍 Status counts for HOD {hod_email}: {status_counts}")
-            print(f"🔍 Pending HOD count for {hod_email}: {pending_hod_count}")
+            web_log.debug(f"🔍 Status counts for HOD {hod_email}: {status_counts}")
+            web_log.debug(f"🔍 Pending HOD count for {hod_email}: {pending_hod_count}")
 
             # Get budget information from hod_budget table
             current_year = datetime.now().year
@@ -4992,13 +7393,13 @@ def admin_dashboard():
                             req_list[26] = timestamps[2]  # admin_response_date
                             req_list[27] = timestamps[3]  # created_at
                     except Exception as timestamp_error:
-                        print(f"Warning: Could not get timestamps for request {req[0]}: {timestamp_error}")
+                        web_log.warning(f"Warning: Could not get timestamps for request {req[0]}: {timestamp_error}")
                         # Keep the 'N/A' placeholders
 
                     requests.append(tuple(req_list))
 
             except Exception as e:
-                print(f"Error in admin dashboard query: {e}")
+                web_log.error(f"Error in admin dashboard query: {e}")
                 # Fallback to empty list if query fails completely
                 requests = []
 
@@ -5018,8 +7419,9 @@ def admin_dashboard():
             # Get budget information
             budget_info = get_budget_info()
             budget_percentage = (budget_info['used_budget'] / budget_info['total_budget'] * 100) if budget_info['total_budget'] > 0 else 0
+            budget_forecast = get_budget_forecasts().get(COMPANY_BUDGET_KEY)
 
-        return render_template('admin_dashboard.html', requests=requests, status_counts=status_counts, pending_admin_count=pending_admin_count, budget_info=budget_info, budget_percentage=budget_percentage)
+        return render_template('admin_dashboard.html', requests=requests, status_counts=status_counts, pending_admin_count=pending_admin_count, budget_info=budget_info, budget_percentage=budget_percentage, budget_forecast=budget_forecast)
     finally:
         db_pool.putconn(conn)
 
@@ -5071,26 +7473,16 @@ def hod_response(request_id):
                 hod_action = request.form.get('hod_action')  # 'approve' or 'reject'
                 hod_response = request.form.get('hod_response')
 
-                print(f"HOD Action: {hod_action}")
-                print(f"HOD Response: {hod_response}")
-                print(f"Request ID: {request_id}")
+                web_log.debug(f"HOD Action: {hod_action}")
+                web_log.debug(f"HOD Response: {hod_response}")
+                web_log.debug(f"Request ID: {request_id}")
 
                 if not all([hod_action, hod_response]):
                     flash('Please fill in all required fields', 'error')
                     budget_info = get_hod_budget_info_by_email(hod['hod_email'])
                     return render_template('hod_response.html', request=taxi_request, taxi_reason=taxi_reason, budget_info=budget_info)
 
-                # Check budget before allowing approval
                 if hod_action == 'approve':
-                    # Get HOD-specific budget information
-                    budget_info = get_hod_budget_info_by_email(hod['hod_email'])
-                    remaining_budget = budget_info['remaining_budget']
-
-                    # Check if remaining budget is less than 500
-                    if remaining_budget < 500:
-                        flash(f'Cannot approve request: Your remaining budget (₹{remaining_budget:,.2f}) is less than ₹500. Please contact admin to increase budget.', 'error')
-                        return render_template('hod_response.html', request=taxi_request, taxi_reason=taxi_reason, budget_info=budget_info)
-
                     new_status = 'Pending Admin Approval'
                     status_message = 'Approved by HOD'
                 else:
@@ -5098,12 +7490,26 @@ def hod_response(request_id):
                     status_message = 'Rejected by HOD'
 
                 try:
-                    # Update request
-                    c.execute('''UPDATE taxi_requests
-                                SET status = %s, hod_response = %s, hod_approval_date = %s
-                                WHERE id = %s''',
-                             (new_status, hod_response, datetime.now(), request_id))
-                    conn.commit()
+                    if hod_action == 'approve':
+                        # Budget check, status change and reservation happen atomically
+                        outcome, remaining_budget = reserve_budget_and_approve(conn, request_id, hod['hod_email'], hod_response)
+                        if outcome == 'insufficient_budget':
+                            flash(f'Cannot approve request: Your remaining budget (₹{remaining_budget:,.2f}) is less than ₹{HOD_APPROVAL_MIN_REMAINING:,.0f}. Please contact admin to increase budget.', 'error')
+                            budget_info = get_hod_budget_info_by_email(hod['hod_email'])
+                            return render_template('hod_response.html', request=taxi_request, taxi_reason=taxi_reason, budget_info=budget_info)
+                    else:
+                        # Update request only if nobody else has acted on it meanwhile
+                        c.execute('''UPDATE taxi_requests
+                                    SET status = %s, hod_response = %s, hod_approval_date = %s
+                                    WHERE id = %s AND status IN ('Pending Manager Approval', 'Pending')
+                                    RETURNING id''',
+                                 (new_status, hod_response, datetime.now(), request_id))
+                        outcome = 'rejected' if c.fetchone() else 'not_pending'
+                        conn.commit()
+
+                    if outcome == 'not_pending':
+                        flash('This request is not pending manager approval', 'error')
+                        return redirect(url_for('hod_dashboard'))
 
                     # Send notification based on HOD action
                     employee_email = taxi_request[3]
@@ -5266,10 +7672,10 @@ Thank You"""
                         if employee_phone:
                             send_whatsapp_notification(employee_phone, whatsapp_message)
                         else:
-                            print(f"⚠️ No phone number available for WhatsApp notification to {employee_name}")
+                            web_log.warning(f"⚠️ No phone number available for WhatsApp notification to {employee_name}")
 
                     except Exception as whatsapp_error:
-                        print(f"❌ Error sending WhatsApp notification: {whatsapp_error}")
+                        web_log.error(f"❌ Error sending WhatsApp notification: {whatsapp_error}")
 
                     # If HOD approved, send notification to admin (not to user)
                     if hod_action == 'approve':
@@ -5280,7 +7686,11 @@ Thank You"""
                                 c.execute('SELECT admin_email, admin_phone, admin_name FROM admins WHERE emp_code = %s AND is_active = TRUE', ('9022761',))
                                 admin = c.fetchone()
 
-                                if admin:
+                                if admin and queue_approval_digest('admin_approval', admin[0], admin[2], admin[1],
+                                                                   request_id, employee_name, taxi_request[6], taxi_request[7],
+                                                                   taxi_request[8], taxi_request[9]):
+                                    web_log.info(f"🗂️ Admin notification for {request_id} added to digest for {admin[0]}")
+                                elif admin:
                                     admin_email, admin_phone, admin_name = admin
 
                                     # Email notification to admin
@@ -5370,7 +7780,7 @@ Thank You"""
                     <td style="padding: 8px; border-bottom: 1px solid #dee2e6;">{vehicle_number or 'Not specified'}</td>
                 </tr>"""
                                         except Exception as e:
-                                            print(f"Error fetching vehicle details: {e}")
+                                            web_log.error(f"Error fetching vehicle details: {e}")
 
                                     # Add return ride information
                                     admin_email_body += f"""
@@ -5432,42 +7842,26 @@ Thank You"""
                                     try:
                                         admin_phone = format_phone_number(admin_phone)
                                         if admin_phone:
-                                            # Check if it's a two-way ride
-                                            if returning_ride == 'yes':
-                                                # Two-way ride: include all parameters including return details
-                                                admin_parameters = [
-                                                    admin_name,                        # {{1}} - Admin name
-                                                    employee_name,                    # {{2}} - Employee name
-                                                    request_id,                       # {{3}} - Reference ID
-                                                    taxi_request[6],                  # {{4}} - From
-                                                    taxi_request[7],                  # {{5}} - To
-                                                    taxi_request[9],                  # {{6}} - Time
-                                                    taxi_request[8],                  # {{7}} - Date
-                                                    return_from_location if return_from_location else 'Not specified',  # {{8}} - From (return journey)
-                                                    return_to_location if return_to_location else 'Not specified',      # {{9}} - To (return journey)
-                                                    return_time if return_time else 'Not specified',                    # {{10}} - Returning Ride time
-                                                ]
-                                            else:
-                                                # One-way ride: use N/A for return details
-                                                admin_parameters = [
-                                                    admin_name,                        # {{1}} - Admin name
-                                                    employee_name,                    # {{2}} - Employee name
-                                                    request_id,                       # {{3}} - Reference ID
-                                                    taxi_request[6],                  # {{4}} - From
-                                                    taxi_request[7],                  # {{5}} - To
-                                                    taxi_request[9],                  # {{6}} - Time
-                                                    taxi_request[8],                  # {{7}} - Date
-                                                    'N/A',                            # {{8}} - From (return journey - N/A for one-way)
-                                                    'N/A',                            # {{9}} - To (return journey - N/A for one-way)
-                                                    'N/A',                            # {{10}} - Returning Ride time (N/A for one-way)
-                                                ]
-
-                                            print(f"📱 Sending WhatsApp notification to admin: {admin_phone}")
+                                            is_two_way = returning_ride == 'yes'
+                                            admin_parameters = {
+                                                'admin_name': admin_name,
+                                                'employee_name': employee_name,
+                                                'request_id': request_id,
+                                                'from_location': taxi_request[FROM_LOCATION],
+                                                'to_location': taxi_request[TO_LOCATION],
+                                                'travel_time': taxi_request[TRAVEL_TIME],
+                                                'travel_date': taxi_request[TRAVEL_DATE],
+                                                'return_from_location': (return_from_location or 'Not specified') if is_two_way else 'N/A',
+                                                'return_to_location': (return_to_location or 'Not specified') if is_two_way else 'N/A',
+                                                'return_time': (return_time or 'Not specified') if is_two_way else 'N/A'
+                                            }
+
+                                            web_log.debug(f"📱 Sending WhatsApp notification to admin: {admin_phone}")
                                             send_whatsapp_template(admin_phone, "admin_approval", "en", admin_parameters)
                                         else:
-                                            print(f"⚠️ No valid phone number found for admin: {admin_email}")
+                                            web_log.warning(f"⚠️ No valid phone number found for admin: {admin_email}")
                                     except Exception as whatsapp_error:
-                                        print(f"❌ Error sending WhatsApp notification to admin: {whatsapp_error}")
+                                        web_log.error(f"❌ Error sending WhatsApp notification to admin: {whatsapp_error}")
                         finally:
                             db_pool.putconn(admin_conn)
 
@@ -5624,33 +8018,33 @@ Thank You"""
 
                             # Use the user_hod_approval_reject template
                             template_name = "user_hod_approval_reject"
-                            parameters = [
-                                employee_name,                    # {{1}} - Employee name
-                                hod_name,                        # {{2}} - HOD name
-                                request_id,                      # {{3}} - Reference ID
-                                taxi_request[6],                 # {{4}} - From
-                                taxi_request[7],                 # {{5}} - To
-                                taxi_request[9],                 # {{6}} - Time
-                                taxi_request[8],                 # {{7}} - Date
-                                return_from_location if return_from_location else 'N/A',  # {{8}} - From (return journey)
-                                return_to_location if return_to_location else 'N/A',      # {{9}} - To (return journey)
-                                return_time if return_time else 'N/A',                    # {{10}} - Returning Ride time
-                                new_status                       # {{11}} - Status
-                            ]
-
-                            print(f"📱 Sending WhatsApp notification to user: {user_phone}")
+                            parameters = {
+                                'employee_name': employee_name,
+                                'hod_name': hod_name,
+                                'request_id': request_id,
+                                'from_location': taxi_request[FROM_LOCATION],
+                                'to_location': taxi_request[TO_LOCATION],
+                                'travel_time': taxi_request[TRAVEL_TIME],
+                                'travel_date': taxi_request[TRAVEL_DATE],
+                                'return_from_location': return_from_location,
+                                'return_to_location': return_to_location,
+                                'return_time': return_time,
+                                'status': new_status
+                            }
+
+                            web_log.debug(f"📱 Sending WhatsApp notification to user: {user_phone}")
                             send_whatsapp_template(user_phone, template_name, "en", parameters)
                         else:
-                            print(f"⚠️ No valid phone number found for user: {employee_name}")
+                            web_log.warning(f"⚠️ No valid phone number found for user: {employee_name}")
 
                     except Exception as whatsapp_error:
-                        print(f"❌ Error sending WhatsApp notification: {whatsapp_error}")
+                        web_log.error(f"❌ Error sending WhatsApp notification: {whatsapp_error}")
 
                     flash(f'Request {status_message.lower()} successfully', 'success')
                     return redirect(url_for('hod_dashboard'))
 
                 except Exception as e:
-                    print(f"HOD Response Error: {str(e)}")
+                    web_log.error(f"HOD Response Error: {str(e)}")
                     flash(f'Error processing request: {str(e)}', 'error')
                     budget_info = get_hod_budget_info_by_email(hod['hod_email'])
                     return render_template('hod_response.html', request=taxi_request, taxi_reason=taxi_reason, budget_info=budget_info)
@@ -5710,7 +8104,7 @@ def admin_response(request_id):
                         req_list[26] = timestamps[2]  # admin_response_date
                         req_list[27] = timestamps[3]  # created_at
                 except Exception as timestamp_error:
-                    print(f"Warning: Could not get timestamps for admin response request {request_id}: {timestamp_error}")
+                    web_log.warning(f"Warning: Could not get timestamps for admin response request {request_id}: {timestamp_error}")
 
                 taxi_request = tuple(req_list)
             else:
@@ -5734,18 +8128,27 @@ def admin_response(request_id):
                             SET status = %s, admin_response = %s, taxi_details = %s, admin_response_date = %s
                             WHERE id = %s''',
                          (status, admin_response, taxi_details, datetime.now(), request_id))
-                conn.commit()
 
-                # Note: 24-hour reminders are now handled by the overdue reminder scheduler
-                # No need to schedule individual reminders here
+                # Approved company taxis get a feedback reminder 24 hours after the trip
+                if status == 'Approved' and taxi_request[16] == 'company_taxi' and taxi_request[8]:
+                    schedule_action(c, 'feedback_reminder', request_id,
+                                    feedback_reminder_due_at(taxi_request[8], taxi_request[9]))
+                else:
+                    cancel_scheduled_actions(c, request_id, ['feedback_reminder'])
+
+                # Hand back the budget the HOD reserved if admin turns the request down
+                released = release_budget_reservation(c, request_id) if status == 'Rejected' else 0
+                conn.commit()
+                if released:
+                    invalidate_budget_cache()
 
                 # Send notification to employee
                 employee_email = taxi_request[3]
                 employee_phone = taxi_request[4]
                 employee_name = taxi_request[2]
 
-                print(f"📧 Sending admin response email to {employee_name} ({employee_email})")
-                print(f"📧 Status: {status}, Response: {admin_response[:50]}...")
+                web_log.debug(f"📧 Sending admin response email to {employee_name} ({employee_email})")
+                web_log.debug(f"📧 Status: {status}, Response: {admin_response[:50]}...")
 
                 # Extract additional fields from taxi_request for admin email
                 # Note: The query returns fields in different order than the constants expect
@@ -5755,14 +8158,14 @@ def admin_response(request_id):
                 return_to_location = taxi_request[22] if len(taxi_request) > 22 else ''  # return_to_location
                 return_time = taxi_request[23] if len(taxi_request) > 23 else ''  # return_time
 
-                # Debug: Print return ride details
-                print(f"🔍 Admin Email Debug - Return Ride Details:")
-                print(f"   Taxi Request Length: {len(taxi_request)}")
-                print(f"   Returning Ride (index 20): {returning_ride}")
-                print(f"   Return From (index 21): {return_from_location}")
-                print(f"   Return To (index 22): {return_to_location}")
-                print(f"   Return Time (index 23): {return_time}")
-                print(f"   Type of Ride (index 16): {type_of_ride}")
+                # Debug: Log return ride details
+                web_log.debug(f"🔍 Admin Email Debug - Return Ride Details:")
+                web_log.debug(f"   Taxi Request Length: {len(taxi_request)}")
+                web_log.debug(f"   Returning Ride (index 20): {returning_ride}")
+                web_log.debug(f"   Return From (index 21): {return_from_location}")
+                web_log.debug(f"   Return To (index 22): {return_to_location}")
+                web_log.debug(f"   Return Time (index 23): {return_time}")
+                web_log.debug(f"   Type of Ride (index 16): {type_of_ride}")
 
                 # Email notification to employee
                 email_subject = f"Taxi Request Update - {request_id}"
@@ -5901,52 +8304,34 @@ def admin_response(request_id):
                         # Get admin name from session
                         admin_name = session['admin'].get('admin_name', 'Admin')
 
-                        # Check if it's a two-way ride
-                        if returning_ride == 'yes':
-                            # Two-way ride: include all parameters including return details
-                            user_parameters = [
-                                employee_name,                    # {{1}} - Employee name
-                                admin_name,                       # {{2}} - Admin name
-                                request_id,                       # {{3}} - Reference ID
-                                taxi_request[6],                  # {{4}} - From
-                                taxi_request[7],                  # {{5}} - To
-                                taxi_request[9],                  # {{6}} - Time
-                                taxi_request[8],                  # {{7}} - Date
-                                return_from_location if return_from_location else 'Not specified',  # {{8}} - From (return journey)
-                                return_to_location if return_to_location else 'Not specified',      # {{9}} - To (return journey)
-                                return_time if return_time else 'Not specified',                    # {{10}} - Returning Ride time
-                                status,                           # {{11}} - Status
-                                taxi_details if taxi_details else 'Not provided'  # {{12}} - Taxi Details
-                            ]
-                        else:
-                            # One-way ride: use N/A for return details
-                            user_parameters = [
-                                employee_name,                    # {{1}} - Employee name
-                                admin_name,                       # {{2}} - Admin name
-                                request_id,                       # {{3}} - Reference ID
-                                taxi_request[6],                  # {{4}} - From
-                                taxi_request[7],                  # {{5}} - To
-                                taxi_request[9],                  # {{6}} - Time
-                                taxi_request[8],                  # {{7}} - Date
-                                'N/A',                            # {{8}} - From (return journey - N/A for one-way)
-                                'N/A',                            # {{9}} - To (return journey - N/A for one-way)
-                                'N/A',                            # {{10}} - Returning Ride time (N/A for one-way)
-                                status,                           # {{11}} - Status
-                                taxi_details if taxi_details else 'Not provided'  # {{12}} - Taxi Details
-                            ]
-
-                        print(f"📱 Sending WhatsApp notification to user: {user_phone}")
+                        is_two_way = returning_ride == 'yes'
+                        user_parameters = {
+                            'employee_name': employee_name,
+                            'admin_name': admin_name,
+                            'request_id': request_id,
+                            'from_location': taxi_request[FROM_LOCATION],
+                            'to_location': taxi_request[TO_LOCATION],
+                            'travel_time': taxi_request[TRAVEL_TIME],
+                            'travel_date': taxi_request[TRAVEL_DATE],
+                            'return_from_location': (return_from_location or 'Not specified') if is_two_way else 'N/A',
+                            'return_to_location': (return_to_location or 'Not specified') if is_two_way else 'N/A',
+                            'return_time': (return_time or 'Not specified') if is_two_way else 'N/A',
+                            'status': status,
+                            'taxi_details': taxi_details
+                        }
+
+                        web_log.debug(f"📱 Sending WhatsApp notification to user: {user_phone}")
                         send_whatsapp_template(user_phone, "user_admin_approval_reject", "en", user_parameters)
                     else:
-                        print(f"⚠️ No valid phone number found for user: {employee_name}")
+                        web_log.warning(f"⚠️ No valid phone number found for user: {employee_name}")
                 except Exception as whatsapp_error:
-                    print(f"❌ Error sending WhatsApp notification to user: {whatsapp_error}")
+                    web_log.error(f"❌ Error sending WhatsApp notification to user: {whatsapp_error}")
 
                 if email_sent:
-                    print(f"✅ Email sent successfully to {employee_email}")
+                    web_log.info(f"✅ Email sent successfully to {employee_email}")
                     flash(f'Response submitted successfully! Email notification sent to {employee_name}.', 'success')
                 else:
-                    print(f"❌ Failed to send email to {employee_email}")
+                    web_log.error(f"❌ Failed to send email to {employee_email}")
                     flash(f'Response submitted successfully, but email notification failed to send to {employee_name}.', 'warning')
                 return redirect(url_for('admin_dashboard'))
 
@@ -5966,35 +8351,38 @@ def hod_budget():
         hod_budgets = get_all_hod_budgets()
         current_year = datetime.now().year
 
-        # Debug: Check database table structure
-        conn = db_pool.getconn()
-        try:
-            with conn.cursor() as c:
-                c.execute("""
-                    SELECT column_name, data_type, ordinal_position
-                    FROM information_schema.columns
-                    WHERE table_name = 'hod_budget'
-                    ORDER BY ordinal_position
-                """)
-                columns = c.fetchall()
-                print(f"🔍 HOD Budget Table Structure:")
-                for col in columns:
-                    print(f"  {col[2]}: {col[0]} ({col[1]})")
-        except Exception as e:
-            print(f"❌ Error checking table structure: {str(e)}")
-        finally:
-            db_pool.putconn(conn)
+        # Debug: table structure and a sample of rows (skips the catalog query unless DEBUG is on)
+        if budget_log.isEnabledFor(logging.DEBUG):
+            conn = db_pool.getconn()
+            try:
+                with conn.cursor() as c:
+                    c.execute("""
+                        SELECT column_name, data_type
+                        FROM information_schema.columns
+                        WHERE table_name = 'hod_budget'
+                        ORDER BY ordinal_position
+                    """)
+                    budget_log.debug("🔍 HOD budget table structure", extra={'fields': {
+                        'columns': [f"{col[0]} ({col[1]})" for col in c.fetchall()],
+                        'sample_rows': hod_budgets[:3]
+                    }})
+            except Exception as e:
+                budget_log.warning(f"⚠️ Error checking table structure: {str(e)}")
+            finally:
+                db_pool.putconn(conn)
 
-        # Debug: Print the first few HOD budgets to check data structure
-        print(f"🔍 HOD Budgets Data Structure:")
-        for i, hod in enumerate(hod_budgets[:3]):  # Print first 3 for debugging
-            print(f"  HOD {i+1}: {hod}")
+        # Forecasts come from the daily budget_forecast job, not from request history
+        budget_forecasts = get_budget_forecasts()
+        for hod in hod_budgets:
+            hod['forecast'] = budget_forecasts.get(hod['hod_emp_code'])
 
         return render_template('hod_budget.html',
                              hod_budgets=hod_budgets,
-                             current_year=current_year)
+                             current_year=current_year,
+                             company_forecast=budget_forecasts.get(COMPANY_BUDGET_KEY),
+                             monthly_burn=get_budget_burn_by_month())
     except Exception as e:
-        print(f"❌ Error loading HOD budget page: {str(e)}")
+        budget_log.error(f"❌ Error loading HOD budget page: {str(e)}")
         flash('Error loading HOD budget information', 'error')
         return redirect(url_for('admin_dashboard'))
 
@@ -6032,13 +8420,24 @@ def update_hod_budget():
                 # Calculate remaining budget
                 remaining_budget = total_budget - used_budget
 
-                # Update the budget
+                # Used spend lives in the ledger - record the correction as an adjustment entry
+                c.execute(HOD_BUDGET_SELECT + '''
+                            WHERE b.hod_emp_code = %s AND b.budget_year = %s
+                            FOR UPDATE OF b''', (hod_emp_code, current_year))
+                current_used = float(c.fetchone()[4])
+                if used_budget != current_used:
+                    append_budget_entry(c, used_budget - current_used, 'adjustment', hod_emp_code=hod_emp_code,
+                                        note=f"Set by admin {session['admin'].get('emp_code', '')}")
+
+                # Total is configuration, not spend - update it in place
                 c.execute('''UPDATE hod_budget
-                            SET total_budget = %s, used_budget = %s, remaining_budget = %s, updated_at = CURRENT_TIMESTAMP
+                            SET total_budget = %s, remaining_budget = %s - used_budget, updated_at = CURRENT_TIMESTAMP
                             WHERE hod_emp_code = %s AND budget_year = %s''',
-                            (total_budget, used_budget, remaining_budget, hod_emp_code, current_year))
+                            (total_budget, total_budget, hod_emp_code, current_year))
+                notify_budget_changed(c)
 
                 conn.commit()
+                invalidate_budget_cache()
 
                 return jsonify({
                     'success': True,
@@ -6052,9 +8451,298 @@ def update_hod_budget():
             db_pool.putconn(conn)
 
     except Exception as e:
-        print(f"❌ Error updating HOD budget: {str(e)}")
+        budget_log.error(f"❌ Error updating HOD budget: {str(e)}")
         return jsonify({'success': False, 'error': 'Database error occurred'})
 
+@app.route('/admin_org_directory', methods=['GET', 'POST'])
+def admin_org_directory():
+    """Admin JSON view/edit of the organisation directory (edits apply to all workers without a restart)"""
+    if 'admin' not in session or not session['admin'].get('authenticated'):
+        return jsonify({'success': False, 'error': 'Admin access required'}), 401
+
+    if request.method == 'POST':
+        payload = request.get_json(silent=True) or {}
+        kind = payload.get('kind')
+        key = str(payload.get('key') or '').strip()
+        data = payload.get('data')
+
+        if kind not in ORG_DIRECTORY_KINDS or not key:
+            return jsonify({'success': False, 'error': f"kind must be one of {', '.join(ORG_DIRECTORY_KINDS)} and key is required"}), 400
+        if kind == 'location_department' and '|' not in key:
+            return jsonify({'success': False, 'error': "location_department keys look like 'manesar|quality'"}), 400
+        if not payload.get('delete'):
+            missing = [field for field in ORG_DIRECTORY_REQUIRED_FIELDS[kind] if not isinstance(data, dict) or field not in data]
+            if missing:
+                return jsonify({'success': False, 'error': f"data is missing: {', '.join(missing)}"}), 400
+
+        conn = db_pool.getconn()
+        try:
+            with conn.cursor() as c:
+                if payload.get('delete'):
+                    c.execute('DELETE FROM org_directory WHERE kind = %s AND key = %s', (kind, key))
+                else:
+                    c.execute('''INSERT INTO org_directory (kind, key, data, updated_at)
+                                VALUES (%s, %s, %s::jsonb, NOW())
+                                ON CONFLICT (kind, key) DO UPDATE SET
+                                data = EXCLUDED.data,
+                                updated_at = NOW()''', (kind, key, json.dumps(data)))
+                changed = c.rowcount
+            conn.commit()
+            directory_log.info(f"📇 Organisation directory {'delete' if payload.get('delete') else 'upsert'} {kind}/{key} by {session['admin'].get('emp_code', '')}")
+        except Exception as e:
+            conn.rollback()
+            directory_log.error(f"❌ Error editing organisation directory: {e}")
+            return jsonify({'success': False, 'error': 'Database error occurred'}), 500
+        finally:
+            db_pool.putconn(conn)
+
+        # This worker switches immediately; the others within ORG_DIRECTORY_POLL_SECONDS
+        try:
+            reload_org_directory(force=True)
+        except Exception as e:
+            directory_log.warning(f"⚠️ Could not reload organisation directory: {e}")
+        return jsonify({'success': True, 'changed': changed, 'version': get_org_directory()['version']})
+
+    directory = get_org_directory()
+    response = {
+        'success': True,
+        'pid': os.getpid(),
+        'version': directory['version'],
+        'loaded_at': directory['loaded_at'].isoformat(),
+        'reloads': ORG_DIRECTORY_STATE['reloads'],
+        'poll_seconds': ORG_DIRECTORY_POLL_SECONDS,
+        'kinds': list(ORG_DIRECTORY_KINDS)
+    }
+    kind = request.args.get('kind')
+    if kind in ORG_DIRECTORY_KINDS:
+        conn = db_pool.getconn()
+        try:
+            with conn.cursor() as c:
+                c.execute('SELECT key, data, updated_at FROM org_directory WHERE kind = %s ORDER BY key', (kind,))
+                response['entries'] = [
+                    {'key': row[0], 'data': row[1], 'updated_at': row[2].isoformat() if row[2] else None}
+                    for row in c.fetchall()
+                ]
+        finally:
+            db_pool.putconn(conn)
+    return jsonify(response)
+
+@app.route('/admin_reroute_pending', methods=['GET', 'POST'])
+def admin_reroute_pending():
+    """
+    Admin JSON action: queue a re-routing of pending HOD approvals after an approver
+    mapping change (the scheduler leader runs it). GET lists recent runs, or one run
+    with the moves a dry run found via ?run_id=N.
+    """
+    if 'admin' not in session or not session['admin'].get('authenticated'):
+        return jsonify({'success': False, 'error': 'Admin access required'}), 401
+
+    if request.method == 'POST':
+        payload = request.get_json(silent=True) or {}
+        try:
+            chunk_size = int(payload.get('chunk_size') or REROUTE_CHUNK_SIZE)
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'error': 'chunk_size must be a number'}), 400
+
+        dry_run = bool(payload.get('dry_run', True))
+        conn = db_pool.getconn()
+        try:
+            run_id, last_request_id = start_reroute_run(
+                conn,
+                dry_run=dry_run,
+                notify=bool(payload.get('notify')),
+                chunk_size=max(1, min(chunk_size, 5000)),
+                started_by=f"admin:{session['admin'].get('emp_code', '')}",
+                restart=bool(payload.get('restart')),
+                use_sap=bool(payload.get('use_sap', True)),
+                queued=True
+            )
+        except Exception as e:
+            conn.rollback()
+            directory_log.error(f"❌ Could not queue re-routing run: {e}")
+            return jsonify({'success': False, 'error': 'Could not queue re-routing run'}), 500
+        finally:
+            db_pool.putconn(conn)
+
+        directory_log.info(f"🧭 Re-routing {'dry run ' if dry_run else ''}{run_id} queued by {session['admin'].get('emp_code', '')}")
+        return jsonify({'success': True, 'run_id': run_id, 'queued': True, 'dry_run': dry_run,
+                        'resumed_from': last_request_id or None})
+
+    run_id = request.args.get('run_id', type=int)
+    conn = db_pool.getconn()
+    try:
+        with conn.cursor() as c:
+            c.execute('''SELECT id, dry_run, notify, chunk_size, started_by, last_request_id,
+                                rows_scanned, rows_rerouted, error, started_at, finished_at,
+                                queued, use_sap, CASE WHEN %s THEN changes END
+                        FROM reroute_runs
+                        WHERE %s IS NULL OR id = %s
+                        ORDER BY id DESC LIMIT 20''', (run_id is not None, run_id, run_id))
+            runs = [{
+                'id': row[0], 'dry_run': row[1], 'notify': row[2], 'chunk_size': row[3],
+                'started_by': row[4], 'last_request_id': row[5], 'rows_scanned': row[6],
+                'rows_rerouted': row[7], 'error': row[8],
+                'started_at': row[9].isoformat() if row[9] else None,
+                'finished_at': row[10].isoformat() if row[10] else None,
+                'queued': row[11], 'use_sap': row[12],
+                **({'changes': row[13] or []} if run_id is not None else {})
+            } for row in c.fetchall()]
+    finally:
+        db_pool.putconn(conn)
+    return jsonify({'success': True, 'runs': runs})
+
+@app.route('/admin_credential_cache', methods=['GET', 'POST'])
+def admin_credential_cache():
+    """Admin JSON view of credential cache hit rates; POST {'emp_code'} forgets one employee (or all)"""
+    if 'admin' not in session or not session['admin'].get('authenticated'):
+        return jsonify({'success': False, 'error': 'Admin access required'}), 401
+
+    conn = db_pool.getconn()
+    try:
+        with conn.cursor() as c:
+            if request.method == 'POST':
+                emp_code = str((request.get_json(silent=True) or {}).get('emp_code') or '').strip()
+                if emp_code:
+                    c.execute('DELETE FROM credential_cache WHERE emp_code = %s', (emp_code,))
+                else:
+                    c.execute('DELETE FROM credential_cache')
+                removed = c.rowcount
+                conn.commit()
+                auth_log.info(f"🔐 Credential cache cleared for {emp_code or 'all employees'} by {session['admin'].get('emp_code', '')}")
+                return jsonify({'success': True, 'removed': removed})
+
+            c.execute('SELECT COUNT(*), COUNT(*) FILTER (WHERE expires_at > NOW()) FROM credential_cache')
+            entries, live_entries = c.fetchone()
+        conn.rollback()
+    except Exception as e:
+        conn.rollback()
+        auth_log.error(f"❌ Error reading credential cache: {e}")
+        return jsonify({'success': False, 'error': 'Database error occurred'}), 500
+    finally:
+        db_pool.putconn(conn)
+
+    return jsonify({
+        'success': True,
+        'pid': os.getpid(),
+        'enabled': CREDENTIAL_CACHE_ENABLED,
+        'ttl_hours': CREDENTIAL_CACHE_TTL_HOURS,
+        'entries': entries,
+        'live_entries': live_entries,
+        'metrics': get_credential_cache_metrics()
+    })
+
+@app.route('/admin_budget_reservations')
+def admin_budget_reservations():
+    """Admin JSON view of HOD budget reservation contention and the budget cache"""
+    if 'admin' not in session or not session['admin'].get('authenticated'):
+        return jsonify({'success': False, 'error': 'Admin access required'}), 401
+
+    with BUDGET_RESERVATION_METRICS_LOCK:
+        metrics = dict(BUDGET_RESERVATION_METRICS)
+
+    with BUDGET_CACHE_LOCK:
+        cache = {
+            'loaded': BUDGET_CACHE['snapshot'] is not None,
+            'age_seconds': round(time.time() - BUDGET_CACHE['loaded_at'], 1) if BUDGET_CACHE['snapshot'] else None,
+            'ttl_seconds': BUDGET_CACHE_TTL_SECONDS,
+            'hits': BUDGET_CACHE['hits'],
+            'loads': BUDGET_CACHE['loads'],
+            'invalidations': BUDGET_CACHE['invalidations']
+        }
+
+    return jsonify({
+        'success': True,
+        'pid': os.getpid(),
+        'min_remaining': HOD_APPROVAL_MIN_REMAINING,
+        'reserve_amount': HOD_APPROVAL_RESERVE_AMOUNT,
+        'metrics': metrics,
+        'budget_cache': cache
+    })
+
+@app.route('/admin_rate_limits')
+def admin_rate_limits():
+    """Admin JSON view of outbound WhatsApp/SMTP throttling"""
+    if 'admin' not in session or not session['admin'].get('authenticated'):
+        return jsonify({'success': False, 'error': 'Admin access required'}), 401
+
+    with RATE_LIMIT_METRICS_LOCK:
+        metrics = {channel: dict(values) for channel, values in RATE_LIMIT_METRICS.items()}
+
+    buckets = {}
+    conn = db_pool.getconn()
+    try:
+        with conn.cursor() as c:
+            c.execute('''SELECT bucket_key, tokens, updated_at FROM rate_limit_buckets
+                        WHERE bucket_key = ANY(%s)''', (list(RATE_LIMIT_CONFIG.keys()),))
+            for bucket_key, tokens, updated_at in c.fetchall():
+                buckets[bucket_key] = {'tokens': round(float(tokens), 2), 'updated_at': updated_at.isoformat()}
+    except Exception as e:
+        web_log.error(f"❌ Error reading rate limit buckets: {e}")
+    finally:
+        db_pool.putconn(conn)
+
+    return jsonify({
+        'success': True,
+        'pid': os.getpid(),
+        'limits': RATE_LIMIT_CONFIG,
+        'metrics': metrics,
+        'buckets': buckets
+    })
+
+@app.route('/admin_job_runs')
+def admin_job_runs():
+    """Admin JSON view of recent scheduled job runs with p50/p95 durations"""
+    if 'admin' not in session or not session['admin'].get('authenticated'):
+        return jsonify({'success': False, 'error': 'Admin access required'}), 401
+
+    job_name = request.args.get('job', '').strip() or None
+    limit = max(1, min(request.args.get('limit', 50, type=int), 500))
+
+    conn = db_pool.getconn()
+    try:
+        with conn.cursor() as c:
+            c.execute('''SELECT id, job_name, started_at, finished_at, duration_ms, status, rows_scanned,
+                               messages_attempted, messages_sent, messages_failed, error, hostname, pid
+                        FROM job_runs
+                        WHERE %s::text IS NULL OR job_name = %s
+                        ORDER BY started_at DESC
+                        LIMIT %s''', (job_name, job_name, limit))
+            columns = [desc[0] for desc in c.description]
+            runs = [dict(zip(columns, row)) for row in c.fetchall()]
+
+            c.execute('''SELECT job_name,
+                               COUNT(*),
+                               COUNT(*) FILTER (WHERE status = 'failed'),
+                               percentile_cont(0.5) WITHIN GROUP (ORDER BY duration_ms),
+                               percentile_cont(0.95) WITHIN GROUP (ORDER BY duration_ms),
+                               MAX(started_at)
+                        FROM job_runs
+                        WHERE started_at >= NOW() - INTERVAL '7 days' AND duration_ms IS NOT NULL
+                        GROUP BY job_name
+                        ORDER BY job_name''')
+            summary = {
+                row[0]: {
+                    'runs_7d': row[1],
+                    'failed_7d': row[2],
+                    'p50_ms': round(row[3]) if row[3] is not None else None,
+                    'p95_ms': round(row[4]) if row[4] is not None else None,
+                    'last_started_at': row[5].isoformat() if row[5] else None
+                } for row in c.fetchall()
+            }
+        conn.commit()
+    except Exception as e:
+        scheduler_log.error(f"❌ Error reading job runs: {e}")
+        return jsonify({'success': False, 'error': 'Error reading job runs'}), 500
+    finally:
+        db_pool.putconn(conn)
+
+    for run in runs:
+        for key in ('started_at', 'finished_at'):
+            if run[key]:
+                run[key] = run[key].isoformat()
+
+    return jsonify({'success': True, 'summary': summary, 'runs': runs})
+
 @app.route('/send_feedback_reminders', methods=['POST'])
 def send_feedback_reminders():
     """Admin route to manually send feedback reminders"""
@@ -6067,7 +8755,7 @@ def send_feedback_reminders():
         check_and_send_feedback_reminders()
         flash('Feedback reminders sent successfully!', 'success')
     except Exception as e:
-        print(f"❌ Error sending feedback reminders: {str(e)}")
+        scheduler_log.error(f"❌ Error sending feedback reminders: {str(e)}")
         flash(f'Error sending feedback reminders: {str(e)}', 'error')
 
     return redirect(url_for('admin_dashboard'))
@@ -6101,16 +8789,30 @@ def update_budget_admin():
                 result = c.fetchone()
 
                 if result:
-                    # Update existing budget
+                    # Used spend lives in the ledger - record the correction as an adjustment entry
+                    c.execute('''SELECT b.used_budget + COALESCE(SUM(l.amount), 0)
+                                FROM budget_management b
+                                LEFT JOIN budget_ledger l ON l.rolled_up_at IS NULL
+                                    AND l.budget_year = b.budget_year AND l.hod_emp_code IS NULL
+                                WHERE b.budget_year = %s
+                                GROUP BY b.used_budget''', (current_year,))
+                    current_used = float(c.fetchone()[0])
+                    if used_budget != current_used:
+                        append_budget_entry(c, used_budget - current_used, 'adjustment',
+                                            note=f"Set by admin {session['admin'].get('emp_code', '')}")
+
+                    # Total is configuration, not spend - update it in place
                     c.execute('''UPDATE budget_management
-                                SET total_budget = %s, used_budget = %s, remaining_budget = %s
-                                WHERE budget_year = %s''', (total_budget, used_budget, remaining_budget, current_year))
+                                SET total_budget = %s, remaining_budget = %s - used_budget
+                                WHERE budget_year = %s''', (total_budget, total_budget, current_year))
                 else:
                     # Create new budget entry
                     c.execute('''INSERT INTO budget_management (total_budget, used_budget, remaining_budget, budget_year)
                                 VALUES (%s, %s, %s, %s)''', (total_budget, used_budget, remaining_budget, current_year))
+                notify_budget_changed(c)
 
                 conn.commit()
+                invalidate_budget_cache()
                 flash(f'Budget updated successfully! Total: ₹{total_budget:,.2f}, Used: ₹{used_budget:,.2f}, Remaining: ₹{remaining_budget:,.2f}', 'success')
         finally:
             db_pool.putconn(conn)
@@ -6118,7 +8820,7 @@ def update_budget_admin():
     except ValueError:
         flash('Invalid budget amount. Please enter valid numbers.', 'error')
     except Exception as e:
-        print(f"❌ Error updating budget: {str(e)}")
+        budget_log.error(f"❌ Error updating budget: {str(e)}")
         flash('Error updating budget. Please try again.', 'error')
 
     return redirect(url_for('admin_dashboard'))
@@ -6194,7 +8896,7 @@ def edit_request(request_id):
                         req_list[23] = timestamps[2]  # admin_response_date
                         req_list[24] = timestamps[3]  # created_at
                 except Exception as timestamp_error:
-                    print(f"Warning: Could not get timestamps for edit request {request_id}: {timestamp_error}")
+                    web_log.warning(f"Warning: Could not get timestamps for edit request {request_id}: {timestamp_error}")
 
                 taxi_request = tuple(req_list)
             else:
@@ -6467,14 +9169,17 @@ def submit_feedback():
                       float(end_meter) if end_meter else None,
                       total_distance))
 
+            # Feedback is in - the pending reminder is no longer needed
+            cancel_scheduled_actions(c, request_id, ['feedback_reminder'])
+
             conn.commit()
 
-            print(f"✅ Feedback submitted for request {request_id} by {user['employee_name']} (Rating: {rating})")
+            web_log.info(f"✅ Feedback submitted for request {request_id} by {user['employee_name']} (Rating: {rating})")
 
             return jsonify({'success': True, 'message': 'Feedback submitted successfully'})
 
     except Exception as e:
-        print(f"❌ Error submitting feedback: {str(e)}")
+        web_log.error(f"❌ Error submitting feedback: {str(e)}")
         return jsonify({'success': False, 'message': 'Error submitting feedback'})
 
     finally:
@@ -6556,8 +9261,8 @@ def admin_feedback():
             else:
                 query = base_query + ' ORDER BY tf.feedback_date DESC'
 
-            print(f"🔍 Admin Feedback Query: {query}")
-            print(f"📊 Parameters: {params}")
+            web_log.debug(f"🔍 Admin Feedback Query: {query}")
+            web_log.debug(f"📊 Parameters: {params}")
 
             # Execute the filtered query
             c.execute(query, params)
@@ -6585,11 +9290,10 @@ def admin_feedback():
             ''')
             recent_count = c.fetchone()[0]
 
-            print(f"✅ Found {len(feedbacks)} feedback records")
+            web_log.info(f"✅ Found {len(feedbacks)} feedback records")
 
     except Exception as e:
-        print(f"❌ Error fetching admin feedback data: {e}")
-        traceback.print_exc()
+        web_log.error(f"❌ Error fetching admin feedback data: {e}", exc_info=True)
         flash('Error loading feedback data', 'error')
         feedbacks = []
         stats = (0, 0, 0, 0, 0, 0, 0)
@@ -6677,8 +9381,8 @@ def admin_own_vehicle():
             else:
                 query = base_query + ' ORDER BY tr.created_at DESC'
 
-            print(f"🔍 Admin Own Vehicle Query: {query}")
-            print(f"📊 Parameters: {params}")
+            web_log.debug(f"🔍 Admin Own Vehicle Query: {query}")
+            web_log.debug(f"📊 Parameters: {params}")
 
             # Execute the filtered query
             c.execute(query, params)
@@ -6699,11 +9403,10 @@ def admin_own_vehicle():
             this_month = stats[1] if stats else 0
             this_week = stats[2] if stats else 0
 
-            print(f"✅ Found {len(requests)} own vehicle request records")
+            web_log.info(f"✅ Found {len(requests)} own vehicle request records")
 
     except Exception as e:
-        print(f"❌ Error fetching admin own vehicle data: {e}")
-        traceback.print_exc()
+        web_log.error(f"❌ Error fetching admin own vehicle data: {e}", exc_info=True)
         flash('Error loading own vehicle request data', 'error')
         requests = []
         total_requests = 0
@@ -6737,9 +9440,20 @@ def health_check():
         c.execute('SELECT 1')
         c.close()
         db_pool.putconn(conn)
+
+        try:
+            leader = get_scheduler_leader_info()
+        except Exception as leader_error:
+            leader = {'error': str(leader_error)}
+
         return jsonify({
             'status': 'healthy',
             'database': 'connected',
+            'scheduler': {
+                'pid': os.getpid(),
+                'is_leader': SCHEDULER_STATE['is_leader'],
+                'leader': leader
+            },
             'timestamp': datetime.now().isoformat()
         }), 200
     except Exception as e:
@@ -6752,42 +9466,473 @@ def health_check():
 # =============================================================================
 # APPLICATION STARTUP
 # =============================================================================
-def start_scheduler():
-    """Start the background scheduler for reminders"""
-    scheduler = BackgroundScheduler()
+# Only one process (across all gunicorn workers and hosts) runs the scheduled jobs.
+# Leadership is a session-level Postgres advisory lock held on a dedicated
+# connection; standbys retry every SCHEDULER_ELECTION_INTERVAL_SECONDS and take
+# over automatically when the leader's connection goes away.
+SCHEDULER_LOCK_KEY = int(os.environ.get('SCHEDULER_LOCK_KEY', '727001'))
+SCHEDULER_ELECTION_INTERVAL_SECONDS = int(os.environ.get('SCHEDULER_ELECTION_INTERVAL_SECONDS', '15'))
+SCHEDULER_STATE = {
+    'is_leader': False,
+    'leader_since': None,
+    'lock_conn': None,
+    'scheduler': None,
+    'dispatcher_stop': None,
+    'dispatcher_thread': None,
+    'election_thread': None,
+    'stop_event': threading.Event()
+}
+WORKER_SHUTDOWN_TIMEOUT_SECONDS = int(os.environ.get('WORKER_SHUTDOWN_TIMEOUT_SECONDS', '60'))
+
+# Every scheduled job runs through run_instrumented_job, which records a row in
+# job_runs (timing, rows scanned, messages attempted/sent/failed, errors) and
+# alerts when a run takes longer than the job's interval. The every-minute jobs
+# add a few rows a minute, so runs older than JOB_RUNS_RETENTION_DAYS are pruned
+# by the session_sweep job.
+JOB_ALERT_EMAIL = os.environ.get('JOB_ALERT_EMAIL', '')
+JOB_RUN_COUNTERS = ('rows_scanned', 'messages_attempted', 'messages_sent', 'messages_failed')
+JOB_RUNS_RETENTION_DAYS = int(os.environ.get('JOB_RUNS_RETENTION_DAYS', '30'))
+JOB_RUNS_PRUNE_BATCH_SIZE = 5000
+
+def prune_job_runs():
+    """Delete job_runs rows older than JOB_RUNS_RETENTION_DAYS in batches; returns rows deleted"""
+    deleted_total = 0
+    conn = db_pool.getconn()
+    try:
+        while True:
+            with conn.cursor() as c:
+                c.execute('''DELETE FROM job_runs WHERE id IN (
+                                SELECT id FROM job_runs
+                                WHERE started_at < NOW() - %s * INTERVAL '1 day'
+                                LIMIT %s)''', (JOB_RUNS_RETENTION_DAYS, JOB_RUNS_PRUNE_BATCH_SIZE))
+                deleted = c.rowcount
+            conn.commit()
+            deleted_total += deleted
+            if deleted < JOB_RUNS_PRUNE_BATCH_SIZE:
+                break
+    except Exception as e:
+        conn.rollback()
+        scheduler_log.error(f"❌ Error pruning job runs: {e}")
+    finally:
+        db_pool.putconn(conn)
+    return deleted_total
+
+def sweep_expired_rows():
+    """Maintenance job: expired web sessions and job runs past retention"""
+    stats = sweep_expired_sessions()
+    stats['job_runs_pruned'] = prune_job_runs()
+    return stats
+
+def alert_job_overrun(job_name, duration_seconds, interval_seconds):
+    """Log (and optionally email) a job run that took longer than its schedule interval"""
+    message = (f"Scheduled job '{job_name}' took {duration_seconds:.1f}s, "
+               f"longer than its {interval_seconds}s interval (host {socket.gethostname()}, pid {os.getpid()})")
+    scheduler_log.info(f"🚨 {message}")
+    if JOB_ALERT_EMAIL:
+        send_email_flask_mail(JOB_ALERT_EMAIL, f"Job overrun alert - {job_name}", f"<p>{message}</p>",
+                              email_type='job_alert')
+
+def run_instrumented_job(job_name, interval_seconds, func):
+    """Run one scheduled job and record the run in job_runs"""
+    run_id = None
+    conn = db_pool.getconn()
+    try:
+        with conn.cursor() as c:
+            c.execute('''INSERT INTO job_runs (job_name, started_at, status, hostname, pid)
+                        VALUES (%s, NOW(), 'running', %s, %s) RETURNING id''',
+                     (job_name, socket.gethostname(), os.getpid()))
+            run_id = c.fetchone()[0]
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        scheduler_log.warning(f"⚠️ Could not record start of job {job_name}: {e}")
+    finally:
+        db_pool.putconn(conn)
+
+    started = time.monotonic()
+    result, error = {}, None
+    try:
+        result = func() or {}
+        error = result.get('error') if isinstance(result, dict) else None
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        scheduler_log.error(f"❌ Scheduled job {job_name} raised: {error}", exc_info=True)
+    duration = time.monotonic() - started
+
+    if not isinstance(result, dict):
+        result = {}
+    if run_id is not None:
+        conn = db_pool.getconn()
+        try:
+            with conn.cursor() as c:
+                c.execute('''UPDATE job_runs SET finished_at = NOW(), duration_ms = %s, status = %s,
+                                   rows_scanned = %s, messages_attempted = %s, messages_sent = %s,
+                                   messages_failed = %s, error = %s, details = %s
+                            WHERE id = %s''',
+                         (int(duration * 1000), 'failed' if error else 'success',
+                          *[result.get(counter) for counter in JOB_RUN_COUNTERS],
+                          error, json.dumps(result, default=str), run_id))
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            scheduler_log.warning(f"⚠️ Could not record end of job {job_name}: {e}")
+        finally:
+            db_pool.putconn(conn)
+
+    if duration > interval_seconds:
+        alert_job_overrun(job_name, duration, interval_seconds)
+    return result
+
+def add_instrumented_job(scheduler, func, job_id, name, interval_seconds, run_now=False):
+    """Register an interval job wrapped with run_instrumented_job"""
+    # Long-interval jobs can run once at startup instead of waiting a full interval
+    # (an explicit next_run_time=None would add the job paused)
+    from apscheduler.triggers.interval import IntervalTrigger
+
+    extra = {'next_run_time': datetime.now()} if run_now else {}
     scheduler.add_job(
-        func=check_and_send_overdue_reminders,
-        trigger=IntervalTrigger(minutes=30),
-        id='overdue_reminders',
-        name='Check and send overdue feedback reminders every 30 minutes',
-        replace_existing=True
+        func=run_instrumented_job,
+        args=(job_id, interval_seconds, func),
+        trigger=IntervalTrigger(seconds=interval_seconds),
+        id=job_id,
+        name=name,
+        max_instances=1,
+        replace_existing=True,
+        **extra
+    )
+
+def build_scheduler():
+    """Create the background scheduler with all recurring jobs registered"""
+    # Imported here so web processes, which never schedule, don't load APScheduler
+    from apscheduler.schedulers.background import BackgroundScheduler
+
+    scheduler = BackgroundScheduler()
+    # Timely reminders come from the scheduled_actions dispatcher; this sweep only
+    # reconciles requests approved before the queue existed or missed by it
+    add_instrumented_job(
+        scheduler, check_and_send_overdue_reminders, 'overdue_reminders',
+        f'Reconcile overdue feedback reminders every {REMINDER_SWEEP_INTERVAL_MINUTES} minutes',
+        REMINDER_SWEEP_INTERVAL_MINUTES * 60
+    )
+    add_instrumented_job(
+        scheduler, flush_approval_digests, 'approval_digests',
+        'Send due approval notification digests every minute', 60
+    )
+    add_instrumented_job(
+        scheduler, rollup_budget_ledger, 'budget_rollup',
+        'Roll budget ledger entries into budget summaries every minute', 60
+    )
+    add_instrumented_job(
+        scheduler, run_queued_reroutes, 'reroute_queue',
+        f'Advance queued pending-request re-routing runs every {REROUTE_QUEUE_POLL_SECONDS} seconds',
+        REROUTE_QUEUE_POLL_SECONDS
+    )
+    add_instrumented_job(
+        scheduler, sweep_expired_rows, 'session_sweep',
+        f'Delete expired web sessions and old job runs every {SESSION_SWEEP_INTERVAL_MINUTES} minutes',
+        SESSION_SWEEP_INTERVAL_MINUTES * 60
+    )
+    add_instrumented_job(
+        scheduler, refresh_budget_forecasts, 'budget_forecast',
+        f'Refresh budget burn rates and forecasts every {BUDGET_FORECAST_INTERVAL_HOURS:g} hours',
+        int(BUDGET_FORECAST_INTERVAL_HOURS * 3600), run_now=True
     )
-    scheduler.start()
-    print("✅ Scheduler started - overdue reminders will run every 30 minutes")
     return scheduler
 
-# Initialize database and scheduler on module load (for gunicorn)
-print("🚀 Initializing Taxi Management System...")
-if test_db_connection():
-    init_db()
+def record_scheduler_leader(lock_conn):
+    """Publish this process as the current leader (read by /health on every worker)"""
+    with lock_conn.cursor() as c:
+        c.execute('''INSERT INTO scheduler_leader (id, hostname, pid, acquired_at, heartbeat_at)
+                    VALUES (1, %s, %s, %s, NOW())
+                    ON CONFLICT (id) DO UPDATE SET
+                    hostname = EXCLUDED.hostname,
+                    pid = EXCLUDED.pid,
+                    acquired_at = EXCLUDED.acquired_at,
+                    heartbeat_at = EXCLUDED.heartbeat_at''',
+                 (socket.gethostname(), os.getpid(), SCHEDULER_STATE['leader_since']))
+
+def try_become_scheduler_leader():
+    """Try to take the advisory lock; on success start the scheduler in this process"""
+    lock_conn = psycopg2.connect(**app.config['DB_CONFIG'])
+    lock_conn.autocommit = True
+    try:
+        with lock_conn.cursor() as c:
+            c.execute('SELECT pg_try_advisory_lock(%s)', (SCHEDULER_LOCK_KEY,))
+            acquired = c.fetchone()[0]
+    except Exception:
+        lock_conn.close()
+        raise
+
+    if not acquired:
+        lock_conn.close()
+        return False
+
+    scheduler = None
+    dispatcher_stop = None
+    try:
+        SCHEDULER_STATE['lock_conn'] = lock_conn
+        SCHEDULER_STATE['leader_since'] = datetime.now()
+        record_scheduler_leader(lock_conn)
+
+        scheduler = build_scheduler()
+        scheduler.start()
+        SCHEDULER_STATE['scheduler'] = scheduler
+
+        dispatcher_stop = threading.Event()
+        dispatcher_thread = threading.Thread(target=scheduled_action_dispatcher, args=(dispatcher_stop,),
+                                             name='scheduled-action-dispatcher', daemon=True)
+        dispatcher_thread.start()
+        SCHEDULER_STATE['dispatcher_stop'] = dispatcher_stop
+        SCHEDULER_STATE['dispatcher_thread'] = dispatcher_thread
+        SCHEDULER_STATE['is_leader'] = True
+    except Exception:
+        # Never keep holding the lock without leading, or no process would run jobs
+        if dispatcher_stop:
+            dispatcher_stop.set()
+        if scheduler is not None and scheduler.running:
+            try:
+                scheduler.shutdown(wait=False)
+            except Exception:
+                pass
+        try:
+            with lock_conn.cursor() as c:
+                c.execute('SELECT pg_advisory_unlock(%s)', (SCHEDULER_LOCK_KEY,))
+        except Exception:
+            pass
+        lock_conn.close()
+        SCHEDULER_STATE.update(scheduler=None, lock_conn=None, leader_since=None,
+                               dispatcher_stop=None, dispatcher_thread=None)
+        raise
+    scheduler_log.info(f"👑 Scheduler leader elected (pid {os.getpid()}) - action dispatcher running, reminder sweep every {REMINDER_SWEEP_INTERVAL_MINUTES} minutes, approval digests every minute")
+    return True
+
+def step_down_scheduler_leader(reason, wait=False):
+    """
+    Stop running jobs here and release the lock so a standby can take over.
+    With wait=True in-flight jobs and dispatched actions are drained first.
+    """
+    scheduler_log.warning(f"⚠️ Stepping down as scheduler leader (pid {os.getpid()}): {reason}")
+    SCHEDULER_STATE['is_leader'] = False
+    dispatcher_stop = SCHEDULER_STATE.get('dispatcher_stop')
+    if dispatcher_stop:
+        dispatcher_stop.set()
+        try:
+            # Wake the dispatcher out of its LISTEN wait so it sees the stop flag
+            with SCHEDULER_STATE['lock_conn'].cursor() as c:
+                c.execute('SELECT pg_notify(%s, %s)', (SCHEDULED_ACTIONS_CHANNEL, 'stop'))
+        except Exception:
+            pass
+    dispatcher_thread = SCHEDULER_STATE.get('dispatcher_thread')
+    if wait and dispatcher_thread:
+        dispatcher_thread.join(timeout=WORKER_SHUTDOWN_TIMEOUT_SECONDS)
+    scheduler = SCHEDULER_STATE.get('scheduler')
+    if scheduler:
+        try:
+            scheduler.shutdown(wait=wait)
+        except Exception as e:
+            scheduler_log.warning(f"⚠️ Error shutting down scheduler: {e}")
+    lock_conn = SCHEDULER_STATE.get('lock_conn')
+    if lock_conn:
+        try:
+            # Closing the session releases the advisory lock
+            lock_conn.close()
+        except Exception:
+            pass
+    SCHEDULER_STATE.update(scheduler=None, lock_conn=None, leader_since=None,
+                           dispatcher_stop=None, dispatcher_thread=None)
+
+def scheduler_election_loop():
+    """Keep trying for leadership while standing by; heartbeat while leading"""
+    stop_event = SCHEDULER_STATE['stop_event']
+    while not stop_event.is_set():
+        try:
+            if SCHEDULER_STATE['is_leader']:
+                with SCHEDULER_STATE['lock_conn'].cursor() as c:
+                    c.execute('UPDATE scheduler_leader SET heartbeat_at = NOW() WHERE id = 1 AND pid = %s',
+                              (os.getpid(),))
+            else:
+                try_become_scheduler_leader()
+        except Exception as e:
+            if SCHEDULER_STATE['is_leader']:
+                step_down_scheduler_leader(f"lost lock connection: {e}")
+            else:
+                scheduler_log.warning(f"⚠️ Scheduler election attempt failed: {e}")
+        stop_event.wait(SCHEDULER_ELECTION_INTERVAL_SECONDS)
+
+def get_scheduler_leader_info():
+    """Which process currently leads the scheduler, as recorded by the leader itself"""
+    conn = db_pool.getconn()
+    try:
+        with conn.cursor() as c:
+            c.execute('''SELECT hostname, pid, acquired_at, heartbeat_at,
+                               EXISTS (SELECT 1 FROM pg_locks
+                                       WHERE locktype = 'advisory' AND granted
+                                       AND ((classid::bigint << 32) | objid::bigint) = %s)
+                        FROM scheduler_leader WHERE id = 1''', (SCHEDULER_LOCK_KEY,))
+            row = c.fetchone()
+        conn.commit()
+    finally:
+        db_pool.putconn(conn)
+
+    if not row:
+        return None
+    return {
+        'hostname': row[0],
+        'pid': row[1],
+        'acquired_at': row[2].isoformat() if row[2] else None,
+        'heartbeat_at': row[3].isoformat() if row[3] else None,
+        'lock_held': row[4]
+    }
+
+def start_scheduler():
+    """Join the scheduler leader election (idempotent per process)"""
+    thread = SCHEDULER_STATE.get('election_thread')
+    if thread and thread.is_alive():
+        return thread
+
+    SCHEDULER_STATE['stop_event'].clear()
+    thread = threading.Thread(target=scheduler_election_loop, name='scheduler-election', daemon=True)
+    thread.start()
+    SCHEDULER_STATE['election_thread'] = thread
+    atexit.register(lambda: SCHEDULER_STATE['is_leader'] and step_down_scheduler_leader('process exiting'))
+    scheduler_log.info(f"✅ Scheduler election started (pid {os.getpid()}) - jobs run only in the elected leader")
+    return thread
+
+def stop_scheduler(wait=True):
+    """Leave the election and, if leading, drain in-flight jobs before releasing the lock"""
+    SCHEDULER_STATE['stop_event'].set()
+    thread = SCHEDULER_STATE.get('election_thread')
+    if thread:
+        thread.join(timeout=SCHEDULER_ELECTION_INTERVAL_SECONDS + 5)
+    if SCHEDULER_STATE['is_leader']:
+        step_down_scheduler_leader('shutting down', wait=wait)
+
+def run_worker():
+    """
+    Background worker entry point (python -m app worker / Procfile `worker:`).
+    Owns the scheduler, the reminder pipeline and the scheduled action
+    dispatcher; web processes do none of this. Schema changes come from
+    `python -m app migrate`.
+    """
+    app_log.info(f"🛠️ Starting Taxi Management background worker (pid {os.getpid()})...")
+    log_database_configuration()
+    if not check_schema_version():
+        app_log.error("❌ Cannot start worker - database unreachable or not migrated")
+        exit(1)
+
+    # Make sure this year's budget rows exist before anything reads them; after
+    # startup the budget_rollup job creates each new year's rows as it begins
+    conn = db_pool.getconn()
+    try:
+        with conn.cursor() as c:
+            ensure_budget_year(c, datetime.now().year)
+        conn.commit()
+    finally:
+        db_pool.putconn(conn)
+
+    shutdown_requested = threading.Event()
+
+    def request_shutdown(signum, frame):
+        app_log.info(f"🛑 Received signal {signum} - draining background jobs...")
+        shutdown_requested.set()
+
+    signal.signal(signal.SIGTERM, request_shutdown)
+    signal.signal(signal.SIGINT, request_shutdown)
+
     start_scheduler()
-else:
-    print("⚠️ Database connection failed - will retry on first request")
+    while not shutdown_requested.is_set():
+        shutdown_requested.wait(1)
+
+    stop_scheduler(wait=True)
+    app_log.info("✅ Worker stopped cleanly")
+
+APP_STATE = {'initialized': False, 'init_seconds': None}
+
+def create_app():
+    """
+    Application factory for gunicorn ('app:create_app()', see gunicorn.conf.py).
+    Checks the schema version once in the calling process - with --preload that is
+    the master - then closes its connections so forked workers start clean and open
+    their own pool and HTTP session on first use. Migrations run once per release
+    (python -m app migrate) and background work in the worker process.
+    """
+    if not APP_STATE['initialized']:
+        started = time.perf_counter()
+        app_log.info(f"🚀 Initializing Taxi Management System (web, pid {os.getpid()})...")
+        log_database_configuration()
+        if not check_schema_version():
+            app_log.warning("⚠️ Database not ready - requests may fail until it is reachable and migrated")
+        APP_STATE['initialized'] = True
+        APP_STATE['init_seconds'] = time.perf_counter() - started
+        app_log.info(f"✅ Web app validated in {APP_STATE['init_seconds'] * 1000:.0f} ms")
+    release_process_resources()
+    return app
+
+def release_process_resources():
+    """Close this process's pooled connections and HTTP session (called before workers fork)"""
+    db_pool.closeall()
+    if PROCESS_STATE['http_session'] is not None and PROCESS_STATE['pid'] == os.getpid():
+        PROCESS_STATE['http_session'].close()
+    PROCESS_STATE.update({'pid': None, 'http_session': None})
+
+def reset_after_fork():
+    """gunicorn post_fork hook: drop anything inherited from the master without closing it"""
+    db_pool.reset_after_fork()
+    PROCESS_STATE.update({'pid': None, 'http_session': None})
+    reset_services()
 
 if __name__ == '__main__':
-    print("🚀 Starting Taxi Management System (Development Mode)...")
+    if len(sys.argv) > 1 and sys.argv[1] == 'worker':
+        run_worker()
+        sys.exit(0)
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'migrate':
+        migrate_db()
+        sys.exit(0)
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'rebuild-taxi-requests':
+        # python -m app rebuild-taxi-requests [--batch-size N] [--pause SECONDS] [--restart]
+        options = sys.argv[2:]
+        rebuild_stats = rebuild_taxi_requests(
+            batch_size=int(options[options.index('--batch-size') + 1]) if '--batch-size' in options else None,
+            pause_seconds=float(options[options.index('--pause') + 1]) if '--pause' in options else None,
+            restart='--restart' in options
+        )
+        sys.exit(1 if 'error' in rebuild_stats else 0)
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'reroute-pending':
+        # python -m app reroute-pending [--dry-run] [--notify] [--restart] [--no-sap] [--chunk-size N]
+        options = sys.argv[2:]
+        reroute_chunk_size = int(options[options.index('--chunk-size') + 1]) if '--chunk-size' in options else None
+        reroute_stats = reroute_pending_requests(
+            chunk_size=reroute_chunk_size,
+            dry_run='--dry-run' in options,
+            notify='--notify' in options,
+            use_sap='--no-sap' not in options,
+            restart='--restart' in options
+        )
+        for change in reroute_stats['changes']:
+            app_log.info(f"   {change['request_id']}: {change['old_manager_email']} → {change['new_manager_email']} ({change['reason']})")
+        sys.exit(1 if 'error' in reroute_stats else 0)
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'benchmark-routing':
+        benchmark_approval_routing(int(sys.argv[2]) if len(sys.argv) > 2 else 1000)
+        sys.exit(0)
+
+    app_log.info("🚀 Starting Taxi Management System (Development Mode)...")
+    log_database_configuration()
 
     # Test database connection first
     if not test_db_connection():
-        print("❌ Cannot start application - database connection failed")
+        app_log.error("❌ Cannot start application - database connection failed")
         exit(1)
 
-    # Initialize database
-    init_db()
+    # Development mode applies pending migrations on start
+    migrate_db()
 
-    # Start scheduler
+    # Development mode runs the background jobs in-process
     start_scheduler()
 
-    print("✅ Starting Flask application...")
+    app_log.info("✅ Starting Flask application...")
     port = int(os.environ.get('PORT', 9060))
     app.run(debug=False, host='0.0.0.0', port=port)
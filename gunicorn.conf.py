@@ -0,0 +1,42 @@
+"""
+Gunicorn settings for the web service.
+
+The app is imported and validated once in the master (preload_app) and workers
+are forked from it; each worker opens its own database pool and HTTP session
+lazily. Boot timings are logged so worker scaling can be compared:
+  - "master ready" - master start to listening, including the app import/validation
+  - "worker booted" - fork to the worker accepting requests
+"""
+import os
+import sys
+import time
+
+MASTER_STARTED = time.perf_counter()
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '9060')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+threads = int(os.environ.get('GUNICORN_THREADS', '4'))
+timeout = 120
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+
+def when_ready(server):
+    server.log.info("⏱️ master ready in %.0f ms (preload=%s, workers=%s)",
+                    (time.perf_counter() - MASTER_STARTED) * 1000, preload_app, workers)
+
+
+def pre_fork(server, worker):
+    worker.fork_started = time.perf_counter()
+
+
+def post_fork(server, worker):
+    # With preload the app module is already imported; otherwise the worker imports it after this hook
+    taxi_app = sys.modules.get('app')
+    if taxi_app is not None:
+        taxi_app.reset_after_fork()
+
+
+def post_worker_init(worker):
+    started = getattr(worker, 'fork_started', None)
+    if started is not None:
+        worker.log.info("⏱️ worker %s booted in %.0f ms", worker.pid, (time.perf_counter() - started) * 1000)
@@ -0,0 +1,342 @@
+-- Baseline schema: everything the app used to create from init_db() on startup.
+-- Every statement is idempotent, so databases created before migrations existed
+-- are adopted as version 1 without changes.
+
+-- taxi_requests - fixed column order (30 columns); rows are read by position via the column constants
+CREATE TABLE IF NOT EXISTS taxi_requests (
+    id TEXT PRIMARY KEY,                    -- 0
+    emp_code TEXT NOT NULL,                 -- 1
+    employee_name TEXT NOT NULL,            -- 2
+    employee_email TEXT NOT NULL,           -- 3
+    employee_phone TEXT NOT NULL,           -- 4
+    department TEXT,                        -- 5
+    from_location TEXT NOT NULL,            -- 6
+    to_location TEXT NOT NULL,              -- 7
+    travel_date DATE NOT NULL,              -- 8
+    travel_time TIME NOT NULL,              -- 9
+    purpose TEXT NOT NULL,                  -- 10
+    passengers INTEGER DEFAULT 1,           -- 11
+    status TEXT DEFAULT 'Pending Manager Approval', -- 12
+    manager_email TEXT,                     -- 13
+    hod_response TEXT,                      -- 14
+    hod_approval_date TIMESTAMP,            -- 15
+    admin_response TEXT,                    -- 16
+    taxi_details TEXT,                      -- 17
+    submission_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP, -- 18
+    admin_response_date TIMESTAMP,          -- 19
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, -- 20
+    assigned_cost DECIMAL(10,2) DEFAULT 0.00, -- 21
+    type_of_ride TEXT DEFAULT 'company_taxi', -- 22
+    vehicle_company TEXT,                   -- 23
+    vehicle_type TEXT,                      -- 24
+    vehicle_number TEXT,                    -- 25
+    returning_ride TEXT DEFAULT 'no',       -- 26
+    return_from_location TEXT,              -- 27
+    return_to_location TEXT,                -- 28
+    return_time TIME                        -- 29
+);
+
+-- login_logs
+CREATE TABLE IF NOT EXISTS login_logs (
+    id SERIAL PRIMARY KEY,
+    emp_code TEXT NOT NULL,
+    employee_name TEXT NOT NULL,
+    login_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    ip_address TEXT,
+    success BOOLEAN DEFAULT TRUE,
+    error_message TEXT
+);
+
+-- HODs
+CREATE TABLE IF NOT EXISTS hods (
+    id SERIAL PRIMARY KEY,
+    emp_code TEXT UNIQUE NOT NULL,
+    hod_name TEXT NOT NULL,
+    hod_email TEXT NOT NULL,
+    hod_phone TEXT NOT NULL,
+    department TEXT NOT NULL,
+    password TEXT NOT NULL DEFAULT 'admin123',
+    is_active BOOLEAN DEFAULT TRUE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- taxi_feedback
+CREATE TABLE IF NOT EXISTS taxi_feedback (
+    id SERIAL PRIMARY KEY,
+    request_id TEXT NOT NULL,
+    emp_code TEXT NOT NULL,
+    employee_name TEXT NOT NULL,
+    employee_email TEXT NOT NULL,
+    rating INTEGER NOT NULL CHECK (rating >= 1 AND rating <= 5),
+    comment TEXT,
+    start_meter DECIMAL(10,2),
+    end_meter DECIMAL(10,2),
+    total_distance DECIMAL(10,2),
+    feedback_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (request_id) REFERENCES taxi_requests(id) ON DELETE CASCADE
+);
+
+-- admins
+CREATE TABLE IF NOT EXISTS admins (
+    id SERIAL PRIMARY KEY,
+    emp_code TEXT UNIQUE NOT NULL,
+    admin_name TEXT NOT NULL,
+    admin_email TEXT NOT NULL,
+    admin_phone TEXT NOT NULL,
+    password TEXT NOT NULL DEFAULT 'admin123',
+    is_active BOOLEAN DEFAULT TRUE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- managers
+CREATE TABLE IF NOT EXISTS managers (
+    id SERIAL PRIMARY KEY,
+    emp_code TEXT UNIQUE NOT NULL,
+    manager_name TEXT NOT NULL,
+    manager_email TEXT NOT NULL,
+    manager_phone TEXT,
+    department TEXT,
+    is_active BOOLEAN DEFAULT TRUE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- budget_management
+CREATE TABLE IF NOT EXISTS budget_management (
+    id SERIAL PRIMARY KEY,
+    total_budget DECIMAL(12,2) DEFAULT 100000.00,
+    used_budget DECIMAL(12,2) DEFAULT 0.00,
+    remaining_budget DECIMAL(12,2) DEFAULT 100000.00,
+    budget_year INTEGER UNIQUE DEFAULT EXTRACT(YEAR FROM CURRENT_DATE),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- taxi_reason
+CREATE TABLE IF NOT EXISTS taxi_reason (
+    id SERIAL PRIMARY KEY,
+    reference_id TEXT NOT NULL,
+    reason TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (reference_id) REFERENCES taxi_requests(id) ON DELETE CASCADE
+);
+
+-- feedback_reminders to track sent reminders
+CREATE TABLE IF NOT EXISTS feedback_reminders (
+    id SERIAL PRIMARY KEY,
+    request_id TEXT NOT NULL,
+    reminder_type TEXT NOT NULL,
+    sent_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(request_id, reminder_type),
+    FOREIGN KEY (request_id) REFERENCES taxi_requests(id) ON DELETE CASCADE
+);
+
+-- hod_budget for individual HOD budget management
+CREATE TABLE IF NOT EXISTS hod_budget (
+    id SERIAL PRIMARY KEY,
+    hod_emp_code TEXT NOT NULL,
+    hod_name TEXT NOT NULL,
+    hod_email TEXT NOT NULL,
+    total_budget DECIMAL(12,2) DEFAULT 50000.00,
+    used_budget DECIMAL(12,2) DEFAULT 0.00,
+    remaining_budget DECIMAL(12,2) DEFAULT 50000.00,
+    budget_year INTEGER DEFAULT EXTRACT(YEAR FROM CURRENT_DATE),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(hod_emp_code, budget_year)
+);
+
+-- scheduled_actions - due-time queue for per-request follow-ups
+CREATE TABLE IF NOT EXISTS scheduled_actions (
+    id SERIAL PRIMARY KEY,
+    action TEXT NOT NULL,
+    request_id TEXT NOT NULL,
+    due_at TIMESTAMP NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    completed_at TIMESTAMP,
+    UNIQUE(action, request_id),
+    FOREIGN KEY (request_id) REFERENCES taxi_requests(id) ON DELETE CASCADE
+);
+
+-- budget_ledger - append-only spend/refund/adjustment entries
+CREATE TABLE IF NOT EXISTS budget_ledger (
+    id BIGSERIAL PRIMARY KEY,
+    budget_year INTEGER NOT NULL,
+    hod_emp_code TEXT,
+    request_id TEXT,
+    entry_type TEXT NOT NULL,
+    amount DECIMAL(12,2) NOT NULL,
+    note TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    rolled_up_at TIMESTAMP
+);
+
+-- budget_burn_daily - ledger spend per day, HOD ('' = company) and department
+CREATE TABLE IF NOT EXISTS budget_burn_daily (
+    spend_date DATE NOT NULL,
+    hod_emp_code TEXT NOT NULL,
+    department TEXT NOT NULL,
+    amount DECIMAL(12,2) NOT NULL DEFAULT 0,
+    entries INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (spend_date, hod_emp_code, department)
+);
+
+-- budget_forecast - burn rate and projected exhaustion per budget
+CREATE TABLE IF NOT EXISTS budget_forecast (
+    hod_emp_code TEXT PRIMARY KEY,
+    budget_year INTEGER NOT NULL,
+    remaining_budget DECIMAL(12,2),
+    burn_rate_per_day DECIMAL(12,2) NOT NULL DEFAULT 0,
+    spend_this_week DECIMAL(12,2) NOT NULL DEFAULT 0,
+    spend_last_week DECIMAL(12,2) NOT NULL DEFAULT 0,
+    wow_change_pct DECIMAL(8,1),
+    projected_exhaustion_date DATE,
+    computed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- job_runs - run history for scheduled jobs
+CREATE TABLE IF NOT EXISTS job_runs (
+    id SERIAL PRIMARY KEY,
+    job_name TEXT NOT NULL,
+    started_at TIMESTAMP NOT NULL,
+    finished_at TIMESTAMP,
+    duration_ms INTEGER,
+    status TEXT NOT NULL,
+    rows_scanned INTEGER,
+    messages_attempted INTEGER,
+    messages_sent INTEGER,
+    messages_failed INTEGER,
+    error TEXT,
+    details JSONB,
+    hostname TEXT,
+    pid INTEGER
+);
+
+-- job_watermarks - high-water marks for incremental scheduled scans
+CREATE TABLE IF NOT EXISTS job_watermarks (
+    job_name TEXT PRIMARY KEY,
+    watermark_date DATE,
+    watermark_ts TIMESTAMP,
+    last_full_scan_at TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- scheduler_leader - single row describing the elected scheduler process
+CREATE TABLE IF NOT EXISTS scheduler_leader (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    hostname TEXT,
+    pid INTEGER,
+    acquired_at TIMESTAMP,
+    heartbeat_at TIMESTAMP
+);
+
+-- rate_limit_buckets for the shared outbound token buckets
+CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+    bucket_key TEXT PRIMARY KEY,
+    tokens DOUBLE PRECISION NOT NULL,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- notification_digest_queue for batched approval notifications
+CREATE TABLE IF NOT EXISTS notification_digest_queue (
+    id SERIAL PRIMARY KEY,
+    notification_type TEXT NOT NULL,
+    recipient_email TEXT NOT NULL,
+    recipient_name TEXT,
+    recipient_phone TEXT,
+    request_id TEXT NOT NULL,
+    employee_name TEXT,
+    from_location TEXT,
+    to_location TEXT,
+    travel_date TEXT,
+    travel_time TEXT,
+    queued_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    sent_at TIMESTAMP,
+    FOREIGN KEY (request_id) REFERENCES taxi_requests(id) ON DELETE CASCADE
+);
+
+-- credential_cache - hashed emp_code/DOB of recent successful SAP logins
+CREATE TABLE IF NOT EXISTS credential_cache (
+    emp_code TEXT PRIMARY KEY,
+    salt TEXT NOT NULL,
+    credential_hash TEXT NOT NULL,
+    profile JSONB NOT NULL,
+    verified_at TIMESTAMP NOT NULL,
+    expires_at TIMESTAMP NOT NULL
+);
+
+-- web_sessions - server-side Flask sessions keyed by the cookie's session id
+CREATE TABLE IF NOT EXISTS web_sessions (
+    session_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    expires_at TIMESTAMP NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- reroute_runs - progress of bulk re-routing runs, so they can resume
+CREATE TABLE IF NOT EXISTS reroute_runs (
+    id SERIAL PRIMARY KEY,
+    dry_run BOOLEAN NOT NULL DEFAULT FALSE,
+    notify BOOLEAN NOT NULL DEFAULT FALSE,
+    chunk_size INTEGER,
+    started_by TEXT,
+    last_request_id TEXT,
+    rows_scanned INTEGER NOT NULL DEFAULT 0,
+    rows_rerouted INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    finished_at TIMESTAMP
+);
+
+-- org_directorys - approver mappings, HOD access and email corrections
+CREATE TABLE IF NOT EXISTS org_directory (
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    data JSONB NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (kind, key)
+);
+CREATE TABLE IF NOT EXISTS org_directory_version (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version BIGINT NOT NULL DEFAULT 1,
+    seeded_at TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Any edit to org_directory (app or psql) bumps the version workers poll
+CREATE OR REPLACE FUNCTION bump_org_directory_version() RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE org_directory_version SET version = version + 1, updated_at = NOW() WHERE id = 1;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS org_directory_changed ON org_directory;
+CREATE TRIGGER org_directory_changed
+    AFTER INSERT OR UPDATE OR DELETE ON org_directory
+    FOR EACH STATEMENT EXECUTE PROCEDURE bump_org_directory_version();
+
+-- Indexes
+CREATE INDEX IF NOT EXISTS idx_taxi_emp_code ON taxi_requests(emp_code);
+CREATE INDEX IF NOT EXISTS idx_taxi_status ON taxi_requests(status);
+CREATE INDEX IF NOT EXISTS idx_login_emp_code ON login_logs(emp_code);
+CREATE INDEX IF NOT EXISTS idx_hod_emp_code ON hods(emp_code);
+CREATE INDEX IF NOT EXISTS idx_budget_management_year ON budget_management(budget_year);
+CREATE INDEX IF NOT EXISTS idx_feedback_reminders_request_id ON feedback_reminders(request_id);
+CREATE INDEX IF NOT EXISTS idx_feedback_reminders_type ON feedback_reminders(reminder_type);
+CREATE INDEX IF NOT EXISTS idx_hod_budget_emp_code ON hod_budget(hod_emp_code);
+CREATE INDEX IF NOT EXISTS idx_hod_budget_year ON hod_budget(budget_year);
+CREATE INDEX IF NOT EXISTS idx_budget_ledger_unrolled ON budget_ledger(budget_year, hod_emp_code) WHERE rolled_up_at IS NULL;
+CREATE INDEX IF NOT EXISTS idx_budget_ledger_request ON budget_ledger(request_id);
+CREATE INDEX IF NOT EXISTS idx_budget_ledger_created ON budget_ledger(created_at);
+CREATE INDEX IF NOT EXISTS idx_budget_burn_daily_hod ON budget_burn_daily(hod_emp_code, spend_date);
+CREATE INDEX IF NOT EXISTS idx_job_runs_job_started ON job_runs(job_name, started_at DESC);
+CREATE INDEX IF NOT EXISTS idx_scheduled_actions_due ON scheduled_actions(due_at) WHERE status = 'pending';
+CREATE INDEX IF NOT EXISTS idx_taxi_travel_date ON taxi_requests(travel_date);
+CREATE INDEX IF NOT EXISTS idx_taxi_admin_response_date ON taxi_requests(admin_response_date);
+CREATE INDEX IF NOT EXISTS idx_web_sessions_expires ON web_sessions(expires_at);
+CREATE INDEX IF NOT EXISTS idx_digest_queue_pending ON notification_digest_queue(recipient_email, notification_type) WHERE sent_at IS NULL;
@@ -0,0 +1,11 @@
+-- table_rebuilds - progress of online table rebuilds (python -m app rebuild-taxi-requests), so they can resume
+CREATE TABLE IF NOT EXISTS table_rebuilds (
+    table_name TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    last_id TEXT,
+    rows_copied BIGINT NOT NULL DEFAULT 0,
+    old_table TEXT,
+    started_at TIMESTAMP,
+    updated_at TIMESTAMP,
+    finished_at TIMESTAMP
+);
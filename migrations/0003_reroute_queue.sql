@@ -0,0 +1,7 @@
+-- reroute_runs - runs requested from /admin_reroute_pending are queued for the scheduler
+-- leader (run_queued_reroutes) instead of running inside the web request; dry runs keep
+-- the moves they would make in `changes`
+ALTER TABLE reroute_runs ADD COLUMN IF NOT EXISTS queued BOOLEAN NOT NULL DEFAULT FALSE;
+ALTER TABLE reroute_runs ADD COLUMN IF NOT EXISTS use_sap BOOLEAN NOT NULL DEFAULT TRUE;
+ALTER TABLE reroute_runs ADD COLUMN IF NOT EXISTS changes JSONB;
+CREATE INDEX IF NOT EXISTS idx_reroute_runs_queued ON reroute_runs(id) WHERE queued AND finished_at IS NULL;
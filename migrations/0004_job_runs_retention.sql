@@ -0,0 +1,2 @@
+-- job_runs - the session_sweep job deletes runs older than JOB_RUNS_RETENTION_DAYS by start time
+CREATE INDEX IF NOT EXISTS idx_job_runs_started ON job_runs(started_at);
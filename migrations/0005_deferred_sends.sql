@@ -0,0 +1,5 @@
+-- scheduled_actions - notifications throttled during a web request are queued as
+-- 'deferred_send' actions carrying the send's arguments in `payload`; they aren't
+-- always tied to a taxi request, so request_id may be NULL
+ALTER TABLE scheduled_actions ADD COLUMN IF NOT EXISTS payload JSONB;
+ALTER TABLE scheduled_actions ALTER COLUMN request_id DROP NOT NULL;
@@ -0,0 +1,21 @@
+"""
+Local stand-in servers for load testing the notification and login paths.
+
+    pip install -r test_support/requirements.txt
+    python -m test_support --profile realistic
+
+starts an SMTP sink, a fake WhatsApp Cloud API and a fake SAP SuccessFactors
+OData server, and prints the environment variables that point the app at them:
+
+    MAIL_SERVER=127.0.0.1  MAIL_PORT=1025
+    WHATSAPP_API_URL=http://127.0.0.1:9101/v21.0/
+    SAP_BASE_URL=http://127.0.0.1:9102/odata/v2/
+
+Each server can also be started on its own (python -m test_support.fake_whatsapp,
+python -m test_support.fake_sap, python -m test_support.smtp_sink) and accepts
+--profile / --latency-ms / --jitter-ms / --error-rate / --throttle-rps.
+"""
+
+from test_support.profiles import PROFILES, Profile, add_profile_arguments, profile_from_args
+
+__all__ = ['PROFILES', 'Profile', 'add_profile_arguments', 'profile_from_args']
@@ -0,0 +1,48 @@
+"""Start the SMTP sink, fake WhatsApp API and fake SAP OData server together"""
+import argparse
+import threading
+import time
+
+from test_support import fake_sap, fake_whatsapp, smtp_sink
+from test_support.profiles import add_profile_arguments, profile_from_args
+
+
+def main():
+    parser = add_profile_arguments(argparse.ArgumentParser(description=__doc__))
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--smtp-port', type=int, default=1025)
+    parser.add_argument('--whatsapp-port', type=int, default=9101)
+    parser.add_argument('--sap-port', type=int, default=9102)
+    args = parser.parse_args()
+
+    # Each server gets its own Profile so throttling/counters are independent
+    controller, handler = smtp_sink.start_sink(args.host, args.smtp_port, profile_from_args(args))
+    whatsapp_app = fake_whatsapp.create_app(profile_from_args(args))
+    sap_app = fake_sap.create_app(profile_from_args(args))
+
+    for server_app, port in ((whatsapp_app, args.whatsapp_port), (sap_app, args.sap_port)):
+        threading.Thread(
+            target=server_app.run,
+            kwargs={'host': args.host, 'port': port, 'threaded': True, 'use_reloader': False},
+            daemon=True
+        ).start()
+
+    print(f"🧪 Stand-in servers running ({args.profile} profile). Point the app at them with:")
+    print(f"   MAIL_SERVER={args.host}")
+    print(f"   MAIL_PORT={args.smtp_port}")
+    print(f"   WHATSAPP_API_URL=http://{args.host}:{args.whatsapp_port}/v21.0/")
+    print(f"   SAP_BASE_URL=http://{args.host}:{args.sap_port}/odata/v2/")
+    print("   (log in with any employee code and DOB 01011990)")
+
+    try:
+        while True:
+            time.sleep(60)
+            print(f"📊 SMTP sink: {handler.snapshot()}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        controller.stop()
+
+
+if __name__ == '__main__':
+    main()
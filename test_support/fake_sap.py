@@ -0,0 +1,147 @@
+"""
+Fake SAP SuccessFactors OData v2 server - serves EmpJob, PerEmail and PerPhone
+shaped like the responses verify_sap_credentials / fetch_manager_contact_from_sap parse.
+
+Every employee code resolves to a synthetic employee born on --dob (default
+1990-01-01), so logging in with that date (01011990) always succeeds.
+"""
+import argparse
+import re
+import time
+from datetime import datetime, timezone
+
+from flask import Flask, jsonify, request
+
+from test_support.profiles import Profile, add_profile_arguments, profile_from_args
+
+FILTER_PATTERN = re.compile(r"(?:userId|personIdExternal)\s+eq\s+'([^']*)'")
+
+DEPARTMENTS = ['Information Technology', 'Quality', 'Production', 'Finance', 'Human Resources']
+LOCATIONS = ['Bawal', 'Manesar']
+
+
+def sap_date(value):
+    """Render a date as SAP's /Date(milliseconds)/ (noon UTC so local conversion keeps the day)"""
+    moment = datetime(value.year, value.month, value.day, 12, tzinfo=timezone.utc)
+    return f"/Date({int(moment.timestamp() * 1000)})/"
+
+
+def phone_for(emp_code):
+    """Deterministic 10-digit mobile number for an employee code"""
+    digits = ''.join(filter(str.isdigit, emp_code)) or '0'
+    return '9' + digits[-9:].zfill(9)
+
+
+def picklist(label):
+    return {'picklistLabels': {'results': [{'label': label}]}}
+
+
+def empjob_record(emp_code, dob, manager_id):
+    """One EmpJob result with the navigation properties the login flow reads"""
+    index = sum(ord(ch) for ch in emp_code)
+    email = f"loadtest.{emp_code}@nvtpower.com"
+    phone = phone_for(emp_code)
+    return {
+        'userId': emp_code,
+        'managerId': manager_id,
+        'department': f"DEPT{index % len(DEPARTMENTS)}",
+        'departmentNav': {'name': DEPARTMENTS[index % len(DEPARTMENTS)]},
+        'division': 'CORP',
+        'divisionNav': {'name': 'Corporate'},
+        'location': 'LOC',
+        'locationNav': {'name': LOCATIONS[index % len(LOCATIONS)]},
+        'managerUserNav': {'defaultFullName': f"Load Test Manager {manager_id}"},
+        'employmentNav': {
+            'startDate': sap_date(datetime(2020, 1, 1)),
+            'personNav': {
+                'dateOfBirth': sap_date(dob),
+                'personalInfoNav': {'results': [{
+                    'firstName': 'Load',
+                    'middleName': None,
+                    'lastName': f"Tester {emp_code}"
+                }]},
+                'emailNav': {'results': [{
+                    'emailAddress': email,
+                    'isPrimary': True,
+                    'emailTypeNav': picklist('Business')
+                }]},
+                # verify_sap_credentials reads the number at index 1
+                'phoneNav': {'results': [
+                    {'phoneNumber': '01234567890', 'phoneTypeNav': picklist('Business')},
+                    {'phoneNumber': phone, 'phoneTypeNav': picklist('Mobile')}
+                ]}
+            }
+        }
+    }
+
+
+def create_app(profile=None, dob=None, manager_id='9023422'):
+    """Build the fake OData service; every request goes through `profile`"""
+    app = Flask(__name__)
+    profile = profile or Profile()
+    dob = dob or datetime(1990, 1, 1)
+
+    def odata_response(build_results):
+        time.sleep(profile.delay_seconds())
+        outcome = profile.outcome()
+
+        if outcome == 'throttled':
+            response = jsonify({'error': {'code': 'TooManyRequests',
+                                          'message': {'lang': 'en-US', 'value': 'Rate limit exceeded'}}})
+            response.headers['Retry-After'] = '1'
+            return response, 429
+        if outcome == 'error':
+            return jsonify({'error': {'code': 'COE_GENERAL_SERVER_FAILURE',
+                                      'message': {'lang': 'en-US', 'value': 'Internal server error'}}}), 500
+
+        match = FILTER_PATTERN.search(request.args.get('$filter', ''))
+        if not match:
+            return jsonify({'error': {'code': 'COE_BAD_REQUEST',
+                                      'message': {'lang': 'en-US', 'value': 'Missing $filter'}}}), 400
+
+        return jsonify({'d': {'results': build_results(match.group(1).strip())}})
+
+    @app.route('/odata/v2/EmpJob', methods=['GET'])
+    def empjob():
+        return odata_response(lambda emp_code: [empjob_record(emp_code, dob, manager_id)] if emp_code else [])
+
+    @app.route('/odata/v2/PerEmail', methods=['GET'])
+    def per_email():
+        return odata_response(lambda person_id: [{
+            'emailAddress': f"loadtest.{person_id}@nvtpower.com",
+            'isPrimary': True,
+            'emailType': '18240',
+            'emailTypeNav': picklist('Business')
+        }])
+
+    @app.route('/odata/v2/PerPhone', methods=['GET'])
+    def per_phone():
+        return odata_response(lambda person_id: [{
+            'phoneNumber': phone_for(person_id),
+            'phoneType': '18256',
+            'phoneTypeNav': picklist('Mobile')
+        }])
+
+    @app.route('/_stats', methods=['GET'])
+    def stats():
+        return jsonify(profile.snapshot())
+
+    return app
+
+
+def main():
+    parser = add_profile_arguments(argparse.ArgumentParser(description='Fake SAP SuccessFactors OData server'))
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9102)
+    parser.add_argument('--dob', default='1990-01-01', help='date of birth for every employee (YYYY-MM-DD)')
+    parser.add_argument('--manager-id', default='9023422')
+    args = parser.parse_args()
+
+    profile = profile_from_args(args)
+    dob = datetime.strptime(args.dob, '%Y-%m-%d')
+    print(f"🏢 Fake SAP OData on http://{args.host}:{args.port}/odata/v2/ - {profile}")
+    create_app(profile, dob=dob, manager_id=args.manager_id).run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Fake Meta WhatsApp Cloud API - accepts POST /<version>/<phone_number_id>/messages"""
+import argparse
+import time
+import uuid
+
+from flask import Flask, jsonify, request
+
+from test_support.profiles import Profile, add_profile_arguments, profile_from_args
+
+
+def create_app(profile=None):
+    """Build the fake Cloud API; every request goes through `profile`"""
+    app = Flask(__name__)
+    profile = profile or Profile()
+    sent_messages = []
+
+    @app.route('/<version>/<phone_number_id>', methods=['GET'])
+    def phone_number_info(version, phone_number_id):
+        # Used by test_whatsapp_connection()
+        return jsonify({'id': phone_number_id, 'display_phone_number': '+91 00000 00000', 'verified_name': 'Load Test'})
+
+    @app.route('/<version>/<phone_number_id>/messages', methods=['POST'])
+    def send_message(version, phone_number_id):
+        time.sleep(profile.delay_seconds())
+        outcome = profile.outcome()
+
+        if outcome == 'throttled':
+            response = jsonify({'error': {
+                'message': '(#130429) Rate limit hit',
+                'type': 'OAuthException',
+                'code': 130429,
+                'fbtrace_id': uuid.uuid4().hex
+            }})
+            response.headers['Retry-After'] = '1'
+            return response, 429
+
+        if outcome == 'error':
+            return jsonify({'error': {
+                'message': 'An unknown error has occurred.',
+                'type': 'OAuthException',
+                'code': 1,
+                'fbtrace_id': uuid.uuid4().hex
+            }}), 500
+
+        payload = request.get_json(silent=True) or {}
+        to_phone = payload.get('to', '')
+        if not to_phone or payload.get('messaging_product') != 'whatsapp':
+            return jsonify({'error': {'message': '(#100) Invalid parameter', 'type': 'OAuthException', 'code': 100}}), 400
+
+        message_id = f"wamid.{uuid.uuid4().hex}"
+        sent_messages.append({
+            'id': message_id,
+            'to': to_phone,
+            'type': payload.get('type'),
+            'template': payload.get('template', {}).get('name')
+        })
+        return jsonify({
+            'messaging_product': 'whatsapp',
+            'contacts': [{'input': to_phone, 'wa_id': to_phone}],
+            'messages': [{'id': message_id}]
+        })
+
+    @app.route('/_stats', methods=['GET'])
+    def stats():
+        templates = {}
+        for message in sent_messages:
+            templates[message['template']] = templates.get(message['template'], 0) + 1
+        return jsonify({**profile.snapshot(), 'delivered': len(sent_messages), 'by_template': templates})
+
+    return app
+
+
+def main():
+    parser = add_profile_arguments(argparse.ArgumentParser(description=__doc__))
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9101)
+    args = parser.parse_args()
+
+    profile = profile_from_args(args)
+    print(f"📱 Fake WhatsApp Cloud API on http://{args.host}:{args.port}/v21.0/ - {profile}")
+    create_app(profile).run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Latency / error-rate / throttling behaviour shared by the stand-in servers"""
+import random
+import threading
+import time
+
+
+class Profile:
+    """How a stand-in server misbehaves: added latency, random failures and a request-rate cap"""
+
+    def __init__(self, latency_ms=0, jitter_ms=0, error_rate=0.0, throttle_rps=0):
+        self.latency_ms = float(latency_ms)
+        self.jitter_ms = float(jitter_ms)
+        self.error_rate = float(error_rate)
+        self.throttle_rps = float(throttle_rps)  # 0 = never throttle
+
+        self._lock = threading.Lock()
+        self._tokens = self.throttle_rps
+        self._last_refill = time.monotonic()
+        self.stats = {'requests': 0, 'ok': 0, 'errors': 0, 'throttled': 0}
+
+    def delay_seconds(self):
+        """Latency to add to the next response"""
+        jitter = random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0
+        return max(0.0, self.latency_ms + jitter) / 1000.0
+
+    def outcome(self):
+        """Decide the next response: 'ok', 'error' or 'throttled' (token bucket at throttle_rps)"""
+        with self._lock:
+            self.stats['requests'] += 1
+
+            if self.throttle_rps > 0:
+                now = time.monotonic()
+                self._tokens = min(self.throttle_rps, self._tokens + (now - self._last_refill) * self.throttle_rps)
+                self._last_refill = now
+                if self._tokens < 1:
+                    self.stats['throttled'] += 1
+                    return 'throttled'
+                self._tokens -= 1
+
+            if self.error_rate and random.random() < self.error_rate:
+                self.stats['errors'] += 1
+                return 'error'
+
+            self.stats['ok'] += 1
+            return 'ok'
+
+    def snapshot(self):
+        """Current counters plus the profile settings"""
+        with self._lock:
+            return {
+                'latency_ms': self.latency_ms,
+                'jitter_ms': self.jitter_ms,
+                'error_rate': self.error_rate,
+                'throttle_rps': self.throttle_rps,
+                **self.stats
+            }
+
+    def __repr__(self):
+        return (f"Profile(latency_ms={self.latency_ms}, jitter_ms={self.jitter_ms}, "
+                f"error_rate={self.error_rate}, throttle_rps={self.throttle_rps})")
+
+
+# Named presets - individual flags override these
+PROFILES = {
+    'fast': dict(latency_ms=0, jitter_ms=0, error_rate=0.0, throttle_rps=0),
+    'realistic': dict(latency_ms=250, jitter_ms=150, error_rate=0.01, throttle_rps=0),
+    'degraded': dict(latency_ms=2000, jitter_ms=1000, error_rate=0.10, throttle_rps=0),
+    'throttled': dict(latency_ms=150, jitter_ms=50, error_rate=0.0, throttle_rps=5),
+}
+
+
+def add_profile_arguments(parser):
+    """Add --profile and the individual override flags to an argparse parser"""
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='fast')
+    parser.add_argument('--latency-ms', type=float)
+    parser.add_argument('--jitter-ms', type=float)
+    parser.add_argument('--error-rate', type=float, help='fraction of requests that fail, e.g. 0.05')
+    parser.add_argument('--throttle-rps', type=float, help='requests/sec before answering throttled; 0 = off')
+    return parser
+
+
+def profile_from_args(args):
+    """Build a fresh Profile from parsed --profile / override flags"""
+    settings = dict(PROFILES[args.profile])
+    for key in ('latency_ms', 'jitter_ms', 'error_rate', 'throttle_rps'):
+        value = getattr(args, key, None)
+        if value is not None:
+            settings[key] = value
+    return Profile(**settings)
@@ -0,0 +1,65 @@
+"""SMTP sink built on aiosmtpd - accepts and counts mail, never delivers it"""
+import argparse
+import asyncio
+import time
+
+from aiosmtpd.controller import Controller
+
+from test_support.profiles import Profile, add_profile_arguments, profile_from_args
+
+
+class SinkHandler:
+    """aiosmtpd handler that applies a Profile to every DATA command"""
+
+    def __init__(self, profile=None):
+        self.profile = profile or Profile()
+        self.delivered = 0
+        self.recipients = {}
+
+    async def handle_DATA(self, server, session, envelope):
+        await asyncio.sleep(self.profile.delay_seconds())
+        outcome = self.profile.outcome()
+
+        if outcome == 'throttled':
+            return '421 4.7.0 Too many messages, slow down'
+        if outcome == 'error':
+            return '451 4.3.0 Temporary server error'
+
+        self.delivered += 1
+        for recipient in envelope.rcpt_tos:
+            self.recipients[recipient] = self.recipients.get(recipient, 0) + 1
+        return '250 Message accepted for delivery'
+
+    def snapshot(self):
+        return {**self.profile.snapshot(), 'delivered': self.delivered, 'unique_recipients': len(self.recipients)}
+
+
+def start_sink(host='127.0.0.1', port=1025, profile=None):
+    """Start the sink in a background thread; returns (controller, handler)"""
+    handler = SinkHandler(profile)
+    controller = Controller(handler, hostname=host, port=port)
+    controller.start()
+    return controller, handler
+
+
+def main():
+    parser = add_profile_arguments(argparse.ArgumentParser(description=__doc__))
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=1025)
+    args = parser.parse_args()
+
+    profile = profile_from_args(args)
+    controller, handler = start_sink(args.host, args.port, profile)
+    print(f"📧 SMTP sink on {args.host}:{args.port} - {profile}")
+    try:
+        while True:
+            time.sleep(30)
+            print(f"📊 SMTP sink: {handler.snapshot()}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        controller.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""
+Startup benchmark - how long `import app` takes and how much memory it leaves behind.
+
+    python -m test_support.startup_benchmark --runs 5
+    python -m test_support.startup_benchmark --save startup_baseline.json
+    python -m test_support.startup_benchmark --baseline startup_baseline.json --max-regression-pct 20
+
+Each run imports the app in a fresh interpreter under `python -X importtime`,
+so the numbers include every top-level import and module-level side effect
+(gunicorn pays the same cost once per master, or once per worker without
+--preload). Importing never opens a database connection, so no database is
+needed. Prints the median import time, RSS after import and the slowest of
+the modules `app` imports directly (flask, requests, psycopg2, ...) as JSON;
+exits 1 when a --baseline is given and import time or RSS grew by more than
+--max-regression-pct.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Runs inside the child interpreter after the import has finished
+PROBE = '''
+import json, time
+started = time.perf_counter()
+import app
+elapsed = time.perf_counter() - started
+rss_kb = 0
+with open('/proc/self/status') as status:
+    for line in status:
+        if line.startswith('VmRSS:'):
+            rss_kb = int(line.split()[1])
+if not rss_kb:
+    import resource
+    rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({'import_ms': elapsed * 1000, 'rss_kb': rss_kb}))
+'''
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_importtime(stderr, parent='app'):
+    """Return {direct import of `parent`: cumulative microseconds} from -X importtime output"""
+    modules = {}
+    children = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        try:
+            _, cumulative, name = line[len('import time:'):].split('|', 2)
+        except ValueError:
+            continue
+        # importtime indents each nesting level by two more spaces and prints a
+        # module's imports before the module itself
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        if depth == 1:
+            children[name.strip()] = int(cumulative)
+        elif depth == 0:
+            if name.strip() == parent:
+                modules = children
+            children = {}
+    return modules
+
+
+def run_once(python):
+    """Import the app once in a fresh interpreter; returns (probe result, import times)"""
+    result = subprocess.run(
+        [python, '-X', 'importtime', '-c', PROBE],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import app failed:\n{result.stderr[-2000:]}")
+    probe = json.loads(result.stdout.strip().splitlines()[-1])
+    return probe, parse_importtime(result.stderr)
+
+
+def benchmark(runs, python, top):
+    """Median import time / RSS over `runs` fresh interpreters"""
+    samples = []
+    module_times = {}
+    for _ in range(runs):
+        probe, modules = run_once(python)
+        samples.append(probe)
+        for name, micros in modules.items():
+            module_times.setdefault(name, []).append(micros)
+
+    slowest = sorted(
+        ((name, statistics.median(values) / 1000) for name, values in module_times.items()),
+        key=lambda item: item[1],
+        reverse=True
+    )[:top]
+    return {
+        'runs': runs,
+        'import_ms': round(statistics.median(s['import_ms'] for s in samples), 1),
+        'rss_mb': round(statistics.median(s['rss_kb'] for s in samples) / 1024, 1),
+        'slowest_imports_ms': {name: round(ms, 1) for name, ms in slowest}
+    }
+
+
+def regressions(current, baseline, max_pct):
+    """Metrics that grew by more than max_pct percent over the baseline"""
+    failed = []
+    for metric in ('import_ms', 'rss_mb'):
+        before, after = baseline.get(metric), current[metric]
+        if before and (after - before) / before * 100 > max_pct:
+            failed.append(f"{metric}: {before} → {after}")
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure `import app` time and RSS')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15, help="how many of app's slowest direct imports to list")
+    parser.add_argument('--python', default=sys.executable)
+    parser.add_argument('--save', help='write the result to this JSON file')
+    parser.add_argument('--baseline', help='compare against a result saved with --save')
+    parser.add_argument('--max-regression-pct', type=float, default=20.0)
+    args = parser.parse_args()
+
+    result = benchmark(args.runs, args.python, args.top)
+    print(json.dumps(result, indent=2))
+
+    if args.save:
+        with open(args.save, 'w') as fp:
+            json.dump(result, fp, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as fp:
+            failed = regressions(result, json.load(fp), args.max_regression_pct)
+        if failed:
+            print(f"❌ Startup regressed by more than {args.max_regression_pct}%: {', '.join(failed)}")
+            sys.exit(1)
+        print("✅ Startup within budget")
+
+
+if __name__ == '__main__':
+    main()